@@ -0,0 +1,221 @@
+import logging
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from csv_files import cell_str, read_csv, write_csv
+from diagnostics import report
+from ini_files import iter_folder_mannschaften, write_mannschaft_file_from_mannschaft_data
+from mannschaft import GEBURTSDATUM_PARSED, parse_geburtsdatum_column, player_key, player_name_key
+
+REGEL_COLUMNS = ["Altersklasse", "Min Alter", "Max Alter", "Geschlecht"]
+DEFAULT_ALTERSKLASSEN_REGELN = [
+    ("U14", 0, 13, ""),
+    ("U18", 14, 17, ""),
+    ("U23", 18, 22, ""),
+    ("Herren", 23, 49, "m"),
+    ("Damen", 23, 49, "w"),
+    ("Senioren A", 50, 59, "m"),
+    ("Seniorinnen A", 50, 59, "w"),
+    ("Senioren B", 60, 200, "m"),
+    ("Seniorinnen B", 60, 200, "w"),
+]
+
+
+def load_altersklassen_regeln(name: str = "Altersklassen", sep: str = ";") -> pd.DataFrame:
+    """
+    Load the rules for the Altersklassen. The csv file needs the columns "Altersklasse", "Min Alter", "Max Alter" and
+    "Geschlecht" (m, w or empty for both). If the file does not exist, DEFAULT_ALTERSKLASSEN_REGELN is used.
+    :param name: name of the csv file without the .csv ending. Default is "Altersklassen"
+    :type name: str
+    :param sep: separator of the csv file. Default is ";"
+    :type sep: str
+    :return: rules with one row per Altersklasse and Geschlecht
+    :rtype: pd.DataFrame
+    """
+    if not Path(f"{name}.csv").exists():
+        return pd.DataFrame(DEFAULT_ALTERSKLASSEN_REGELN, columns=REGEL_COLUMNS)
+    regeln = read_csv(name, sep=sep)[REGEL_COLUMNS]
+    regeln["Min Alter"] = regeln["Min Alter"].astype(int)
+    regeln["Max Alter"] = regeln["Max Alter"].astype(int)
+    regeln["Geschlecht"] = _normalize_geschlecht(regeln["Geschlecht"])
+    return regeln
+
+
+def _normalize_geschlecht(geschlecht: pd.Series) -> pd.Series:
+    """
+    Normalize the Geschlecht to "m", "w" or "" (unknown). "f" (female) is mapped to "w".
+    """
+    return geschlecht.fillna("").astype(str).str.strip().str.lower().str[:1].replace("f", "w")
+
+
+def age_at(geburtsdaten: pd.Series, stichtag: date) -> pd.Series:
+    """
+    Age in completed years at the Stichtag for every birthdate. Missing birthdates result in NaN.
+    :param geburtsdaten: birthdates (datetime.date, Timestamp or None)
+    :type geburtsdaten: pd.Series
+    :param stichtag: cutoff date of the season
+    :type stichtag: date
+    :return: ages as float Series
+    :rtype: pd.Series
+    """
+    dates = pd.to_datetime(geburtsdaten, errors="coerce")
+    birthday_not_reached = (dates.dt.month > stichtag.month) | \
+                           ((dates.dt.month == stichtag.month) & (dates.dt.day > stichtag.day))
+    return stichtag.year - dates.dt.year - birthday_not_reached.astype(int)
+
+
+def geschlecht_from_altersklasse(altersklassen: pd.Series, regeln: pd.DataFrame) -> pd.Series:
+    """
+    Derive the Geschlecht from the current Altersklasse, e.g. "Damen" -> "w". Used for the .ini files, which do not
+    contain the Geschlecht. Classes that are used for both or are unknown result in "".
+    """
+    by_class = regeln.groupby("Altersklasse")["Geschlecht"].agg(lambda values: values.iloc[0]
+                                                                 if values.nunique() == 1 else "")
+    return altersklassen.map(by_class).fillna("")
+
+
+def geschlecht_from_spieler_csv(keys: pd.Series, name_keys: pd.Series, spieler_csv: pd.DataFrame) -> pd.Series:
+    """
+    Look up the Geschlecht of players in Spieler.csv, by Passnummer key first and then by name key (see player_key and
+    player_name_key). Players that are not found or have no Geschlecht result in "".
+    :param keys: player_key of every player
+    :type keys: pd.Series
+    :param name_keys: player_name_key of every player
+    :type name_keys: pd.Series
+    :param spieler_csv: content of Spieler.csv with the column "Geschlecht"
+    :type spieler_csv: pd.DataFrame
+    :return: normalized Geschlecht (m, w or "")
+    :rtype: pd.Series
+    """
+    if "Geschlecht" not in spieler_csv.columns:
+        return pd.Series("", index=keys.index)
+    if GEBURTSDATUM_PARSED not in spieler_csv.columns:
+        spieler_csv = parse_geburtsdatum_column(spieler_csv.copy())
+    by_key: dict[str, str] = dict()
+    by_name_key: dict[str, str] = dict()
+    for name, vorname, geburtsjahr, passnummer, geschlecht in zip(
+            spieler_csv["Name"], spieler_csv["Vorname"], spieler_csv[GEBURTSDATUM_PARSED],
+            spieler_csv.get("Passnummer", pd.Series("", index=spieler_csv.index)),
+            _normalize_geschlecht(spieler_csv["Geschlecht"])):
+        if geschlecht == "":
+            continue
+        geburtsjahr = geburtsjahr if not pd.isna(geburtsjahr) else None
+        by_key.setdefault(player_key(name, vorname, geburtsjahr, cell_str(passnummer)), geschlecht)
+        by_name_key.setdefault(player_name_key(name, vorname, geburtsjahr), geschlecht)
+    return keys.map(by_key).fillna(name_keys.map(by_name_key)).fillna("")
+
+
+def derive_altersklasse(geburtsdaten: pd.Series, stichtag: date, regeln: pd.DataFrame = None,
+                        geschlecht: pd.Series = None) -> pd.Series:
+    """
+    Derive the Altersklasse for every birthdate from the rules. The rules are applied column-wise, the first matching
+    rule wins. A rule with Geschlecht only matches players with this Geschlecht.
+    :param geburtsdaten: birthdates
+    :type geburtsdaten: pd.Series
+    :param stichtag: cutoff date of the season
+    :type stichtag: date
+    :param regeln: rules, see load_altersklassen_regeln. Default is DEFAULT_ALTERSKLASSEN_REGELN
+    :type regeln: pd.DataFrame
+    :param geschlecht: Geschlecht of the players (m, w, ...). Default is None, only rules without Geschlecht match
+    :type geschlecht: pd.Series
+    :return: Altersklasse or NaN if no rule matches or the birthdate is missing
+    :rtype: pd.Series
+    """
+    if regeln is None:
+        regeln = pd.DataFrame(DEFAULT_ALTERSKLASSEN_REGELN, columns=REGEL_COLUMNS)
+    ages = age_at(geburtsdaten, stichtag)
+    geschlecht = pd.Series("", index=geburtsdaten.index) if geschlecht is None else _normalize_geschlecht(geschlecht)
+    result = pd.Series(pd.NA, index=geburtsdaten.index, dtype=object)
+    for regel in regeln.itertuples(index=False):
+        mask = result.isna() & (ages >= regel[1]) & (ages <= regel[2])
+        if regel[3] != "":
+            mask &= geschlecht == regel[3]
+        result[mask] = regel[0]
+    return result
+
+
+def apply_altersklassen_to_spieler(spieler_csv: pd.DataFrame, stichtag: date, regeln: pd.DataFrame = None) \
+        -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Set the column "Altersklasse" of a Spieler.csv according to the rules. Players without (parsable) birthdate or
+    without matching rule keep their Altersklasse.
+    :return: the updated Spieler.csv and the changed players with the old and the new Altersklasse
+    :rtype: tuple[pd.DataFrame, pd.DataFrame]
+    """
+    if GEBURTSDATUM_PARSED not in spieler_csv.columns:
+        spieler_csv = parse_geburtsdatum_column(spieler_csv.copy())
+    neu = derive_altersklasse(spieler_csv[GEBURTSDATUM_PARSED], stichtag, regeln, spieler_csv.get("Geschlecht"))
+    neu = neu.fillna(spieler_csv["Altersklasse"])
+    changed = neu.ne(spieler_csv["Altersklasse"]) & neu.notna()
+    changes = spieler_csv.loc[changed, ["Name", "Vorname", "Verein", "Mannschaft"]].copy()
+    changes["Altersklasse alt"] = spieler_csv.loc[changed, "Altersklasse"]
+    changes["Altersklasse neu"] = neu[changed]
+    spieler_csv = spieler_csv.assign(Altersklasse=neu)
+    return spieler_csv, changes
+
+
+def new_season(folder_name: str, stichtag: date, regeln: pd.DataFrame = None, clear_results: bool = True,
+               encoding: str = "windows-1252", spieler_csv: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Start a new season for all Mannschaften in the folder. The Altersklasse of every player is derived from the
+    rules for the Stichtag and "Letztes Spiel" and "Rangliste" are cleared. Only Mannschaften that change are written
+    to the out folder. The changed Altersklassen are written to out/Altersklassen_[Datum].csv.
+    The .ini files do not contain the Geschlecht, it is taken from Spieler.csv and otherwise from the current
+    Altersklasse (which does not work for youth classes like U23). Players whose new Altersklasse depends on an unknown
+    Geschlecht are reported and keep their Altersklasse.
+    :param folder_name: folder with the .ini files
+    :type folder_name: str
+    :param stichtag: cutoff date of the new season
+    :type stichtag: date
+    :param regeln: rules, see load_altersklassen_regeln. Default is DEFAULT_ALTERSKLASSEN_REGELN
+    :type regeln: pd.DataFrame
+    :param clear_results: clear "Letztes Spiel" and "Rangliste". Default is True
+    :type clear_results: bool
+    :param encoding: encoding of the written files. Default is windows-1252
+    :type encoding: str
+    :param spieler_csv: content of Spieler.csv for the Geschlecht. Default is None, the Geschlecht is derived from the
+    Altersklasse only
+    :type spieler_csv: pd.DataFrame
+    :return: players with changed Altersklasse
+    :rtype: pd.DataFrame
+    """
+    if regeln is None:
+        regeln = pd.DataFrame(DEFAULT_ALTERSKLASSEN_REGELN, columns=REGEL_COLUMNS)
+    mannschaften = list(iter_folder_mannschaften(folder_name))
+    rows = [(team, position, player.name, player.vorname, player.geburtsjahr, player.altersklasse,
+             player.letztes_spiel != "" or player.rangliste != "", player.key, player.name_key)
+            for team, mannschaft in enumerate(mannschaften)
+            for position, player in enumerate(mannschaft.players) if not player.is_platzhalter()]
+    players = pd.DataFrame(rows, columns=["team", "position", "Name", "Vorname", "Geburtsjahr", "Altersklasse alt",
+                                          "results", "key", "name_key"])
+    geschlecht = geschlecht_from_altersklasse(players["Altersklasse alt"], regeln)
+    if spieler_csv is not None:
+        from_csv = geschlecht_from_spieler_csv(players["key"], players["name_key"], spieler_csv)
+        geschlecht = from_csv.where(from_csv != "", geschlecht)
+    neu = derive_altersklasse(players["Geburtsjahr"], stichtag, regeln, geschlecht)
+    unknown = neu.isna() & players["Geburtsjahr"].notna()
+    for team, name, vorname, altersklasse in zip(players.loc[unknown, "team"], players.loc[unknown, "Name"],
+                                                 players.loc[unknown, "Vorname"],
+                                                 players.loc[unknown, "Altersklasse alt"]):
+        report("Altersklasse nicht bestimmbar, Geschlecht unbekannt", f"{name} {vorname} ({altersklasse})",
+               mannschaften[team].file_name)
+    players["Altersklasse neu"] = neu.fillna(players["Altersklasse alt"])
+    players["changed"] = players["Altersklasse neu"] != players["Altersklasse alt"]
+    affected = players[players["changed"] | (players["results"] & clear_results)]
+    for team, team_players in affected.groupby("team"):
+        mannschaft = mannschaften[team]
+        for position, altersklasse in zip(team_players["position"], team_players["Altersklasse neu"]):
+            changes = dict(altersklasse=altersklasse)
+            if clear_results:
+                changes.update(letztes_spiel="", rangliste="")
+            mannschaft.players[position] = mannschaft.players[position].replace(**changes)
+        write_mannschaft_file_from_mannschaft_data(mannschaft.file_name, mannschaft, encoding=encoding)
+    changes = players.loc[players["changed"], ["team", "Name", "Vorname", "Altersklasse alt", "Altersklasse neu"]]
+    changes.insert(0, "Mannschaft", [mannschaften[team].file_name for team in changes.pop("team")])
+    logging.info(f"{affected['team'].nunique()} Mannschaften geschrieben, {len(changes)} Altersklassen geändert.")
+    if len(changes) > 0:
+        today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
+        write_csv(changes.to_dict("records"), f"Altersklassen_{today}")
+    return changes
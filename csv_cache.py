@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+from csv_files import read_csv
+
+CACHE_DIR = Path(".mks_cache")
+CACHE_VERSION = 1
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_file(path: Path, prepare: callable) -> Path:
+    """
+    Name of the cache file for the csv file and the preparation step. Different preparations of the same csv file are
+    cached separately.
+    """
+    prepare_name = "" if prepare is None else f"{prepare.__module__}.{prepare.__qualname__}"
+    key = hashlib.sha1(f"{path.resolve()}|{prepare_name}".encode("utf-8")).hexdigest()
+    return CACHE_DIR.joinpath(f"{key}.pkl")
+
+
+def read_csv_cached(name: str = "Mannschaften", sep: str = ";", prepare: callable = None) -> pd.DataFrame:
+    """
+    Read a csv file like read_csv, but keep the parsed (and prepared) DataFrame in the cache directory.
+    The cache entry is valid as long as size and modification time of the csv file are unchanged. If only the
+    modification time changed, the content hash decides. A changed file is parsed again and the cache is replaced.
+    :param name: name of the csv file without the .csv ending
+    :type name: str
+    :param sep: separator of the csv file. Default is ";"
+    :type sep: str
+    :param prepare: function that is applied to the parsed DataFrame before it is cached, e.g. date parsing
+    :type prepare: callable
+    :return: pandas DataFrame with the (prepared) data from the csv file
+    :rtype: pd.DataFrame
+    """
+    path = Path(name if name.endswith(".csv") else f"{name}.csv")
+    stat = path.stat()
+    cache_file = _cache_file(path, prepare)
+    entry = None
+    if cache_file.exists():
+        try:
+            with open(cache_file, "rb") as file:
+                entry = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            logging.warning(f"Cache {cache_file} is not readable. Reading {path} again.")
+    if entry is not None and entry["version"] == CACHE_VERSION and entry["sep"] == sep \
+            and entry["size"] == stat.st_size:
+        if entry["mtime"] == stat.st_mtime_ns:
+            return entry["frame"].copy()
+        content_hash = _content_hash(path)
+        if entry["hash"] == content_hash:
+            entry["mtime"] = stat.st_mtime_ns
+            _write_entry(cache_file, entry)
+            return entry["frame"].copy()
+    frame = read_csv(str(path), sep=sep)
+    if prepare is not None:
+        frame = prepare(frame)
+    _write_entry(cache_file, {"version": CACHE_VERSION, "sep": sep, "size": stat.st_size,
+                              "mtime": stat.st_mtime_ns, "hash": _content_hash(path), "frame": frame})
+    return frame.copy()
+
+
+def _write_entry(cache_file: Path, entry: dict) -> None:
+    """
+    Write the cache entry to a temporary file and replace the old entry, so a concurrent reader never sees a partly
+    written cache file.
+    """
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        temp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_file, "wb") as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        logging.warning(f"Could not write cache {cache_file}: {e}")
+
+
+def clear_cache() -> None:
+    """
+    Remove all cached csv files.
+    """
+    if CACHE_DIR.exists():
+        for file in CACHE_DIR.glob("*.pkl"):
+            file.unlink()
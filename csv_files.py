@@ -1,15 +1,18 @@
 import logging
+from collections.abc import Iterable
 from pathlib import Path
 
 import pandas as pd
 
+from file_encoding import detect_encoding
 from mannschaft import MannschaftData
 
 
 def read_csv(name: str = "Mannschaften", sep: str = ";") -> pd.DataFrame:
     """
     Read a csv file with the given name and return a pandas DataFrame
-    The encoding is set to utf-8 and the header is set to 0
+    The encoding is detected (see file_encoding.detect_encoding) and the header is set to 0. All values are read as
+    strings, so Passnummer or Mannschaft like "1" are not converted to numbers
     :param sep: separator of the csv file. Default is ";"
     :type sep: str
     :param name: name of the csv file without the .csv ending
@@ -19,10 +22,21 @@ def read_csv(name: str = "Mannschaften", sep: str = ";") -> pd.DataFrame:
     """
     if not name.endswith(".csv"):
         name = f"{name}.csv"
-    df = pd.read_csv(name, sep=sep, encoding='utf-8', header=0)
+    df = pd.read_csv(name, sep=sep, encoding=detect_encoding(Path(name)), header=0, dtype=str)
     return df
 
 
+def cell_str(value) -> str:
+    """
+    Convert a csv cell to a stripped string. NaN becomes an empty string and integral floats lose their ".0".
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
 def write_csv(players: list[dict], name: str = "Mannschaften") -> None:
     """
     Write a csv file with the given name and the given data
@@ -61,23 +75,26 @@ def write_csv_from_mannschaft_data(mannschaft: MannschaftData, name: str = None)
     _create_mannschaft_csv(mannschaft, name)
 
 
-def write_csv_with_all_mannschaften(mannschaften: list[MannschaftData]) -> None:
+def write_csv_with_all_mannschaften(mannschaften: Iterable[MannschaftData]) -> None:
     """
-    Write a csv file with all given MannschaftData
-    :param mannschaften: list of MannschaftData
-    :type mannschaften: list[MannschaftData]
+    Write a csv file with all given MannschaftData. The Mannschaften are written one after another, so an iterator
+    (e.g. iter_folder_mannschaften) is never held in memory completely.
+    :param mannschaften: list or iterator of MannschaftData
+    :type mannschaften: Iterable[MannschaftData]
     """
     if not Path("out").exists():
         Path("out").mkdir()
-    complete_frame_spieler = pd.DataFrame()
-    complete_frame_mannschaften = pd.DataFrame()
-    for mannschaft in mannschaften:
-        spieler_frame = mannschaft.players_as_dataframe()
-        complete_frame_spieler = pd.concat([complete_frame_spieler, spieler_frame])
-        mannschaft_frame = mannschaft.mannschaft_as_dataframe()
-        complete_frame_mannschaften = pd.concat([complete_frame_mannschaften, mannschaft_frame])
     today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
-    logging.info(f"Writing to out/Spieler_{today}.csv")
-    complete_frame_spieler.to_csv(f"out/Spieler_{today}.csv", sep=";", encoding="utf-8", index=False)
-    logging.info(f"Writing to out/Mannschaften_{today}.csv")
-    complete_frame_mannschaften.to_csv(f"out/Mannschaften_{today}.csv", sep=";", encoding="utf-8", index=False)
+    logging.info(f"Writing to out/Spieler_{today}.csv and out/Mannschaften_{today}.csv")
+    with open(f"out/Spieler_{today}.csv", "w", encoding="utf-8", newline="") as spieler_file, \
+            open(f"out/Mannschaften_{today}.csv", "w", encoding="utf-8", newline="") as mannschaften_file:
+        spieler_header = True
+        mannschaften_header = True
+        for mannschaft in mannschaften:
+            if mannschaft.players:
+                spieler_frame = mannschaft.players_as_dataframe()
+                spieler_frame.to_csv(spieler_file, sep=";", index=False, header=spieler_header)
+                spieler_header = False
+            mannschaft_frame = mannschaft.mannschaft_as_dataframe()
+            mannschaft_frame.to_csv(mannschaften_file, sep=";", index=False, header=mannschaften_header)
+            mannschaften_header = False
@@ -25,6 +25,26 @@ def date_parsing_from_word_str(date_str: str) -> datetime.date:
     return geburtsjahr
 
 
+def date_to_word_str(value: datetime.date) -> str:
+    """
+    Format a date like the dates in Spieler.csv, e.g. "20. Januar 1990". Inverse of date_parsing_from_word_str.
+    """
+    if value is None:
+        return ""
+    month_str = next(name for name, number in month_mapping.items() if number == value.month)
+    return f"{value.day}. {month_str} {value.year}"
+
+
+def birthdate_in_past(geburtsjahr: datetime.date) -> datetime.date:
+    """
+    Move a birthdate that lies in the future back by a century. Two-digit years (mm/yy in the .ini files) are read as
+    20xx for 00-68, so 01/66 would be 2066, but a birthdate can not be in the future.
+    """
+    if geburtsjahr is not None and geburtsjahr > datetime.today().date():
+        return geburtsjahr.replace(year=geburtsjahr.year - 100)
+    return geburtsjahr
+
+
 def date_parsing_from_iso_str(date_string: str) -> datetime.date:
     if date_string is None or not isinstance(date_string, str) or date_string == "":
         return None
@@ -0,0 +1,209 @@
+import itertools
+from collections.abc import Iterable
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from csv_files import cell_str, write_csv
+from mannschaft import GEBURTSDATUM_PARSED, MannschaftData, parse_geburtsdatum_column
+from name_matching import normalize_name
+
+PLAYER_COLUMNS = ["Name", "Vorname", "Geburtsjahr", "Passnummer", "Quelle"]
+DUPLICATE_COLUMNS = ["Cluster", "Score"] + PLAYER_COLUMNS
+
+_PHONETIK_GROUPS = {**dict.fromkeys("aeijouy", "0"), "b": "1", **dict.fromkeys("fvw", "3"),
+                    **dict.fromkeys("gkq", "4"), "l": "5", **dict.fromkeys("mn", "6"), "r": "7",
+                    **dict.fromkeys("sz", "8")}
+
+
+def koelner_phonetik(word: str) -> str:
+    """
+    Phonetic code of a German word (Kölner Phonetik). "Müller", "Mueller" and "Möller" all result in "657".
+    The word is normalized first (see normalize_name), every part of a multi-part name is coded on its own.
+    """
+    return " ".join(_koelner_phonetik_part(part) for part in normalize_name(word).split())
+
+
+def _koelner_phonetik_part(word: str) -> str:
+    codes = []
+    for position, char in enumerate(word):
+        before = word[position - 1] if position > 0 else ""
+        after = word[position + 1] if position + 1 < len(word) else ""
+        if char == "h" or not char.isalpha():
+            code = ""
+        elif char == "p":
+            code = "3" if after == "h" else "1"
+        elif char in "dt":
+            code = "8" if after in ("c", "s", "z") else "2"
+        elif char == "c":
+            if position == 0:
+                code = "4" if after in "ahkloqrux" and after != "" else "8"
+            else:
+                code = "4" if after in "ahkoqux" and after != "" and before not in ("s", "z") else "8"
+        elif char == "x":
+            code = "8" if before in ("c", "k", "q") else "48"
+        else:
+            code = _PHONETIK_GROUPS.get(char, "")
+        codes.append(code)
+    collapsed = []
+    for code in "".join(codes):
+        if not collapsed or collapsed[-1] != code:
+            collapsed.append(code)
+    return "".join(code for position, code in enumerate(collapsed) if code != "0" or position == 0)
+
+
+def players_from_mannschaften(mannschaften: Iterable[MannschaftData]) -> pd.DataFrame:
+    """
+    Players of the Mannschaften (e.g. read_folder_mannschaften) as DataFrame with PLAYER_COLUMNS. Platzhalter are
+    skipped, Quelle is the file name of the Mannschaft.
+    """
+    rows = [(player.name, player.vorname, player.geburtsjahr, player.passnummer, mannschaft.file_name)
+            for mannschaft in mannschaften for player in mannschaft.players
+            if not player.is_platzhalter() and player.valid]
+    return pd.DataFrame(rows, columns=PLAYER_COLUMNS)
+
+
+def players_from_spieler_csv(spieler_csv: pd.DataFrame) -> pd.DataFrame:
+    """
+    Players of Spieler.csv as DataFrame with PLAYER_COLUMNS. Quelle is the line in Spieler.csv with Verein and
+    Mannschaft.
+    """
+    if GEBURTSDATUM_PARSED not in spieler_csv.columns:
+        spieler_csv = parse_geburtsdatum_column(spieler_csv.copy())
+    quelle = [f"Zeile {row}: {cell_str(verein)} {cell_str(mannschaft)}".strip() for row, verein, mannschaft in
+              zip(spieler_csv.index, spieler_csv["Verein"], spieler_csv["Mannschaft"])]
+    return pd.DataFrame({"Name": spieler_csv["Name"].map(cell_str).values,
+                         "Vorname": spieler_csv["Vorname"].map(cell_str).values,
+                         "Geburtsjahr": spieler_csv[GEBURTSDATUM_PARSED].values,
+                         "Passnummer": spieler_csv["Passnummer"].map(cell_str).values,
+                         "Quelle": quelle})
+
+
+class _UnionFind:
+
+    def __init__(self):
+        self.parent: dict[int, int] = dict()
+
+    def find(self, item: int) -> int:
+        root = self.parent.setdefault(item, item)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first: int, second: int) -> None:
+        self.parent[self.find(first)] = self.find(second)
+
+
+def _ratio(first: str, second: str, cache: dict) -> float:
+    if first == second:
+        return 1.0
+    key = (first, second) if first < second else (second, first)
+    if key not in cache:
+        cache[key] = SequenceMatcher(None, first, second, autojunk=False).ratio()
+    return cache[key]
+
+
+def score_pair(name: tuple[str, str], other: tuple[str, str], same_month: bool, passnummern: tuple[str, str],
+               cache: dict = None) -> float:
+    """
+    Score between 0 and 1 that two players are the same person. The normalized names are compared directly and with
+    swapped Name and Vorname, the better comparison counts. A different birth month or two different Passnummern
+    lower the score.
+    :param name: normalized Name and Vorname of the first player
+    :type name: tuple[str, str]
+    :param other: normalized Name and Vorname of the second player
+    :type other: tuple[str, str]
+    :param same_month: both players are born in the same month
+    :type same_month: bool
+    :param passnummern: Passnummern of both players
+    :type passnummern: tuple[str, str]
+    :param cache: cache for the string comparisons, common names are compared only once. Default is None
+    :type cache: dict
+    :return: the score
+    :rtype: float
+    """
+    cache = dict() if cache is None else cache
+    score = (_ratio(name[0], other[0], cache) + _ratio(name[1], other[1], cache)) / 2
+    if score < 1:
+        score = max(score, (_ratio(name[0], other[1], cache) + _ratio(name[1], other[0], cache)) / 2)
+    if not same_month:
+        score *= 0.9
+    if passnummern[0] != "" and passnummern[1] != "" and passnummern[0] != passnummern[1]:
+        score *= 0.9
+    return score
+
+
+def find_duplicates(players: pd.DataFrame, threshold: float = 0.85, max_block_size: int = 500) -> pd.DataFrame:
+    """
+    Find clusters of players that are probably the same person, e.g. "Müller"/"Mueller", swapped Name and Vorname or a
+    birthdate that is only known to the month (mm/yy of the .ini files).
+    Only players that share a block are compared: the same birth year and the same phonetic codes of both names (in
+    any order), or the same birth month and the same phonetic code of one of the names. Blocks with more than
+    max_block_size players are skipped, so the number of comparisons grows almost linearly with the players.
+    Players with the same Passnummer are the same person on purpose (e.g. in several Mannschaften) and are not compared.
+    Pairs with a score (see score_pair) of at least threshold are joined to clusters.
+    :param players: players with PLAYER_COLUMNS, see players_from_mannschaften and players_from_spieler_csv
+    :type players: pd.DataFrame
+    :param threshold: minimal score of a duplicate pair. Default is 0.85
+    :type threshold: float
+    :param max_block_size: maximal number of players in a block. Default is 500
+    :type max_block_size: int
+    :return: one row per player in a cluster with DUPLICATE_COLUMNS, sorted by cluster
+    :rtype: pd.DataFrame
+    """
+    players = players.reset_index(drop=True)
+    normalized = {value: normalize_name(value) for value in pd.unique(players[["Name", "Vorname"]].values.ravel())}
+    phonetik = {value: koelner_phonetik(value) for value in normalized}
+    names = list(zip(players["Name"].map(normalized), players["Vorname"].map(normalized)))
+    dates = pd.to_datetime(players["Geburtsjahr"], errors="coerce")
+    year = dates.dt.year.fillna(0).astype(int).astype(str)
+    month = year + "-" + dates.dt.month.fillna(0).astype(int).astype(str)
+    name_code = players["Name"].map(phonetik)
+    vorname_code = players["Vorname"].map(phonetik)
+    both_codes = name_code.where(name_code <= vorname_code, vorname_code) + "|" + \
+        vorname_code.where(name_code <= vorname_code, name_code)
+    blocks: dict[str, list[int]] = dict()
+    for position, keys in enumerate(zip("J" + year + "|" + both_codes, "M" + month + "|" + name_code,
+                                        "M" + month + "|" + vorname_code)):
+        for key in keys:
+            blocks.setdefault(key, []).append(position)
+    pairs = set()
+    for members in blocks.values():
+        if 1 < len(members) <= max_block_size:
+            pairs.update(itertools.combinations(members, 2))
+    passnummern = players["Passnummer"].map(cell_str).tolist()
+    month_list = month.tolist()
+    clusters = _UnionFind()
+    best_score: dict[int, float] = dict()
+    cache = dict()
+    for first, second in pairs:
+        if passnummern[first] != "" and passnummern[first] == passnummern[second]:
+            continue
+        score = score_pair(names[first], names[second], month_list[first] == month_list[second],
+                           (passnummern[first], passnummern[second]), cache)
+        if score >= threshold:
+            clusters.union(first, second)
+            best_score[first] = max(best_score.get(first, 0), score)
+            best_score[second] = max(best_score.get(second, 0), score)
+    members = sorted(best_score)
+    result = players.loc[members, PLAYER_COLUMNS].copy()
+    roots = [clusters.find(member) for member in members]
+    cluster_numbers = {root: number for number, root in enumerate(dict.fromkeys(sorted(roots)), start=1)}
+    result.insert(0, "Cluster", [cluster_numbers[root] for root in roots])
+    result.insert(1, "Score", [round(best_score[member], 3) for member in members])
+    return result.sort_values(["Cluster", "Name", "Vorname"], kind="stable").reset_index(drop=True)[DUPLICATE_COLUMNS]
+
+
+def write_duplicates(duplicates: pd.DataFrame) -> str:
+    """
+    Write the duplicates to out/Duplikate_[Datum].csv.
+    :return: name of the file
+    :rtype: str
+    """
+    today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
+    duplicates = duplicates.assign(Geburtsjahr=pd.to_datetime(duplicates["Geburtsjahr"], errors="coerce")
+                                   .dt.strftime("%d.%m.%Y").fillna(""))
+    write_csv(duplicates.to_dict("records"), f"Duplikate_{today}")
+    return f"Duplikate_{today}.csv"
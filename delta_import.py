@@ -0,0 +1,280 @@
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from csv_files import cell_str, read_csv
+from date_parsing import date_parsing_from_word_str
+from diagnostics import report
+from exceptions import FileIncompleteError
+from ini_files import get_mannschaft_file_name, read_finished_mannschaften, write_mannschaft_file_from_mannschaft_data
+from mannschaft import GeneralData, MannschaftData, PlayerData, VEREIN_ANGEH, explode_mannschaften, \
+    get_final_name_for_mannschaften_file, player_key, player_name_key
+
+COMPARED_SPIELER_COLUMNS = ["Name", "Vorname", "Geburtsdatum", "Geschlecht", "Altersklasse", "Passnummer",
+                            VEREIN_ANGEH]
+COMPARED_MANNSCHAFTEN_COLUMNS = ["Spielklasse", "Liga", "Bezirk", "Spielführer", "Betreuer", "Vereinsnummer",
+                                 "LV-Nummer", "Verein Kurz"]
+
+
+class TeamDelta:
+    """
+    Changes of a single Mannschaft between two exports of Spieler.csv and Mannschaften.csv.
+    Every entry of added, removed and changed is a row of the csv file as dict.
+    For changed players the tuple contains the previous and the current row.
+    """
+
+    def __init__(self, verein: str, mannschaft: str):
+        self.verein = verein
+        self.mannschaft = mannschaft
+        self.added: list[dict] = []
+        self.removed: list[dict] = []
+        self.changed: list[tuple[dict, dict]] = []
+        self.general_data_changed = False
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed or self.general_data_changed)
+
+    @property
+    def file_name(self) -> str:
+        return get_mannschaft_file_name(get_final_name_for_mannschaften_file(self.verein, self.mannschaft))
+
+    def __str__(self):
+        general = " (Allgemein geändert)" if self.general_data_changed else ""
+        return (f"{self.file_name}: +{len(self.added)} -{len(self.removed)} ~{len(self.changed)}"
+                f"{general}")
+
+
+def _parse_date_or_none(date_str: str):
+    try:
+        return date_parsing_from_word_str(date_str)
+    except (ValueError, IndexError):
+        return None
+
+
+def _row_keys(row: dict) -> tuple[str, str]:
+    """
+    Return the key and the name key of a Spieler.csv row. See player_key and player_name_key.
+    """
+    geburtsjahr = _parse_date_or_none(row["Geburtsdatum"])
+    return (player_key(row["Name"], row["Vorname"], geburtsjahr, row["Passnummer"]),
+            player_name_key(row["Name"], row["Vorname"], geburtsjahr))
+
+
+def _team_of(row: dict) -> tuple[str, str]:
+    return row["Verein"], row["Mannschaft"]
+
+
+def _spieler_records(spieler_csv: pd.DataFrame) -> dict[tuple[str, str, str], dict]:
+    """
+    Index the rows of a Spieler.csv by their key and Mannschaft. A row with several Mannschaften (see
+    explode_mannschaften) gets one record per Mannschaft. Rows with the same key in the same Mannschaft are reported and
+    the last one wins.
+    """
+    frame = spieler_csv.reindex(columns=list(dict.fromkeys(COMPARED_SPIELER_COLUMNS + ["Verein", "Mannschaft"])))
+    frame = explode_mannschaften(frame.map(cell_str))
+    records = dict()
+    for row in frame.to_dict("records"):
+        key, _ = _row_keys(row)
+        if (key, *_team_of(row)) in records:
+            report("Spieler mehrfach vorhanden", f"{row['Name']} {row['Vorname']} ({key})")
+        records[(key, *_team_of(row))] = row
+    return records
+
+
+def compute_spieler_delta(previous: pd.DataFrame, current: pd.DataFrame) -> dict[tuple[str, str], TeamDelta]:
+    """
+    Compare two exports of Spieler.csv. The players are matched by Passnummer or, if it is missing, by the normalized
+    name and birthdate, and by the Mannschaft. A player in several Mannschaften counts once per Mannschaft, so a player
+    that changed the Mannschaft (or one of its Mannschaften) is removed from the old and added to the new Mannschaft.
+    :param previous: previous Spieler.csv
+    :type previous: pd.DataFrame
+    :param current: current Spieler.csv
+    :type current: pd.DataFrame
+    :return: changes per (Verein, Mannschaft)
+    :rtype: dict[tuple[str, str], TeamDelta]
+    """
+    previous_records = _spieler_records(previous)
+    current_records = _spieler_records(current)
+    deltas: dict[tuple[str, str], TeamDelta] = dict()
+
+    def delta_for(row: dict) -> TeamDelta:
+        team = _team_of(row)
+        if team not in deltas:
+            deltas[team] = TeamDelta(*team)
+        return deltas[team]
+
+    for record_key, old_row in previous_records.items():
+        new_row = current_records.get(record_key)
+        if new_row is None:
+            delta_for(old_row).removed.append(old_row)
+        elif any(old_row[column] != new_row[column] for column in COMPARED_SPIELER_COLUMNS):
+            delta_for(new_row).changed.append((old_row, new_row))
+    for record_key, new_row in current_records.items():
+        if record_key not in previous_records:
+            delta_for(new_row).added.append(new_row)
+    return deltas
+
+
+def compute_mannschaften_delta(previous: pd.DataFrame, current: pd.DataFrame,
+                               deltas: dict[tuple[str, str], TeamDelta]) -> None:
+    """
+    Compare two exports of Mannschaften.csv and mark the Mannschaften with changed general data in deltas.
+    New Mannschaften are marked as well, removed Mannschaften are only reported.
+    """
+    columns = ["Verein", "Mannschaft"] + COMPARED_MANNSCHAFTEN_COLUMNS
+
+    def index(frame: pd.DataFrame) -> dict[tuple[str, str], dict]:
+        frame = frame.reindex(columns=columns).map(cell_str)
+        return {_team_of(row): row for row in frame.to_dict("records")}
+
+    previous_teams = index(previous)
+    current_teams = index(current)
+    for team, row in current_teams.items():
+        old_row = previous_teams.get(team)
+        if old_row is None or any(old_row[column] != row[column] for column in COMPARED_MANNSCHAFTEN_COLUMNS):
+            deltas.setdefault(team, TeamDelta(*team)).general_data_changed = True
+    for team in previous_teams.keys() - current_teams.keys():
+        logging.warning(f"Mannschaft {team[1]} ({team[0]}) ist nicht mehr in Mannschaften.csv. Datei bleibt bestehen.")
+
+
+def _update_player_from_csv(player: PlayerData, row: dict) -> PlayerData:
+    """
+    Take over the fields of Spieler.csv into an existing player. Fields that only exist in the .ini file (Letztes
+    Spiel, Platz-Ziffer, Spielernr. and Rangliste) are kept.
+    """
+    csv_player = PlayerData.create_player_from_csv(pd.Series(row))
+    return player.replace(name=csv_player.name, vorname=csv_player.vorname, geburtsjahr=csv_player.geburtsjahr,
+                          altersklasse=csv_player.altersklasse, passnummer=csv_player.passnummer,
+                          verein=csv_player.verein, verein_show=csv_player.verein_show)
+
+
+def _apply_team_delta(delta: TeamDelta, mannschaft: MannschaftData, num_min_players: int,
+                      min_placeholder: int = 0) -> None:
+    """
+    Apply the changes of delta to mannschaft. The Platzhalter players are rebuilt like in
+    ini_render.render_mannschaften, so a Mannschaft after the delta import looks like after a full import.
+    """
+    remove_keys = set()
+    for row in delta.removed:
+        remove_keys.update(_row_keys(row))
+    changed_rows: dict[str, dict] = dict()
+    for old_row, new_row in delta.changed:
+        for key in _row_keys(old_row):
+            changed_rows.setdefault(key, new_row)
+    updated_rows = []
+    players = []
+    for player in mannschaft.players:
+        if player.is_platzhalter() or player.key in remove_keys or player.name_key in remove_keys:
+            continue
+        row = changed_rows.get(player.key, changed_rows.get(player.name_key))
+        if row is not None:
+            try:
+                player = _update_player_from_csv(player, row)
+            except (ValueError, IndexError):
+                report("Spieler nicht verarbeitbar", f"{row['Name']} {row['Vorname']}", delta.file_name)
+            updated_rows.append(row)
+        players.append(player)
+    new_rows = delta.added + [new_row for _, new_row in delta.changed
+                              if not any(new_row is row for row in updated_rows)]
+    for row in new_rows:
+        try:
+            players.append(PlayerData.create_player_from_csv(pd.Series(row)))
+        except (ValueError, IndexError):
+            report("Spieler nicht verarbeitbar", f"{row['Name']} {row['Vorname']}", delta.file_name)
+    num_platzhalter = max(num_min_players - len(players), 0, min_placeholder)
+    mannschaft.general_data.anzahl_spieler = max(len(players), num_min_players)
+    mannschaft.players = players + [PlayerData.create_platzhalter(i) for i in range(1, num_platzhalter + 1)]
+
+
+def apply_delta(deltas: dict[tuple[str, str], TeamDelta], mannschaften_csv: pd.DataFrame, folder: str,
+                num_min_players: int = 10, min_placeholder: int = 0, encoding: str = "windows-1252") -> list[str]:
+    """
+    Apply the changes to the existing .ini files in folder. Only the affected Mannschaften are read and written.
+    The files are written to the out folder like all other writers do.
+    :param deltas: changes per (Verein, Mannschaft), see compute_spieler_delta
+    :type deltas: dict[tuple[str, str], TeamDelta]
+    :param mannschaften_csv: current Mannschaften.csv
+    :type mannschaften_csv: pd.DataFrame
+    :param folder: folder with the existing .ini files
+    :type folder: str
+    :param num_min_players: Minimum number of players. Missing players are filled with Platzhalter players.
+    :type num_min_players: int
+    :param min_placeholder: Minimum number of Platzhalter players. Default is 0
+    :type min_placeholder: int
+    :param encoding: encoding of the written files. Default is windows-1252
+    :type encoding: str
+    :return: names of the written files
+    :rtype: list[str]
+    """
+    general_rows = {(cell_str(row["Verein"]), cell_str(row["Mannschaft"])): row
+                    for _, row in mannschaften_csv.iterrows()}
+    written = []
+    for team, delta in deltas.items():
+        if delta.empty:
+            continue
+        final_name = get_final_name_for_mannschaften_file(*team)
+        file = Path(folder).joinpath(f"{delta.file_name}.ini")
+        mannschaft = None
+        if file.exists():
+            try:
+                mannschaft = read_finished_mannschaften(file)
+            except (FileIncompleteError, ValueError):
+                logging.warning(f"Datei {file} ist nicht lesbar. Mannschaft wird neu erstellt.")
+        if team in general_rows and (mannschaft is None or delta.general_data_changed):
+            general_data = GeneralData.create_from_csv(general_rows[team])
+            general_data.name = final_name
+            players = mannschaft.players if mannschaft is not None else []
+            mannschaft = MannschaftData(final_name, general_data, players)
+        if mannschaft is None:
+            logging.warning(f"Mannschaft {team[1]} ({team[0]}) weder in {folder} noch in Mannschaften.csv. "
+                            f"Änderungen werden übersprungen.")
+            continue
+        _apply_team_delta(delta, mannschaft, num_min_players, min_placeholder)
+        write_mannschaft_file_from_mannschaft_data(mannschaft.file_name, mannschaft, encoding=encoding)
+        written.append(mannschaft.file_name)
+    return written
+
+
+def print_delta_summary(deltas: dict[tuple[str, str], TeamDelta]) -> None:
+    changed = [delta for delta in deltas.values() if not delta.empty]
+    for delta in sorted(changed, key=lambda x: x.file_name):
+        print(f"\t{delta}")
+    print(f"{len(changed)} Mannschaften geändert: "
+          f"+{sum(len(delta.added) for delta in changed)} "
+          f"-{sum(len(delta.removed) for delta in changed)} "
+          f"~{sum(len(delta.changed) for delta in changed)} Spieler")
+
+
+def delta_import(previous_spieler: str, previous_mannschaften: str, folder: str, spieler: str = "Spieler",
+                 mannschaften: str = "Mannschaften", num_min_players: int = 10, min_placeholder: int = 0,
+                 encoding: str = "windows-1252") -> dict[tuple[str, str], TeamDelta]:
+    """
+    Import only the changes between the previous and the current export of Spieler.csv and Mannschaften.csv into the
+    existing .ini files of folder.
+    :param previous_spieler: name of the previous Spieler.csv
+    :type previous_spieler: str
+    :param previous_mannschaften: name of the previous Mannschaften.csv
+    :type previous_mannschaften: str
+    :param folder: folder with the existing .ini files
+    :type folder: str
+    :param spieler: name of the current Spieler.csv. Default is "Spieler"
+    :type spieler: str
+    :param mannschaften: name of the current Mannschaften.csv. Default is "Mannschaften"
+    :type mannschaften: str
+    :param num_min_players: Minimum number of players. Default is 10
+    :type num_min_players: int
+    :param min_placeholder: Minimum number of Platzhalter players. Default is 0
+    :type min_placeholder: int
+    :param encoding: encoding of the written files. Default is windows-1252
+    :type encoding: str
+    :return: changes per (Verein, Mannschaft)
+    :rtype: dict[tuple[str, str], TeamDelta]
+    """
+    current_mannschaften = read_csv(mannschaften)
+    deltas = compute_spieler_delta(read_csv(previous_spieler), read_csv(spieler))
+    compute_mannschaften_delta(read_csv(previous_mannschaften), current_mannschaften, deltas)
+    apply_delta(deltas, current_mannschaften, folder, num_min_players, min_placeholder, encoding)
+    print_delta_summary(deltas)
+    return deltas
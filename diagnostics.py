@@ -0,0 +1,178 @@
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+_active: list['Diagnostics'] = []
+
+
+class Diagnostics:
+    """
+    Collector for the messages of a run. Instead of one log entry per row, the messages are counted by category and
+    by Mannschaft and only a few examples per category are kept. The first live_limit messages of a category are still
+    logged immediately, the rest appears in one summary at the end of the run.
+    With a detail file every message is written as one JSON line (level, category, team, detail).
+    """
+
+    def __init__(self, max_samples: int = 5, live_limit: int = 1, detail_path: Path = None,
+                 keep_details: bool = False):
+        self.max_samples = max_samples
+        self.live_limit = live_limit
+        self.counts: Counter[str] = Counter()
+        self.team_counts: dict[str, Counter[str]] = dict()
+        self.levels: dict[str, int] = dict()
+        self.samples: dict[str, list[str]] = dict()
+        self.details: list[dict] | None = [] if keep_details else None
+        self._detail_file = None
+        if detail_path is not None:
+            Path(detail_path).parent.mkdir(parents=True, exist_ok=True)
+            self._detail_file = open(detail_path, "w", encoding="utf-8")
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def keeps_details(self) -> bool:
+        """
+        Every message is kept, in the detail file or in memory.
+        """
+        return self._detail_file is not None or self.details is not None
+
+    @property
+    def level(self) -> int:
+        return max(self.levels.values(), default=logging.INFO)
+
+    def report(self, category: str, detail: str = "", team: str = None, level: int = logging.WARNING) -> None:
+        """
+        Count a message.
+        :param category: kind of the message, e.g. "Spieler nicht verarbeitbar"
+        :type category: str
+        :param detail: the concrete case, e.g. the player or the line
+        :type detail: str
+        :param team: Mannschaft (or file) of the message. Default is None
+        :type team: str
+        :param level: logging level. Default is logging.WARNING
+        :type level: int
+        """
+        self.counts[category] += 1
+        self.levels[category] = max(self.levels.get(category, level), level)
+        if team:
+            self.team_counts.setdefault(category, Counter())[team] += 1
+        samples = self.samples.setdefault(category, [])
+        if len(samples) < self.max_samples:
+            samples.append(f"{team}: {detail}" if team else detail)
+        if self.counts[category] <= self.live_limit:
+            logging.log(level, f"{category}: {detail}" + (f" ({team})" if team else "") +
+                        " - weitere Fälle werden gezählt")
+        if self.keeps_details:
+            self._write_detail({"level": logging.getLevelName(level), "category": category, "team": team,
+                                "detail": detail})
+
+    def _write_detail(self, record: dict) -> None:
+        if self._detail_file is not None:
+            self._detail_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if self.details is not None:
+            self.details.append(record)
+
+    def merge(self, other: 'Diagnostics') -> None:
+        """
+        Take over the counts, examples and details of another collector, e.g. of a worker process.
+        """
+        self.counts.update(other.counts)
+        for category, teams in other.team_counts.items():
+            self.team_counts.setdefault(category, Counter()).update(teams)
+        for category, level in other.levels.items():
+            self.levels[category] = max(self.levels.get(category, level), level)
+        for category, samples in other.samples.items():
+            own = self.samples.setdefault(category, [])
+            own.extend(samples[:max(self.max_samples - len(own), 0)])
+        for record in other.details or []:
+            self._write_detail(record)
+
+    def summary(self, max_teams: int = 5) -> str:
+        lines = [f"Diagnose: {self.total} Meldungen in {len(self.counts)} Kategorien"]
+        for category, count in self.counts.most_common():
+            teams = self.team_counts.get(category, Counter())
+            team_str = ", ".join(f"{team}: {team_count}" for team, team_count in teams.most_common(max_teams))
+            if len(teams) > max_teams:
+                team_str += f", +{len(teams) - max_teams} weitere"
+            lines.append(f"  [{logging.getLevelName(self.levels[category])}] {category}: {count}" +
+                         (f" ({team_str})" if team_str else ""))
+            lines.append(f"    Beispiele: {'; '.join(self.samples[category])}")
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self._detail_file is not None:
+            self._detail_file.close()
+            self._detail_file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_detail_file"] = None
+        return state
+
+
+@contextmanager
+def collect_diagnostics(detail_path: Path = None, max_samples: int = 5, live_limit: int = 1,
+                        log_summary: bool = True, keep_details: bool = False):
+    """
+    Collect all messages of report in the with block and log one summary at the end.
+    :param detail_path: JSON lines file for all messages. Default is None, no file
+    :type detail_path: Path
+    :param max_samples: number of examples per category. Default is 5
+    :type max_samples: int
+    :param live_limit: number of messages per category that are logged immediately. Default is 1
+    :type live_limit: int
+    :param log_summary: log the summary at the end. Default is True
+    :type log_summary: bool
+    :param keep_details: keep all messages in memory (for merging into another collector). Default is False
+    :type keep_details: bool
+    :return: the collector
+    """
+    diagnostics = Diagnostics(max_samples, live_limit, detail_path, keep_details)
+    _active.append(diagnostics)
+    try:
+        yield diagnostics
+    finally:
+        _active.remove(diagnostics)
+        diagnostics.close()
+        if log_summary and diagnostics.total > 0:
+            logging.log(diagnostics.level, diagnostics.summary())
+
+
+def diagnostics_scope(**kwargs):
+    """
+    collect_diagnostics with the given arguments if no collector is active, otherwise the active collector is used.
+    """
+    return collect_diagnostics(**kwargs) if not _active else nullcontext(_active[-1])
+
+
+def report(category: str, detail: str = "", team: str = None, level: int = logging.WARNING) -> None:
+    """
+    Report a message to the active collector (see collect_diagnostics). Without collector the message is logged
+    directly.
+    """
+    if _active:
+        _active[-1].report(category, detail, team, level)
+    else:
+        logging.log(level, f"{category}: {detail}" + (f" ({team})" if team else ""))
+
+
+def details_wanted() -> bool:
+    """
+    The active collector keeps every message (see Diagnostics.keeps_details). A worker process only needs to return
+    its details in this case, otherwise counts and examples are enough.
+    """
+    return bool(_active) and _active[-1].keeps_details
+
+
+def merge_diagnostics(other: Diagnostics) -> None:
+    """
+    Merge a collector (e.g. returned by a worker process) into the active collector or log its summary.
+    """
+    if _active:
+        _active[-1].merge(other)
+    elif other.total > 0:
+        logging.log(other.level, other.summary())
@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from file_lock import atomic_write
+from progress import track
+
+KCC_ENCODING = "windows-1252"
+ASCII = "ascii"
+UTF8 = "utf-8"
+UTF8_BOM = "utf-8-sig"
+UTF16 = "utf-16"
+LATIN1 = "latin-1"
+
+STATUS_UNCHANGED = "unverändert"
+STATUS_TRANSCODED = "umkodiert"
+STATUS_FAILED = "nicht umkodierbar"
+
+_BOMS = [(b"\xef\xbb\xbf", UTF8_BOM), (b"\xff\xfe", UTF16), (b"\xfe\xff", UTF16)]
+_verdicts: dict[Path, tuple[tuple[int, int], str]] = dict()
+_verdicts_lock = threading.Lock()
+
+
+def detect_encoding_bytes(data: bytes) -> str:
+    """
+    Detect the encoding of the content of a .ini or csv file. A BOM decides directly. Otherwise the bytes are checked
+    once: pure ASCII, valid UTF-8, or the single byte encoding of the Kegel-Control-Center. Umlauts in windows-1252
+    (e.g. 0xfc for "ü") are never valid UTF-8, so a file that decodes as UTF-8 was written as UTF-8.
+    :param data: content of the file
+    :type data: bytes
+    :return: ASCII, UTF8, UTF8_BOM, UTF16, KCC_ENCODING or LATIN1 (bytes that are undefined in windows-1252)
+    :rtype: str
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+    if data.isascii():
+        return ASCII
+    try:
+        data.decode(UTF8)
+        return UTF8
+    except UnicodeDecodeError:
+        pass
+    try:
+        data.decode(KCC_ENCODING)
+        return KCC_ENCODING
+    except UnicodeDecodeError:
+        return LATIN1
+
+
+def _signature(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _cached_verdict(path: Path, signature: tuple[int, int]) -> str | None:
+    with _verdicts_lock:
+        entry = _verdicts.get(path)
+    return entry[1] if entry is not None and entry[0] == signature else None
+
+
+def _remember_verdict(path: Path, signature: tuple[int, int], encoding: str) -> None:
+    with _verdicts_lock:
+        _verdicts[path] = (signature, encoding)
+
+
+def detect_encoding(file: Path) -> str:
+    """
+    Encoding of the file, see detect_encoding_bytes. The verdict is cached per file as long as size and modification
+    time are unchanged, so the file is only read again after it changed.
+    :param file: path to the file
+    :type file: Path
+    :return: the encoding
+    :rtype: str
+    """
+    path = Path(file).resolve()
+    signature = _signature(path)
+    encoding = _cached_verdict(path, signature)
+    if encoding is None:
+        encoding = detect_encoding_bytes(path.read_bytes())
+        _remember_verdict(path, signature, encoding)
+    return encoding
+
+
+def read_text(file: Path) -> str:
+    """
+    Read a text file with its detected encoding (see detect_encoding). The file is read once, the bytes are used for
+    the detection and the decoding.
+    :param file: path to the file
+    :type file: Path
+    :return: content of the file
+    :rtype: str
+    """
+    path = Path(file).resolve()
+    signature = _signature(path)
+    data = path.read_bytes()
+    encoding = _cached_verdict(path, signature)
+    if encoding is None:
+        encoding = detect_encoding_bytes(data)
+        _remember_verdict(path, signature, encoding)
+    return data.decode(encoding)
+
+
+class TranscodeResult:
+    """
+    Result of the transcoding of one file: the detected encoding and the status (STATUS_UNCHANGED, STATUS_TRANSCODED
+    or STATUS_FAILED with the reason in message).
+    """
+
+    def __init__(self, file_name: str, encoding: str, status: str, message: str = ""):
+        self.file_name = file_name
+        self.encoding = encoding
+        self.status = status
+        self.message = message
+
+    def __str__(self):
+        message = f" ({self.message})" if self.message else ""
+        return f"{self.file_name}: {self.encoding} -> {self.status}{message}"
+
+
+def transcode_file(file: Path, target: str = KCC_ENCODING, dry_run: bool = False) -> TranscodeResult:
+    """
+    Rewrite the file in the target encoding if it is not already readable as such. ASCII files and files in the target
+    encoding are not touched. A file with characters that do not exist in the target encoding is not rewritten.
+    :param file: path to the file
+    :type file: Path
+    :param target: target encoding. Default is KCC_ENCODING
+    :type target: str
+    :param dry_run: only detect, do not write. Default is False
+    :type dry_run: bool
+    :return: the result
+    :rtype: TranscodeResult
+    """
+    data = file.read_bytes()
+    encoding = detect_encoding_bytes(data)
+    if encoding in (ASCII, target):
+        return TranscodeResult(file.name, encoding, STATUS_UNCHANGED)
+    try:
+        converted = data.decode(encoding).encode(target)
+    except UnicodeError as error:
+        return TranscodeResult(file.name, encoding, STATUS_FAILED, str(error))
+    if not dry_run:
+        with atomic_write(file, binary=True) as target_file:
+            target_file.write(converted)
+    return TranscodeResult(file.name, encoding, STATUS_TRANSCODED)
+
+
+def _transcode_file_task(args: tuple[Path, str, bool]) -> TranscodeResult:
+    return transcode_file(*args)
+
+
+def transcode_folder(folder_name: str, target: str = KCC_ENCODING, suffixes: tuple[str, ...] = (".ini",),
+                     workers: int = None, dry_run: bool = False, progress: callable = None) -> list[TranscodeResult]:
+    """
+    Bring all files of the folder with the given suffixes to the target encoding on a process pool. Every file is read
+    once, only files in another encoding are written (atomically, see atomic_write).
+    :param folder_name: folder with the files
+    :type folder_name: str
+    :param target: target encoding. Default is KCC_ENCODING, the encoding of the Kegel-Control-Center
+    :type target: str
+    :param suffixes: suffixes of the files. Default is (".ini",)
+    :type suffixes: tuple[str, ...]
+    :param workers: number of processes. Default is None, the number of CPUs. With 1 the files are processed in this
+    process
+    :type workers: int
+    :param dry_run: only detect the encodings, do not write. Default is False
+    :type dry_run: bool
+    :param progress: callback for the progress, see progress.track
+    :type progress: callable
+    :return: the results ordered by file name
+    :rtype: list[TranscodeResult]
+    :raises FileNotFoundError: if the folder does not exist
+    """
+    folder = Path(folder_name)
+    if not folder.exists():
+        logging.error(f"Folder {folder} does not exist")
+        raise FileNotFoundError(f"Folder {folder} does not exist")
+    tasks = [(file, target, dry_run) for file in sorted(folder.iterdir()) if file.suffix in suffixes]
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if workers <= 1 or len(tasks) < 2:
+        return list(track(map(_transcode_file_task, tasks), "Umkodieren", len(tasks), progress))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_transcode_file_task, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+        return list(track(results, "Umkodieren", len(tasks), progress))
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from diagnostics import report
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # Linux, macOS
+    msvcrt = None
+
+# next to the snapshot store .mks_history, so no lock files end up in out/ or in the Kegel-Control-Center folder
+LOCK_DIR = Path(".mks_locks")
+# the lock files of all paths are spread over this many files, unrelated paths on the same lock file just wait
+_LOCK_STRIPES = 256
+_held_locks: dict[Path, int] = dict()
+
+
+def _lock_file(path: Path) -> Path:
+    digest = hashlib.sha1(str(Path(path).resolve()).encode("utf-8")).hexdigest()
+    return LOCK_DIR.joinpath(f"{int(digest, 16) % _LOCK_STRIPES:02x}.lock")
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Hold an exclusive advisory lock for the given file, so other runs of the tool (or other worker processes) that
+    write the same file wait until the lock is released. The lock file is in LOCK_DIR, not next to the file. The lock
+    is reentrant within a process, so a caller can hold it around its check and atomic_write takes it again.
+    On Linux and macOS fcntl.flock is used, on Windows msvcrt.locking. Without both the lock is a no-op.
+    :param path: file to lock
+    :type path: Path
+    """
+    lock_path = _lock_file(path)
+    if _held_locks.get(lock_path, 0) > 0:
+        _held_locks[lock_path] += 1
+        try:
+            yield
+        finally:
+            _held_locks[lock_path] -= 1
+        return
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        _held_locks[lock_path] = 1
+        try:
+            yield
+        finally:
+            _held_locks.pop(lock_path, None)
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_mode(path: Path) -> int:
+    """
+    Mode for the new version of path: the mode of the existing file or the default mode of new files (umask).
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_write(path: Path, encoding: str = "utf-8", newline: str = None, binary: bool = False,
+                 fsync: bool = False):
+    """
+    Open a temporary file next to path for writing and replace path with it when the block finishes without error.
+    Readers see either the old or the new file. If the block raises, the temporary file is removed and path stays
+    untouched. The whole block runs under file_lock(path): a second writer of the same file waits and then replaces
+    the file again, so the last writer wins, but the content of two writers is never mixed. Callers that decide
+    whether to write at all (e.g. after asking before overwriting) have to hold file_lock(path) around that check.
+    :param path: final path of the file
+    :type path: Path
+    :param encoding: encoding of the file. Default is utf-8
+    :type encoding: str
+    :param newline: newline argument of open
+    :type newline: str
+    :param binary: open the file in binary mode, encoding and newline are ignored. Default is False
+    :type binary: bool
+    :param fsync: flush the file to the disk before the replace. Default is False, bulk writers do not pay for it
+    :type fsync: bool
+    :return: file object of the temporary file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(path):
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with (open(fd, "wb") if binary else open(fd, "w", encoding=encoding, newline=newline)) as file:
+                yield file
+                if fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.chmod(temp_name, _file_mode(path))  # mkstemp creates the file only readable for the owner
+            if path.exists():
+                report("Datei überschrieben", path.name)
+            os.replace(temp_name, path)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
@@ -0,0 +1,224 @@
+import logging
+import re
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from csv_files import write_csv
+from date_parsing import birthdate_in_past, date_parsing_from_str
+from file_encoding import detect_encoding_bytes
+from mannschaft import player_key
+from progress import track
+
+DIFF_COLUMNS = ["Datei", "Art", "Spieler", "Feld", "Alt", "Neu"]
+
+_SECTION_HEADER = re.compile(r"^\[([^\]\n]*)\][ \t]*\r?$", re.MULTILINE)
+_PLATZHALTER_NAME = re.compile(r"Name ?\d+$")
+_PLATZHALTER_VORNAME = re.compile(r"Vorname ?\d+$")
+
+
+class PlayerChange:
+    """
+    A player that is in both versions of a Mannschaft with different values. changes lists (field, old, new).
+    """
+
+    def __init__(self, label: str, changes: list[tuple[str, str, str]]):
+        self.label = label
+        self.changes = changes
+
+    def __str__(self):
+        return f"{self.label}: " + ", ".join(f"{field} '{old}' -> '{new}'" for field, old, new in self.changes)
+
+
+class TeamDiff:
+    """
+    Difference of one Mannschaft (file) between two folders. A Mannschaft that is only in one folder is added or
+    removed as a whole, otherwise the changed general fields and the added, removed and modified players are listed.
+    Platzhalter players are not compared.
+    """
+
+    def __init__(self, file_name: str, team_added: bool = False, team_removed: bool = False):
+        self.file_name = file_name
+        self.team_added = team_added
+        self.team_removed = team_removed
+        self.general: list[tuple[str, str, str]] = []
+        self.added: list[str] = []
+        self.removed: list[str] = []
+        self.modified: list[PlayerChange] = []
+
+    @property
+    def empty(self) -> bool:
+        return not (self.team_added or self.team_removed or self.general or self.added or self.removed or
+                    self.modified)
+
+    def rows(self) -> list[dict]:
+        """
+        The differences as rows with DIFF_COLUMNS.
+        """
+        rows = []
+        if self.team_added:
+            rows.append([self.file_name, "Mannschaft neu", "", "", "", ""])
+        if self.team_removed:
+            rows.append([self.file_name, "Mannschaft entfernt", "", "", "", ""])
+        rows += [[self.file_name, "Allgemein", "", field, old, new] for field, old, new in self.general]
+        rows += [[self.file_name, "Spieler neu", label, "", "", ""] for label in self.added]
+        rows += [[self.file_name, "Spieler entfernt", label, "", "", ""] for label in self.removed]
+        rows += [[self.file_name, "Spieler geändert", change.label, field, old, new]
+                 for change in self.modified for field, old, new in change.changes]
+        return [dict(zip(DIFF_COLUMNS, row)) for row in rows]
+
+    def __str__(self):
+        if self.team_added or self.team_removed:
+            return f"{self.file_name}: Mannschaft {'neu' if self.team_added else 'entfernt'}"
+        lines = [f"{self.file_name}:"]
+        lines += [f"\tAllgemein {field}: '{old}' -> '{new}'" for field, old, new in self.general]
+        lines += [f"\t+ {label}" for label in self.added]
+        lines += [f"\t- {label}" for label in self.removed]
+        lines += [f"\t~ {change}" for change in self.modified]
+        return "\n".join(lines)
+
+
+def _decode(data: bytes) -> str:
+    return data.decode(detect_encoding_bytes(data))
+
+
+def _split_sections(text: str) -> tuple[str | None, list[str]]:
+    """
+    Split a .ini text into the body of [Allgemein] and the bodies of the player sections. The headers of the player
+    sections are dropped, so a player that only moved to another number has the same body.
+    """
+    parts = _SECTION_HEADER.split(text)
+    general = None
+    players = []
+    for header, body in zip(parts[1::2], parts[2::2]):
+        body = body.strip()
+        if header == "Allgemein":
+            general = body
+        else:
+            players.append(body)
+    return general, players
+
+
+def _parse_section(body: str) -> dict[str, str]:
+    values = dict()
+    for line in body.splitlines():
+        key, separator, value = line.partition("=")
+        if separator:
+            values[key.strip()] = value.strip()
+    return values
+
+
+def _is_platzhalter(values: dict[str, str]) -> bool:
+    return _PLATZHALTER_NAME.match(values.get("Name", "")) is not None and \
+        _PLATZHALTER_VORNAME.match(values.get("Vorname", "")) is not None
+
+
+def _section_key(values: dict[str, str]) -> str:
+    """
+    Key of a player section like PlayerData.key, the birthdate is read like in read_finished_mannschaften.
+    """
+    try:
+        geburtsjahr = date_parsing_from_str(values.get("Geb.-Jahr", ""))
+    except (ValueError, IndexError):
+        geburtsjahr = None
+    return player_key(values.get("Name", ""), values.get("Vorname", ""), birthdate_in_past(geburtsjahr),
+                      values.get("Pass-Nr.", ""))
+
+
+def _label(values: dict[str, str]) -> str:
+    label = f"{values.get('Name', '')} {values.get('Vorname', '')}"
+    return label + (f" ({values['Pass-Nr.']})" if values.get("Pass-Nr.") else "")
+
+
+def _field_changes(old: dict[str, str], new: dict[str, str]) -> list[tuple[str, str, str]]:
+    return [(field, old.get(field, ""), new.get(field, "")) for field in dict.fromkeys([*old, *new])
+            if old.get(field, "") != new.get(field, "")]
+
+
+def diff_mannschaft_texts(file_name: str, old: bytes, new: bytes) -> TeamDiff:
+    """
+    Compare two versions of a .ini file. Identical files are not decoded. Otherwise every section is compared by its
+    content first (independent of the number of the player section), only sections without an equal counterpart are
+    parsed. Players are matched by Passnummer or name and birth month, see mannschaft.player_key.
+    :param file_name: name of the file
+    :type file_name: str
+    :param old: old content
+    :type old: bytes
+    :param new: new content
+    :type new: bytes
+    :return: the differences
+    :rtype: TeamDiff
+    """
+    diff = TeamDiff(file_name)
+    if old == new:
+        return diff
+    old_general, old_players = _split_sections(_decode(old))
+    new_general, new_players = _split_sections(_decode(new))
+    if old_general != new_general:
+        diff.general = _field_changes(_parse_section(old_general or ""), _parse_section(new_general or ""))
+    old_counts, new_counts = Counter(old_players), Counter(new_players)
+    removed = [_parse_section(body) for body in (old_counts - new_counts).elements()]
+    added = [_parse_section(body) for body in (new_counts - old_counts).elements()]
+    old_by_key: dict[str, list[dict[str, str]]] = dict()
+    for values in removed:
+        if not _is_platzhalter(values):
+            old_by_key.setdefault(_section_key(values), []).append(values)
+    for values in added:
+        if _is_platzhalter(values):
+            continue
+        candidates = old_by_key.get(_section_key(values))
+        if candidates:
+            old_values = candidates.pop(0)
+            changes = _field_changes(old_values, values)
+            if changes:
+                diff.modified.append(PlayerChange(_label(values), changes))
+        else:
+            diff.added.append(_label(values))
+    diff.removed = [_label(values) for candidates in old_by_key.values() for values in candidates]
+    return diff
+
+
+def diff_folders(old_folder: str, new_folder: str, progress: callable = None) -> list[TeamDiff]:
+    """
+    Compare the .ini files of two folders, e.g. the Mannschaften folder and out/ after a correction. Files with the
+    same content are skipped after a byte comparison, see diff_mannschaft_texts for the rest.
+    :param old_folder: folder with the old versions
+    :type old_folder: str
+    :param new_folder: folder with the new versions
+    :type new_folder: str
+    :param progress: callback for the progress, see progress.track
+    :type progress: callable
+    :return: the Mannschaften with differences, ordered by file name
+    :rtype: list[TeamDiff]
+    :raises FileNotFoundError: if a folder does not exist
+    """
+    folders = [Path(old_folder), Path(new_folder)]
+    for folder in folders:
+        if not folder.exists():
+            logging.error(f"Folder {folder} does not exist")
+            raise FileNotFoundError(f"Folder {folder} does not exist")
+    old_files, new_files = [{file.name: file for file in folder.iterdir() if file.suffix == ".ini"}
+                            for folder in folders]
+    diffs = []
+    for name in track(sorted(old_files.keys() | new_files.keys()), "Vergleichen", callback=progress):
+        if name not in new_files:
+            diffs.append(TeamDiff(name, team_removed=True))
+        elif name not in old_files:
+            diffs.append(TeamDiff(name, team_added=True))
+        else:
+            diff = diff_mannschaft_texts(name, old_files[name].read_bytes(), new_files[name].read_bytes())
+            if not diff.empty:
+                diffs.append(diff)
+    return diffs
+
+
+def write_folder_diff(diffs: list[TeamDiff]) -> str:
+    """
+    Write the differences to out/Vergleich_[Datum].csv.
+    :return: name of the file
+    :rtype: str
+    """
+    today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
+    write_csv([row for diff in diffs for row in diff.rows()], f"Vergleich_{today}")
+    return f"Vergleich_{today}.csv"
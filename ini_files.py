@@ -1,12 +1,16 @@
 import datetime
 import logging
 import re
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 import pandas as pd
 
-from date_parsing import date_parsing_from_word_str, date_parsing_from_str
+from date_parsing import birthdate_in_past, date_parsing_from_word_str, date_parsing_from_str
+from diagnostics import report
 from exceptions import FileIncompleteError
+from file_encoding import KCC_ENCODING, read_text
+from file_lock import atomic_write
 from mannschaft import PlayerData, MannschaftData, GeneralData
 
 
@@ -38,13 +42,28 @@ def _correct_str(string: str, with_underscore=None, remove=None, with_space=None
     return re.sub(remove, "", temp)
 
 
+def get_mannschaft_file_name(name: str) -> str:
+    """
+    Return the file name (without the .ini ending) that is used for a Mannschaft with the given name.
+    :param name: name of the Mannschaft or the file
+    :type name: str
+    :return: corrected file name without the .ini ending
+    :rtype: str
+    """
+    file_name = _correct_str(name)
+    if file_name.endswith(".ini"):
+        file_name = file_name[:-4]
+    return file_name
+
+
 def get_player_str(number: int, player: PlayerData, date_format: str = "%d/%m/%Y") -> str:
     if not player.valid:
         raise ValueError("Player is not valid")
     geburtsjahr = player.geburtsjahr
     geburtsjahr_str = player.geburtsjahr.strftime(date_format) if geburtsjahr is not None else ""
     if geburtsjahr is not None and geburtsjahr >= datetime.date(2000, 1, 1):
-        logging.info(f"Date of birth for player {player.name} {player.vorname} is after 2000. Write complete.")
+        report("Geburtsdatum nach 2000, vollständig geschrieben", f"{player.name} {player.vorname}",
+               level=logging.INFO)
         geburtsjahr_str = geburtsjahr.strftime("%m/%Y")
     return f"""[Spieler {number}]
 Name={player.name}
@@ -72,7 +91,7 @@ def get_player_str_from_csv(number: int, data: pd.Series) -> str:
     verein = data["Verein"] if data["Verein_angezeigt"] == "" else data["Verein_angezeigt"]
     geburtsjahr_str = geburtsjahr.strftime("%d/%m/%Y") if geburtsjahr is not None else ""
     if geburtsjahr is not None and geburtsjahr >= datetime.date(2000, 1, 1):
-        logging.info(f"Date of birth for player {name} {vorname} is after 2000. Write complete.")
+        report("Geburtsdatum nach 2000, vollständig geschrieben", f"{name} {vorname}", level=logging.INFO)
         geburtsjahr_str = geburtsjahr.strftime("%d/%m/%YYYY")
     return f"""[Spieler {number}]
 Name={name}
@@ -172,8 +191,8 @@ def read_finished_mannschaften(file: Path) -> MannschaftData:
     if file.suffix != ".ini":
         logging.error(f"File {file} is not a .ini file")
         raise ValueError("File is not a .ini file")
-    with open(file, "r") as f:
-        lines = f.read().splitlines()
+    # the encoding is detected, the files are written as windows-1252 or (by older versions) as utf-8
+    lines = read_text(file).splitlines()
     # general info
     if len(lines) < 11:
         logging.error(f"File {file} has not enough lines")
@@ -193,19 +212,48 @@ def read_finished_mannschaften(file: Path) -> MannschaftData:
         try:
             geburtsjahr = date_parsing_from_str(geburtsjahr_str)
         except ValueError:
-            logging.warning(f"Could not parse date {geburtsjahr_str} for player {name} {vorname}. Setting to None.")
+            report("Geburtsdatum nicht lesbar, wird geleert", f"{geburtsjahr_str} bei {name} {vorname}", file.stem)
             geburtsjahr = None
+        geburtsjahr = birthdate_in_past(geburtsjahr)
         players.append(PlayerData(name, vorname, letztes_spiel, platz_ziffer, spielernr, geburtsjahr,
                                   altersklasse, passnummer, rangliste, verein)
                        )
     return MannschaftData(file_name=file.stem, general_data=general_data, players=players)
 
 
+def iter_folder_mannschaften(folder_name: str) -> Iterator[MannschaftData]:
+    """
+    Read the .ini files in the given folder one after another. Only one MannschaftData object is held in memory at a
+    time. Files that can not be read are skipped.
+    :param folder_name: name of the folder to read the .ini files from. The path is absolute or relative to the current
+    working directory
+    :type folder_name: str
+    :return: iterator over the MannschaftData objects
+    :rtype: Iterator[MannschaftData]
+    :raises FileNotFoundError: if the folder does not exist
+    """
+    folder = Path(folder_name)
+    if not folder.exists():
+        logging.error(f"Folder {folder} does not exist")
+        raise FileNotFoundError(f"Folder {folder} does not exist")
+    return _iter_mannschaften_files(file for file in folder.iterdir() if file.suffix == ".ini")
+
+
+def _iter_mannschaften_files(files: Iterable[Path]) -> Iterator[MannschaftData]:
+    for file in files:
+        try:
+            yield read_finished_mannschaften(file)
+        except (FileIncompleteError, ValueError) as error:
+            report("Datei nicht lesbar, übersprungen (Details mit 'Mannschaften prüfen')", str(error), file.stem)
+            continue
+
+
 def write_mannschaft_file_from_mannschaft_data(name: str, mannschaft: MannschaftData, sort: bool = True,
-                                               platzhalter_am_ende: bool = True, encoding="utf-8",
+                                               platzhalter_am_ende: bool = True, encoding=KCC_ENCODING,
                                                date_format: str = "%m/%y") -> None:
     """
-    Write a .ini file with the given name and the given MannschaftData object
+    Write a .ini file with the given name and the given MannschaftData object.
+    The file is written to a temporary file first and then moved to out/, see atomic_write
     :param date_format:  format of the date. Default is mm/yy
     :type date_format:  str
     :param name: Name of the .ini file
@@ -216,19 +264,13 @@ def write_mannschaft_file_from_mannschaft_data(name: str, mannschaft: Mannschaft
     :type sort: bool
     :param platzhalter_am_ende:
     :type platzhalter_am_ende:
-    :param encoding: encoding of the file. Default is utf-8
+    :param encoding: encoding of the file. Default is windows-1252, the encoding of the Kegel-Control-Center
     :type encoding: str
     :return: nothing
     :rtype: None
     """
-    file_name = _correct_str(name)
-    if file_name.endswith(".ini"):
-        file_name = file_name[:-4]
-    if not Path("out").exists():
-        Path("out").mkdir()
-    if Path(f"out/{file_name}.ini").exists():
-        logging.warning(f"File {file_name}.ini already exists. Overwriting.")
-    with open(f"out/{file_name}.ini", "w", encoding=encoding) as f:
+    file_name = get_mannschaft_file_name(name)
+    with atomic_write(Path(f"out/{file_name}.ini"), encoding=encoding) as f:
         f.write(get_general_info_str_from_mannschaft_data(mannschaft))
         if platzhalter_am_ende and sort:
             normal_players = [player for player in mannschaft.players if not player.is_platzhalter()]
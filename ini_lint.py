@@ -0,0 +1,255 @@
+import logging
+import os
+import re
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from csv_files import write_csv
+from date_parsing import date_parsing_from_str
+from progress import track
+
+GENERAL_SECTION = "Allgemein"
+GENERAL_KEYS = ["Name", "Spielklasse", "Liga", "Bezirk", "Spielführer", "Betreuer 1", "Vereins-Nr", "LV-Nr",
+                "Anzahl Spieler"]
+PLAYER_KEYS = ["Name", "Vorname", "Letztes Spiel", "Platz-Ziffer", "Spielernr.", "Geb.-Jahr", "Altersklasse",
+               "Pass-Nr.", "Rangliste", "Verein"]
+ERROR = "Fehler"
+WARNING = "Warnung"
+ISSUE_COLUMNS = ["Datei", "Zeile", "Schwere", "Prüfung", "Meldung"]
+
+_PLAYER_SECTION = re.compile(r"Spieler (\d+)$")
+_WRITTEN_DATE = re.compile(r"(0[1-9]|1[0-2])/(\d{2}|\d{4})$")
+_UTF8_SEQUENCE = re.compile(rb"[\xc2-\xf4][\x80-\xbf]")
+
+
+class LintIssue:
+    """
+    A problem of a .ini file. line is the line number in the file (starting at 1), 0 for the file as a whole.
+    severity is ERROR if read_finished_mannschaften reads the file wrong or not at all, otherwise WARNING.
+    """
+
+    def __init__(self, file_name: str, line: int, severity: str, check: str, message: str):
+        self.file_name = file_name
+        self.line = line
+        self.severity = severity
+        self.check = check
+        self.message = message
+
+    def as_dict(self) -> dict:
+        return dict(zip(ISSUE_COLUMNS, [self.file_name, self.line, self.severity, self.check, self.message]))
+
+    def __eq__(self, other):
+        return isinstance(other, LintIssue) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"LintIssue({self.file_name!r}, {self.line}, {self.severity!r}, {self.check!r}, {self.message!r})"
+
+    def __str__(self):
+        return f"{self.file_name}:{self.line}: {self.severity} [{self.check}] {self.message}"
+
+
+def _is_utf8(line: bytes) -> bool:
+    try:
+        line.decode("utf-8")
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _decode(data: bytes, file_name: str, issues: list[LintIssue]) -> str:
+    """
+    Decode the content like the Kegel-Control-Center (windows-1252) and report encoding problems.
+    """
+    if data.startswith(b"\xef\xbb\xbf"):
+        issues.append(LintIssue(file_name, 1, ERROR, "Kodierung", "UTF-8-BOM am Dateianfang"))
+        data = data[3:]
+    if _UTF8_SEQUENCE.search(data) is not None:
+        # umlauts in windows-1252 are never valid UTF-8, so a non-ASCII line that decodes as UTF-8 was written as UTF-8
+        utf8_lines = [number for number, line in enumerate(data.split(b"\n"), start=1)
+                      if not line.isascii() and _is_utf8(line)]
+        if utf8_lines:
+            issues.append(LintIssue(file_name, utf8_lines[0], WARNING, "Kodierung",
+                                    f"{len(utf8_lines)} Zeile(n) UTF-8 statt windows-1252 kodiert, Umlaute werden "
+                                    f"falsch angezeigt"))
+            if _is_utf8(data):
+                # check the structure of a file written completely in UTF-8 with its own encoding
+                return data.decode("utf-8")
+    try:
+        return data.decode("windows-1252")
+    except UnicodeDecodeError as error:
+        issues.append(LintIssue(file_name, data[:error.start].count(b"\n") + 1, ERROR, "Kodierung",
+                                f"Byte 0x{data[error.start]:02x} ist kein windows-1252-Zeichen"))
+        return data.decode("windows-1252", errors="replace")
+
+
+def _check_section(file_name: str, section: str, header_line: int, entries: list[tuple[int, str, str]],
+                   expected_keys: list[str], issues: list[LintIssue]) -> dict[str, tuple[int, str]]:
+    """
+    Compare the keys of a section with the expected keys in the expected order.
+    :return: key -> (line, value) of the section
+    """
+    keys = [key for _, key, _ in entries]
+    if keys != expected_keys:
+        for position, (line, key, _) in enumerate(entries):
+            if key not in expected_keys:
+                issues.append(LintIssue(file_name, line, ERROR, "Schlüssel", f"Unbekannter Schlüssel '{key}' in "
+                                                                                f"[{section}]"))
+            elif keys.count(key) > 1 and keys.index(key) != position:
+                issues.append(LintIssue(file_name, line, ERROR, "Schlüssel", f"Schlüssel '{key}' doppelt in "
+                                                                                f"[{section}]"))
+            elif position >= len(expected_keys) or expected_keys[position] != key:
+                issues.append(LintIssue(file_name, line, ERROR, "Reihenfolge",
+                                        f"'{key}' an Position {position + 1} in [{section}], erwartet "
+                                        f"'{expected_keys[position] if position < len(expected_keys) else '-'}'"))
+        missing = [key for key in expected_keys if key not in keys]
+        if missing:
+            issues.append(LintIssue(file_name, header_line, ERROR, "Schlüssel",
+                                    f"[{section}] ohne {', '.join(missing)}"))
+    return {key: (line, value) for line, key, value in entries}
+
+
+def _check_date(file_name: str, line: int, value: str, issues: list[LintIssue]) -> None:
+    value = value.strip()
+    if value == "" or _WRITTEN_DATE.match(value):
+        # the format of get_player_str is always readable, only other values are parsed
+        return
+    try:
+        date_parsing_from_str(value)
+    except (ValueError, IndexError):
+        issues.append(LintIssue(file_name, line, ERROR, "Datum", f"Geb.-Jahr '{value}' ist nicht lesbar"))
+    else:
+        issues.append(LintIssue(file_name, line, WARNING, "Datum", f"Geb.-Jahr '{value}' ist nicht im Format MM/JJ "
+                                                                    f"oder MM/JJJJ"))
+
+
+def _iter_sections(text: str, file_name: str, issues: list[LintIssue]) \
+        -> Iterator[tuple[str, int, list[tuple[int, str, str]]]]:
+    """
+    Split the text into sections (name, line of the header, entries (line, key, value)). Blank lines and lines that
+    are no key=value pair are reported, because read_finished_mannschaften reads fixed line offsets.
+    """
+    section, header_line, entries = None, 0, []
+    for number, line in enumerate(text.splitlines(), start=1):
+        key, separator, value = line.partition("=")
+        if separator:
+            if section is None:
+                issues.append(LintIssue(file_name, number, ERROR, "Abschnitt", "Eintrag vor dem ersten Abschnitt"))
+            else:
+                entries.append((number, key.strip(), value))
+            continue
+        stripped = line.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            if section is not None:
+                yield section, header_line, entries
+            section, header_line, entries = stripped[1:-1], number, []
+        elif stripped == "":
+            issues.append(LintIssue(file_name, number, ERROR, "Zeile", "Leerzeile verschiebt alle folgenden Zeilen"))
+        else:
+            issues.append(LintIssue(file_name, number, ERROR, "Zeile", f"Zeile ohne '=': '{stripped}'"))
+    if section is not None:
+        yield section, header_line, entries
+
+
+def lint_ini_text(data: bytes, file_name: str) -> list[LintIssue]:
+    """
+    Check the content of a .ini file: encoding, section names and order, keys and their order, the dates of the
+    players and Anzahl Spieler against the number of player blocks.
+    :param data: content of the file
+    :type data: bytes
+    :param file_name: name of the file for the issues
+    :type file_name: str
+    :return: the issues ordered by line
+    :rtype: list[LintIssue]
+    """
+    issues = []
+    text = _decode(data, file_name, issues)
+    players = 0
+    anzahl = None
+    general_found = False
+    for section, header_line, entries in _iter_sections(text, file_name, issues):
+        if section == GENERAL_SECTION:
+            if general_found or players > 0 or header_line != 1:
+                issues.append(LintIssue(file_name, header_line, ERROR, "Abschnitt",
+                                        "[Allgemein] muss einmal und in Zeile 1 stehen"))
+            general_found = True
+            values = _check_section(file_name, section, header_line, entries, GENERAL_KEYS, issues)
+            anzahl = values.get("Anzahl Spieler")
+            continue
+        match = _PLAYER_SECTION.match(section)
+        if match is None:
+            issues.append(LintIssue(file_name, header_line, ERROR, "Abschnitt", f"Unbekannter Abschnitt [{section}]"))
+            continue
+        if int(match.group(1)) != players:
+            issues.append(LintIssue(file_name, header_line, ERROR, "Abschnitt",
+                                    f"[{section}] statt [Spieler {players}]"))
+        players += 1
+        values = _check_section(file_name, section, header_line, entries, PLAYER_KEYS, issues)
+        if "Geb.-Jahr" in values:
+            _check_date(file_name, *values["Geb.-Jahr"], issues)
+    if not general_found:
+        issues.append(LintIssue(file_name, 1, ERROR, "Abschnitt", "[Allgemein] fehlt"))
+    if anzahl is not None:
+        line, value = anzahl
+        if not value.strip().isdigit():
+            issues.append(LintIssue(file_name, line, ERROR, "Anzahl Spieler", f"'{value}' ist keine Zahl"))
+        elif int(value) != players:
+            issues.append(LintIssue(file_name, line, WARNING, "Anzahl Spieler",
+                                    f"Anzahl Spieler={int(value)}, aber {players} Spieler-Abschnitte"))
+    return sorted(issues, key=lambda issue: issue.line)
+
+
+def lint_ini_file(file: Path) -> list[LintIssue]:
+    """
+    Check a .ini file, see lint_ini_text. The file is read once as bytes.
+    """
+    try:
+        data = file.read_bytes()
+    except OSError as error:
+        return [LintIssue(file.name, 0, ERROR, "Datei", f"Nicht lesbar: {error}")]
+    return lint_ini_text(data, file.name)
+
+
+def lint_folder(folder_name: str, workers: int = None, progress: callable = None) -> list[LintIssue]:
+    """
+    Check all .ini files of the folder on a process pool. Every file is read exactly once and checked in a single
+    pass, so the run time is bounded by reading the folder. The issues are ordered by file name and line,
+    independent of the scheduling.
+    :param folder_name: folder with the .ini files
+    :type folder_name: str
+    :param workers: number of processes. Default is None, the number of CPUs. With 1 the files are checked in this
+    process
+    :type workers: int
+    :param progress: callback for the progress, see progress.track
+    :type progress: callable
+    :return: the issues of all files
+    :rtype: list[LintIssue]
+    :raises FileNotFoundError: if the folder does not exist
+    """
+    folder = Path(folder_name)
+    if not folder.exists():
+        logging.error(f"Folder {folder} does not exist")
+        raise FileNotFoundError(f"Folder {folder} does not exist")
+    files = sorted(file for file in folder.iterdir() if file.suffix == ".ini")
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if workers <= 1 or len(files) < 2:
+        results = map(lint_ini_file, files)
+        return [issue for issues in track(results, "Prüfen", len(files), progress) for issue in issues]
+    # larger chunks keep the pickling overhead small compared to reading the files
+    chunksize = max(1, len(files) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lint_ini_file, files, chunksize=chunksize)
+        return [issue for issues in track(results, "Prüfen", len(files), progress) for issue in issues]
+
+
+def write_lint_report(issues: list[LintIssue]) -> str:
+    """
+    Write the issues to out/Pruefung_[Datum].csv.
+    :return: name of the file
+    :rtype: str
+    """
+    today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
+    write_csv([issue.as_dict() for issue in issues], f"Pruefung_{today}")
+    return f"Pruefung_{today}.csv"
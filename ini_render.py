@@ -0,0 +1,207 @@
+import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from diagnostics import report
+from file_lock import atomic_write
+from ini_files import get_mannschaft_file_name
+from mannschaft import GEBURTSDATUM_PARSED, VEREIN_ANGEH, explode_mannschaften, get_final_name_for_mannschaften_file, \
+    parse_geburtsdatum_column
+from progress import track
+from roster import PRIORITY_COLUMNS, PRIORITY_FILE_ORDER, priority_key, select_top_per_team
+
+_TEAM = "_team"
+_MANNSCHAFT = "_mannschaft"
+_GENERAL_COLUMNS = ["Spielklasse", "Liga", "Bezirk", "Spielführer", "Betreuer", "Vereinsnummer", "LV-Nummer"]
+
+
+def _clean(column: pd.Series) -> pd.Series:
+    """
+    Vectorized version of the cleaning in PlayerData and GeneralData: NaN becomes "", strings are stripped.
+    """
+    return column.fillna("").astype(str).str.strip()
+
+
+def join_spieler_mannschaften(spieler_csv: pd.DataFrame, mannschaften_csv: pd.DataFrame,
+                              warn: callable = report) -> pd.DataFrame:
+    """
+    Join the players of Spieler.csv with their Mannschaft of Mannschaften.csv on Verein and Mannschaft and clean the
+    player columns. Like in import_new_mannschaften the first row of Mannschaften.csv wins for duplicate Mannschaften.
+    A player with several Mannschaften in the Mannschaft cell (e.g. "U18, 1") is joined with each of them, see
+    explode_mannschaften. Players with an unparsable birthdate or without name are reported and dropped.
+    :param spieler_csv: content of Spieler.csv
+    :type spieler_csv: pd.DataFrame
+    :param mannschaften_csv: content of Mannschaften.csv
+    :type mannschaften_csv: pd.DataFrame
+    :param warn: function that is called with category, detail and Mannschaft of the warnings. Default is
+    diagnostics.report
+    :type warn: callable
+    :return: one row per player and Mannschaft with the columns of both files and the key column _team
+    :rtype: pd.DataFrame
+    """
+    if GEBURTSDATUM_PARSED not in spieler_csv.columns:
+        spieler_csv = parse_geburtsdatum_column(spieler_csv.copy())
+    spieler_csv = explode_mannschaften(spieler_csv)
+    spieler = spieler_csv[spieler_csv["Verein"].notna()].assign(**{_MANNSCHAFT: spieler_csv["Mannschaft"].fillna("")})
+    mannschaften = mannschaften_csv[mannschaften_csv["Verein"].notna()]
+    mannschaften = mannschaften.assign(**{_MANNSCHAFT: mannschaften["Mannschaft"].fillna("")}) \
+        .drop(columns=["Mannschaft"]).drop_duplicates(["Verein", _MANNSCHAFT], keep="first")
+    joined = spieler.rename_axis("_row").reset_index() \
+        .merge(mannschaften, on=["Verein", _MANNSCHAFT], how="inner", suffixes=("", " (Mannschaft)"))
+    date_given = _clean(joined["Geburtsdatum"]) != ""
+    invalid = (date_given & joined[GEBURTSDATUM_PARSED].isna()) | (_clean(joined["Name"]) == "") | \
+              (_clean(joined["Vorname"]) == "")
+    for verein, mannschaft, row in zip(joined.loc[invalid, "Verein"], joined.loc[invalid, _MANNSCHAFT],
+                                       joined.loc[invalid, "_row"]):
+        warn("Spieler nicht verarbeitbar", f"Zeile {row}", get_final_name_for_mannschaften_file(verein, mannschaft))
+    joined = joined[~invalid].copy()
+    joined["_verein"] = joined["Verein"]
+    for column in ["Name", "Vorname", "Altersklasse", "Passnummer", "Verein", VEREIN_ANGEH]:
+        joined[column] = _clean(joined[column]) if column in joined.columns else ""
+    joined[_TEAM] = joined["_verein"] + "\x1f" + joined[_MANNSCHAFT]
+    return joined
+
+
+def limit_team_players(joined: pd.DataFrame, max_players: int, priority: str = PRIORITY_FILE_ORDER,
+                       altersklassen: list[str] = None) -> pd.DataFrame:
+    """
+    Keep the max_players best players of every Mannschaft of a joined player frame (see join_spieler_mannschaften)
+    by the priority (see roster.priority_key). The selection is one pass over the players with a heap per Mannschaft.
+    The players that are left out are reported.
+    :param joined: joined and cleaned player frame
+    :type joined: pd.DataFrame
+    :param max_players: maximal number of players per Mannschaft
+    :type max_players: int
+    :param priority: one of roster.PRIORITIES. Default is the order of Spieler.csv
+    :type priority: str
+    :param altersklassen: order of the Altersklassen for the priority altersklasse. Default is None
+    :type altersklassen: list[str]
+    :return: the joined frame without the players that were left out, in the same order
+    :rtype: pd.DataFrame
+    """
+    column = PRIORITY_COLUMNS[priority]
+    values = joined[column].tolist() if column is not None and column in joined.columns else [""] * len(joined)
+    rows = [{column: value} for value in values]
+    teams = select_top_per_team(((team, priority_key(priority, row, position, altersklassen), index)
+                                 for team, row, position, index in zip(joined[_TEAM], rows, joined["_row"],
+                                                                       joined.index)),
+                                max_players)
+    left_out = [index for top in teams.values() for index in top.left_out]
+    for index in sorted(left_out, key=lambda index: joined.at[index, "_row"]):
+        report("Spieler nicht aufgestellt, Mannschaft voll",
+               f"Zeile {joined.at[index, '_row']}: {joined.at[index, 'Name']} {joined.at[index, 'Vorname']}",
+               get_final_name_for_mannschaften_file(joined.at[index, "_verein"], joined.at[index, _MANNSCHAFT]))
+    return joined.drop(index=left_out)
+
+
+def _geburtsjahr_str(geburtsdaten: pd.Series, date_format: str) -> pd.Series:
+    """
+    Vectorized date formatting of get_player_str: date_format before 2000, otherwise %m/%Y.
+    """
+    dates = pd.to_datetime(geburtsdaten, errors="coerce")
+    short = dates.dt.strftime(date_format)
+    complete = dates.dt.strftime("%m/%Y")
+    return short.where(dates < pd.Timestamp(datetime.date(2000, 1, 1)), complete).fillna("")
+
+
+def _platzhalter_str(first_number: int, count: int, sort: bool, cache: dict) -> str:
+    """
+    Blocks of the Platzhalter players. With sort they are sorted by name like in
+    write_mannschaft_file_from_mannschaft_data ("Name 10" before "Name 2").
+    """
+    key = (first_number, count, sort)
+    if key not in cache:
+        numbers = range(1, count + 1)
+        if sort:
+            numbers = sorted(numbers, key=lambda i: f"Name {i}")
+        cache[key] = "".join(f"""[Spieler {first_number + position}]
+Name=Name {i}
+Vorname=Vorname {i}
+Letztes Spiel=
+Platz-Ziffer=
+Spielernr.=
+Geb.-Jahr=
+Altersklasse=
+Pass-Nr.=
+Rangliste=
+Verein=
+""" for position, i in enumerate(numbers))
+    return cache[key]
+
+
+def render_mannschaften(joined: pd.DataFrame, num_min_players: int = 10, min_placeholder: int = 0, sort: bool = True,
+                        date_format: str = "%m/%y") -> dict[str, str]:
+    """
+    Render the .ini text of every Mannschaft of a joined player frame (see join_spieler_mannschaften) without creating
+    PlayerData or MannschaftData objects. The output is the same as building MannschaftData objects and writing them
+    with write_mannschaft_file_from_mannschaft_data: players sorted by name, Platzhalter players at the end, dates
+    before 2000 with date_format and %m/%Y after.
+    :param joined: joined and cleaned player frame
+    :type joined: pd.DataFrame
+    :param num_min_players: Minimum number of players. Default is 10
+    :type num_min_players: int
+    :param min_placeholder: Minimum number of Platzhalter players. Default is 0
+    :type min_placeholder: int
+    :param sort: sort the players by their name. Default is True
+    :type sort: bool
+    :param date_format: format of the date. Default is mm/yy
+    :type date_format: str
+    :return: file name (without .ini) -> content of the .ini file
+    :rtype: dict[str, str]
+    """
+    if len(joined) == 0:
+        return dict()
+    if sort:
+        joined = joined.sort_values("Name", kind="stable")
+    teams = joined.groupby(_TEAM, sort=False)
+    number = teams.cumcount().astype(str)
+    verein = joined["Verein"].where(joined[VEREIN_ANGEH] == "", joined[VEREIN_ANGEH])
+    blocks = "[Spieler " + number + "]\nName=" + joined["Name"] + "\nVorname=" + joined["Vorname"] + \
+             "\nLetztes Spiel=\nPlatz-Ziffer=\nSpielernr.=\nGeb.-Jahr=" + \
+             _geburtsjahr_str(joined[GEBURTSDATUM_PARSED], date_format) + "\nAltersklasse=" + joined["Altersklasse"] + \
+             "\nPass-Nr.=" + joined["Passnummer"] + "\nRangliste=\nVerein=" + verein + "\n"
+    player_text = blocks.groupby(joined[_TEAM], sort=False).agg("".join)
+    counts = teams.size()
+    general = teams.first()
+    # first appearance in Spieler.csv decides the order like in import_new_mannschaften
+    order = joined.sort_values("_row", kind="stable")[_TEAM].drop_duplicates()
+    final_names = pd.Series([get_final_name_for_mannschaften_file(*team.split("\x1f", 1)) for team in order],
+                            index=order.values)
+    header_names = final_names.str.replace(r"[_/]", "_", regex=True).str.strip() \
+        .str.replace(r"[\s]+|[\|*+]", " ", regex=True).str.replace(r"[\n]", "", regex=True)
+    headers = "[Allgemein]\nName=" + header_names
+    for column, key in zip(_GENERAL_COLUMNS, ["Spielklasse", "Liga", "Bezirk", "Spielführer", "Betreuer 1",
+                                              "Vereins-Nr", "LV-Nr"]):
+        headers = headers + f"\n{key}=" + _clean(general[column]).reindex(order.values)
+    anzahl = counts.reindex(order.values).clip(lower=num_min_players)
+    headers = headers + "\nAnzahl Spieler=" + anzahl.astype(str) + "\n"
+    platzhalter_cache = dict()
+    texts = dict()
+    for team, final_name in final_names.items():
+        count = int(counts[team])
+        num_platzhalter = max(num_min_players - count, 0, min_placeholder)
+        texts[get_mannschaft_file_name(final_name)] = headers[team] + player_text[team] + \
+            _platzhalter_str(count, num_platzhalter, sort, platzhalter_cache)
+    return texts
+
+
+def write_rendered_mannschaften(texts: dict[str, str], encoding: str = "windows-1252",
+                                progress: callable = None, render_progress: bool = True) -> list[str]:
+    """
+    Write the rendered .ini texts to the out folder.
+    :param texts: file name (without .ini) -> content of the .ini file, see render_mannschaften
+    :type texts: dict[str, str]
+    :param encoding: encoding of the files. Default is windows-1252
+    :type encoding: str
+    :param progress: callback for the progress, see progress.track
+    :type progress: callable
+    :param render_progress: show the progress on the terminal. Default is True
+    :type render_progress: bool
+    :return: names of the written files
+    :rtype: list[str]
+    """
+    for file_name, text in track(texts.items(), "Schreiben", len(texts), progress, render_progress):
+        with atomic_write(Path(f"out/{file_name}.ini"), encoding=encoding) as file:
+            file.write(text)
+    return list(texts.keys())
@@ -1,13 +1,38 @@
+import argparse
+import datetime
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 
 import pandas as pd
 
+from altersklasse import load_altersklassen_regeln, new_season
+from csv_cache import read_csv_cached
 from csv_files import read_csv, write_csv_from_mannschaft_data, write_csv_with_all_mannschaften
-from exceptions import FileIncompleteError
+from date_parsing import date_parsing_from_str
+from dedupe import find_duplicates, players_from_mannschaften, players_from_spieler_csv, write_duplicates
+from delta_import import delta_import
+from diagnostics import Diagnostics, collect_diagnostics, details_wanted, diagnostics_scope, merge_diagnostics, \
+    report
+from file_encoding import KCC_ENCODING, STATUS_FAILED, STATUS_TRANSCODED, STATUS_UNCHANGED, transcode_folder
+from file_lock import atomic_write, file_lock
+from folder_diff import diff_folders, write_folder_diff
 from ini_files import get_general_info_str_from_input, get_player_str, platzhalter_player_str, \
-    read_finished_mannschaften, write_mannschaft_file_from_mannschaft_data
-from mannschaft import MannschaftData, PlayerData, VereinsData, GeneralData
+    read_finished_mannschaften, write_mannschaft_file_from_mannschaft_data, iter_folder_mannschaften
+from ini_lint import lint_folder, write_lint_report
+from ini_render import join_spieler_mannschaften, limit_team_players, render_mannschaften, \
+    write_rendered_mannschaften
+from mannschaft import MannschaftData, PlayerData, GeneralData, explode_mannschaften, \
+    get_final_name_for_mannschaften_file, parse_geburtsdatum_column
+from name_matching import match_vereine_mannschaften, report_matches
+from profiling import profiled
+from progress import track
+from query_service import DEFAULT_PORT, serve_folder
+from reverse_sync import reverse_sync_folder
+from roster import PRIORITIES, PRIORITY_FILE_ORDER, priority_key, select_top
+from snapshots import create_snapshot, diff_snapshots, list_snapshots, restore_snapshot, snapshot_folders
+from workspace import Workspace
 
 NAME_DER_MANNSCHAFT_ = "Name der Mannschaft: "
 
@@ -17,14 +42,16 @@ BLUE = "\033[94m"
 ENDC = "\033[0m"
 
 DEFAULT_DATA_PATH = r"C:\Control Center Kegeln\Einstellungen\Mannschaften"
+# columns of Spieler.csv a player can not be created without, e.g. Rangliste or Letztes Spiel may be empty
+REQUIRED_PLAYER_COLUMNS = ["Name", "Vorname", "Geburtsdatum", "Verein"]
 
 
 def load_mannschaften_csv(sep=";") -> pd.DataFrame:
-    return read_csv(sep=sep)
+    return read_csv_cached(sep=sep)
 
 
 def load_spieler_csv(sep=";") -> pd.DataFrame:
-    return read_csv("Spieler", sep=sep)
+    return read_csv_cached("Spieler", sep=sep, prepare=parse_geburtsdatum_column)
 
 
 def read_folder_mannschaften(folder_name: str, print_teams: bool = False) -> list[MannschaftData]:
@@ -39,17 +66,7 @@ def read_folder_mannschaften(folder_name: str, print_teams: bool = False) -> lis
     :rtype: list[MannschaftData]
     :raises FileNotFoundError: if the folder does not exist
     """
-    folder = Path(folder_name)
-    if not folder.exists():
-        logging.error(f"Folder {folder} does not exist")
-        raise FileNotFoundError(f"Folder {folder} does not exist")
-    files = [file for file in folder.iterdir() if file.suffix == ".ini"]
-    mannschaften_list = []
-    for file in files:
-        try:
-            mannschaften_list.append(read_finished_mannschaften(file))
-        except (FileIncompleteError, ValueError):
-            continue
+    mannschaften_list = list(iter_folder_mannschaften(folder_name))
     if print_teams:
         for mannschaft in mannschaften_list:
             print(mannschaft)
@@ -57,40 +74,46 @@ def read_folder_mannschaften(folder_name: str, print_teams: bool = False) -> lis
 
 
 def write_mannschaft_file_input(file_name: str, csv_name: str = "Mannschaften",
-                                sort: bool = True, encoding="utf-8", date_format="%m/%y", prefix=None) -> None:
+                                sort: bool = True, encoding=KCC_ENCODING, date_format="%m/%y", prefix=None,
+                                priority: str = PRIORITY_FILE_ORDER) -> None:
     out_dir = Path("out")
     if file_name.endswith(".ini"):
         file_name = file_name[:-4]
-    if not out_dir.exists():
-        out_dir.mkdir()
+    out_dir.mkdir(exist_ok=True)
     if prefix is not None:
         file_name = f"{prefix} {file_name}"
     target_path = out_dir.joinpath(f"{file_name}.ini")
-    if target_path.exists():
-        logging.warning(f"File {file_name}.ini already exists. Overwriting?")
-        response = input("Will you continue? Otherwise press 'n' and enter\n")
-        if response.lower() == "n":
-            return
-    with open(target_path, "w", encoding=encoding) as file:
-        general_info = get_general_info_str_from_input(file_name)
-        anzahl_spieler = int(general_info.splitlines()[9].split("=")[1])
-        file.write(general_info)
-        players: list = []
-        if not Path(f"{csv_name}.csv").exists():
-            logging.error(f"File {csv_name}.csv does not exist. All players will be Platzhalter players")
-        else:
-            players = iter_csv_player(anzahl_spieler, csv_name, date_format, file, sort)
-        num_players = len(players)
-        if num_players < anzahl_spieler:  # add Platzhalter players
-            n = 1
-            for _ in range(num_players, anzahl_spieler):
-                file.write(platzhalter_player_str(n))
-                n += 1
-
-
-def iter_csv_player(anzahl_spieler, csv_name, date_format, file, sort) -> list[PlayerData]:
+    # the check and the write are one step, another run cannot write the file in between
+    with file_lock(target_path):
+        if target_path.exists():
+            logging.warning(f"File {file_name}.ini already exists. Overwriting?")
+            response = input("Will you continue? Otherwise press 'n' and enter\n")
+            if response.lower() == "n":
+                return
+        with atomic_write(target_path, encoding=encoding) as file:
+            general_info = get_general_info_str_from_input(file_name)
+            anzahl_spieler = int(general_info.splitlines()[9].split("=")[1])
+            file.write(general_info)
+            players: list = []
+            if not Path(f"{csv_name}.csv").exists():
+                logging.error(f"File {csv_name}.csv does not exist. All players will be Platzhalter players")
+            else:
+                players = iter_csv_player(anzahl_spieler, csv_name, date_format, file, sort, priority, file_name)
+            num_players = len(players)
+            if num_players < anzahl_spieler:  # add Platzhalter players
+                n = 1
+                for _ in range(num_players, anzahl_spieler):
+                    file.write(platzhalter_player_str(n))
+                    n += 1
+
+
+def iter_csv_player(anzahl_spieler, csv_name, date_format, file, sort, priority: str = PRIORITY_FILE_ORDER,
+                    team: str = None) -> list[PlayerData]:
     """
-    Iterate through the csv file and write the players to the file
+    Iterate through the csv file and write the players to the file.
+    The anzahl_spieler best players by the priority are selected in one pass over the csv file (see roster.TopN),
+    the players that are left out are reported. Rows without a value in one of REQUIRED_PLAYER_COLUMNS are skipped,
+    players with an empty priority column are selected last.
     :param anzahl_spieler: number of players to write
     :type anzahl_spieler: int
     :param csv_name: name of the csv file
@@ -99,20 +122,28 @@ def iter_csv_player(anzahl_spieler, csv_name, date_format, file, sort) -> list[P
     :type date_format: str
     :param file: file object to write the players to
     :type file: file
-    :param sort: sort the players by their name
+    :param sort: sort the players by their name, otherwise they keep the order of the csv file
     :type sort: bool
+    :param priority: priority of the selection, one of roster.PRIORITIES. Default is the order of the csv file
+    :type priority: str
+    :param team: name of the Mannschaft for the report of the players that are left out. Default is None
+    :type team: str
     :return: players written
     """
-    back = []
-    for index, row in read_csv(csv_name).iterrows():
-        if len(back) >= anzahl_spieler:
-            break
-        if pd.isna(row).max():  # check if there are any NaN values in the row
-            continue
-        try:
-            back.append(PlayerData.create_player_from_csv(row))
-        except ValueError:
-            continue
+    def candidates():
+        for position, (index, row) in enumerate(read_csv(csv_name).iterrows()):
+            if pd.isna(row.reindex(REQUIRED_PLAYER_COLUMNS)).any():
+                continue
+            try:
+                player = PlayerData.create_player_from_csv(row)
+            except ValueError:
+                continue
+            yield priority_key(priority, row, position), (position, player)
+
+    selected, left_out = select_top(candidates(), anzahl_spieler)
+    for position, player in sorted(left_out, key=lambda item: item[0]):
+        report("Spieler nicht aufgestellt, Mannschaft voll", f"Zeile {position}: {player.name} {player.vorname}", team)
+    back = [player for _, player in sorted(selected, key=lambda item: item[0])]
     # sort and complete with platzhalter players
     if sort:
         back = sorted(back, key=lambda x: x.name)
@@ -120,9 +151,8 @@ def iter_csv_player(anzahl_spieler, csv_name, date_format, file, sort) -> list[P
         try:
             file.write(get_player_str(j, player, date_format))
         except ValueError:
-            logging.warning(
-                f"Could not write player {player.name} {player.vorname} {player.geburtsjahr}. Date format "
-                f"is unknown \nSkipping player.")
+            report("Spieler nicht schreibbar (Datumsformat unbekannt), übersprungen",
+                   f"{player.name} {player.vorname} {player.geburtsjahr}")
             continue
     return back
 
@@ -150,7 +180,17 @@ def rewrite_mannschaft_file(name: str, new_name: str = None) -> None:
 
 def create_new_mannschaft():
     name = input(NAME_DER_MANNSCHAFT_)
-    write_mannschaft_file_input(name, "Spieler", encoding="windows-1252")
+    write_mannschaft_file_input(name, "Spieler", encoding="windows-1252", priority=input_priority())
+
+
+def input_priority() -> str:
+    """
+    Ask for the priority of the player selection, see roster.priority_key.
+    """
+    while (priority := input(f"Auswahl der Spieler nach ({', '.join(PRIORITIES)}; "
+                             f"default={PRIORITY_FILE_ORDER}): ")) not in PRIORITIES + [""]:
+        logging.warning(f"Ungültige Eingabe. Bitte eine von {', '.join(PRIORITIES)} eingeben.")
+    return priority if priority != "" else PRIORITY_FILE_ORDER
 
 
 def rewrite_mannschaft():
@@ -164,13 +204,6 @@ def rewrite_mannschaft():
     rewrite_mannschaft_file(name, new_name)
 
 
-def get_final_name_for_mannschaften_file(vereins_name: str, mannschaft_name: str) -> str:
-    if mannschaft_name.startswith("U18") or mannschaft_name.startswith("U14"):
-        return f"{mannschaft_name} {vereins_name}"
-    else:
-        return f"{vereins_name} {mannschaft_name}"
-
-
 def import_single_mannschaft(vereins_name: str, mannschaft_name: str, num_min_players: int = 10):
     """
     Import a single Mannschaft from csv file
@@ -204,10 +237,14 @@ def import_single_mannschaft(vereins_name: str, mannschaft_name: str, num_min_pl
 
 
 def import_new_mannschaften(num_min_players: int = 10, min_placeholder: int = 0, encoding="windows-1252",
-                            sort=True) -> None:
+                            sort=True, workers: int = 1, spieler_csv: pd.DataFrame = None,
+                            mannschaften_csv: pd.DataFrame = None, progress: callable = None,
+                            fuzzy_threshold: float = None, max_players: int = None,
+                            priority: str = PRIORITY_FILE_ORDER) -> None:
     """
     Use this function to import all Mannschaften from the csv files. The csv files must be in the same folder as this
     script and must be named "Mannschaften.csv" and "Spieler.csv".
+    A player whose Mannschaft cell lists several Mannschaften (e.g. "U18, 1") is written into every one of them.
     :param encoding: encoding of the csv files. Default is windows-1252
     :type encoding: str
     :param min_placeholder: Minimum number of Platzhalter players. Default is 0
@@ -215,85 +252,95 @@ def import_new_mannschaften(num_min_players: int = 10, min_placeholder: int = 0,
     :param num_min_players: Minimum number of players. If the number of players in the csv file is less than
     this number, Platzhalter players will be added. Default is 10
     :type num_min_players: int
+    :param sort: sort the players by their name. Default is True
+    :type sort: bool
+    :param workers: number of processes. If greater than 1, the Vereine are imported in parallel. Default is 1
+    :type workers: int
+    :param spieler_csv: already loaded Spieler.csv (e.g. from a Workspace). Default is None, load the file
+    :type spieler_csv: pd.DataFrame
+    :param mannschaften_csv: already loaded Mannschaften.csv. Default is None, load the file
+    :type mannschaften_csv: pd.DataFrame
+    :param progress: function that is called with the progress (files written, or Vereine done with workers > 1),
+    see progress.ProgressState. The progress is shown on the terminal in any case
+    :type progress: callable
+    :param fuzzy_threshold: if given, Verein and Mannschaft names of Spieler.csv that are not exactly in
+    Mannschaften.csv are matched fuzzy and accepted from this score on, see name_matching. The matches are written to
+    out/Zuordnung_[Datum].csv. Default is None, only exact names are imported
+    :type fuzzy_threshold: float
+    :param max_players: maximal number of players per Mannschaft. The best players by the priority are selected, the
+    others are reported, see ini_render.limit_team_players. Default is None, all players
+    :type max_players: int
+    :param priority: priority of the selection with max_players, one of roster.PRIORITIES. Default is the order of
+    Spieler.csv
+    :type priority: str
     """
-    spieler_csv = load_spieler_csv()
-    mannschaften_csv = load_mannschaften_csv()
-    vereine: list[VereinsData] = list()
-    vereins_map: dict[str, dict[str, tuple[GeneralData, [list[PlayerData]]]]] = dict()
-
-    for index, s_row in spieler_csv.iterrows():
-        verein = s_row["Verein"]
-        spieler_mannschaft = s_row["Mannschaft"] if not pd.isna(s_row["Mannschaft"]) else ""
-        for m_index, m_row in mannschaften_csv.iterrows():
-            mannschaft = m_row["Mannschaft"] if not pd.isna(m_row["Mannschaft"]) else ""
-            if m_row["Verein"] == verein and mannschaft == spieler_mannschaft:
-                if verein not in vereins_map:
-                    vereins_map[verein] = dict()
-                if mannschaft not in vereins_map[verein]:
-                    general_data = GeneralData(
-                        "" if pd.isna(mannschaft) else mannschaft,
-                        "" if pd.isna(m_row["Spielklasse"]) else m_row["Spielklasse"],
-                        "" if pd.isna(m_row["Liga"]) else m_row["Liga"],
-                        "" if pd.isna(m_row["Bezirk"]) else m_row["Bezirk"],
-                        "" if pd.isna(m_row["Spielführer"]) else m_row["Spielführer"],
-                        "" if pd.isna(m_row["Betreuer"]) else m_row["Betreuer"],
-                        "" if pd.isna(m_row["Vereinsnummer"]) else m_row["Vereinsnummer"],
-                        "" if pd.isna(m_row["LV-Nummer"]) else m_row["LV-Nummer"],
-                        -1,
-                        "" if pd.isna(m_row["Verein"]) else m_row["Verein"],
-                        "" if pd.isna(m_row["Verein Kurz"]) else m_row["Verein Kurz"],
-                    )
-                    vereins_map[verein][mannschaft] = (general_data, list())
-                try:
-                    vereins_map[verein][mannschaft][1].append(PlayerData.create_player_from_csv(s_row))
-                except ValueError as _:
-                    logging.warning(f"Spieler in {mannschaft} nicht verarbeitbar. War in Zeile {index}", )
-                    continue
-                break
-    # create internal data structure
-    map_to_internal_representation(vereine, vereins_map, min_placeholder, num_min_players)
-    # write files
-    for verein in vereine:
-        for mannschaft in verein.mannschaften:
-            write_mannschaft_file_from_mannschaft_data(mannschaft.file_name, mannschaft, encoding=encoding, sort=sort)
-
-
-def map_to_internal_representation(vereine: list[VereinsData],
-                                   vereins_map: dict[str, dict[str, tuple[GeneralData, [list[PlayerData]]]]],
-                                   min_placeholder: int, num_min_players: int):
+    spieler_csv = load_spieler_csv() if spieler_csv is None else spieler_csv
+    mannschaften_csv = load_mannschaften_csv() if mannschaften_csv is None else mannschaften_csv
+    spieler_csv = explode_mannschaften(spieler_csv)
+    with diagnostics_scope():
+        if fuzzy_threshold is not None:
+            spieler_csv, matches = match_vereine_mannschaften(spieler_csv, mannschaften_csv, fuzzy_threshold)
+            report_matches(matches)
+        if workers > 1:
+            _import_vereine_parallel(spieler_csv, mannschaften_csv, num_min_players, min_placeholder, encoding, sort,
+                                     workers, progress, max_players, priority)
+            return
+        _import_verein_partition(spieler_csv, mannschaften_csv, num_min_players, min_placeholder, encoding, sort,
+                                 False, progress, max_players, priority)
+
+
+def _import_verein_partition(spieler_csv: pd.DataFrame, mannschaften_csv: pd.DataFrame, num_min_players: int,
+                             min_placeholder: int, encoding: str, sort: bool, worker: bool = True,
+                             progress: callable = None, max_players: int = None,
+                             priority: str = PRIORITY_FILE_ORDER, keep_details: bool = False) \
+        -> tuple[list[str], Diagnostics | None]:
     """
-    Map the data from the csv files to the internal data structure
-    :param vereine: list of VereinsData objects
-    :type vereine: list[VereinsData]
-    :param vereins_map: dictionary with the VereinsData objects
-    :type vereins_map: dict[str, dict[str, tuple[GeneralData, [list[PlayerData]]]]]
-    :param min_placeholder: Minimum number of Platzhalter players. Default is 0
-    :type min_placeholder: int
-    :param num_min_players: Minimum number of players. If the number of players in the csv file is less than
-    this number, Platzhalter players will be added. Default is 10
-    :type num_min_players: int
-    :return: None
+    Import the Mannschaften of the given part of Spieler.csv and Mannschaften.csv and write the files.
+    The .ini files are rendered directly from the joined DataFrame, see ini_render.
+    In a worker process the diagnostics are collected and returned instead of logged and no progress is shown.
+    Every single message is only returned with keep_details (if the parent writes a detail file), otherwise only the
+    counts and examples.
+    :return: names of the written files and the diagnostics of the worker (None if worker is False)
+    :rtype: tuple[list[str], Diagnostics | None]
+    """
+    collector = collect_diagnostics(live_limit=0, log_summary=False, keep_details=keep_details) if worker \
+        else nullcontext()
+    with collector as diagnostics:
+        joined = join_spieler_mannschaften(spieler_csv, mannschaften_csv)
+        if max_players is not None:
+            joined = limit_team_players(joined, max_players, priority)
+        texts = render_mannschaften(joined, num_min_players, min_placeholder, sort)
+        written = write_rendered_mannschaften(texts, encoding, progress, render_progress=not worker)
+    return written, diagnostics
+
+
+def _import_vereine_parallel(spieler_csv: pd.DataFrame, mannschaften_csv: pd.DataFrame, num_min_players: int,
+                             min_placeholder: int, encoding: str, sort: bool, workers: int,
+                             progress: callable = None, max_players: int = None,
+                             priority: str = PRIORITY_FILE_ORDER) -> list[str]:
     """
-    for vereins_name, vereine_raw in vereins_map.items():
-        mannschaften_list = list()
-        for mannschaft_name, mannschaften_raw in vereine_raw.items():
-            gen_data, players = mannschaften_raw
-            correct_name = get_final_name_for_mannschaften_file(vereins_name, mannschaft_name)
-            general_data = gen_data
-            general_data.anzahl_spieler = max(len(players), num_min_players)
-            num_platzhalter = 0
-            if len(players) < num_min_players:
-                num_platzhalter = 0
-                for i in range(1, num_min_players - len(players) + 1):
-                    players.append(PlayerData.create_platzhalter(i))
-                    num_platzhalter += 1
-            if num_platzhalter < min_placeholder:
-                for i in range(num_platzhalter + 1, min_placeholder + 1):
-                    players.append(PlayerData.create_platzhalter(i))
-            general_data.name = correct_name
-            mannschaften_list.append(MannschaftData(correct_name, general_data, players))
-        vereinsdata = VereinsData(vereins_name, mannschaften_list)
-        vereine.append(vereinsdata)
+    Partition Spieler.csv and Mannschaften.csv by Verein and import the partitions on a process pool.
+    Written files and diagnostics are merged in alphabetical order of the Vereine, independent of the scheduling.
+    :return: names of the written files
+    :rtype: list[str]
+    """
+    mannschaften_by_verein = dict(list(mannschaften_csv.groupby("Verein", sort=False)))
+    partitions = [(spieler_part, mannschaften_by_verein[verein])
+                  for verein, spieler_part in spieler_csv.groupby("Verein", sort=True)
+                  if verein in mannschaften_by_verein]
+    if not Path("out").exists():
+        Path("out").mkdir()
+    written = []
+    keep_details = details_wanted()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_import_verein_partition, spieler_part, mannschaften_part, num_min_players,
+                                   min_placeholder, encoding, sort, True, None, max_players, priority, keep_details)
+                   for spieler_part, mannschaften_part in partitions]
+        for future in track(futures, "Import (Vereine)", callback=progress):
+            files, diagnostics = future.result()
+            merge_diagnostics(diagnostics)
+            written.extend(files)
+    return written
 
 
 def print_options(with_input: bool = False) -> str:
@@ -301,89 +348,377 @@ def print_options(with_input: bool = False) -> str:
     2 - Mannschaft neu einlesen und korrigieren
     3 - Mannschaften aus CSV einlesen (mit Platzhaltern)
     4 - Alle Mannschaften korrigieren (mit Platzhaltern)
+    7 - Nur Änderungen aus CSV übernehmen (Delta-Import)
+    8 - Neue Saison (Altersklassen aktualisieren)
+    9 - Spieler.csv aus Mannschaften aktualisieren (Rückabgleich)
+    10 - Lokalen Abfragedienst (HTTP/JSON) starten
+    11 - Doppelte Spieler suchen
+    12 - Sicherungen anzeigen, vergleichen und wiederherstellen
+    13 - Mannschaften prüfen (Format der .ini-Dateien)
+    14 - Kodierung der Mannschaften vereinheitlichen (windows-1252)
+    15 - Zwei Mannschaften-Ordner vergleichen
     - {RED}Export{ENDC} -
     5 - Exportiere eine Mannschaft als CSV
     6 - Exportiere alle Mannschaften als CSV
     
+    p - Profiling ein-/ausschalten
     end - Programm beenden""")
     if with_input:
         return input("Wahl: ")
     return ""
 
 
-def export_single_mannschaft(file_name: str = None):
+def export_single_mannschaft(file_name: str = None, workspace: Workspace = None):
     if file_name is None:
         file_name = input("Name der Mannschaft: ")
-        if file_name.endswith(".ini"):
-            file_name = file_name[:-4]
+    if file_name.endswith(".ini"):
+        file_name = file_name[:-4]
     directory = Path(DEFAULT_DATA_PATH)
-    if not directory.joinpath("name").exists():
+    if not directory.joinpath(f"{file_name}.ini").exists():
         logging.error(f"File {file_name}.ini does not exist")
         return
     export_name = input("Name der Exportdatei: ")
     if export_name in ["", " ", "\n", "\t", ":", "/"]:
         export_name = file_name
-    data = read_finished_mannschaften(directory.joinpath(file_name))
+    if workspace is None:
+        data = read_finished_mannschaften(directory.joinpath(f"{file_name}.ini"))
+    else:
+        data = workspace.mannschaft(file_name)
+        if data is None:
+            logging.error(f"File {file_name}.ini is not readable")
+            return
     write_csv_from_mannschaft_data(data, export_name)
 
 
-def export_all_mannschaften():
+def export_all_mannschaften(workspace: Workspace = None):
     try:
-        mannschaften = read_folder_mannschaften(DEFAULT_DATA_PATH, False)
+        if workspace is None:
+            mannschaften = track(iter_folder_mannschaften(DEFAULT_DATA_PATH), "Export",
+                                 _count_ini_files(DEFAULT_DATA_PATH))
+        else:
+            mannschaften = track(workspace.mannschaften(), "Export")
         write_csv_with_all_mannschaften(mannschaften)
     except FileNotFoundError:
         logging.error("Abbruch. Keine Mannschaften gefunden.")
 
 
-def correct_all_mannschaften_in_dir():
+def _count_ini_files(folder_name: str) -> int:
+    return sum(1 for file in Path(folder_name).iterdir() if file.suffix == ".ini")
+
+
+def correct_all_mannschaften_in_dir(workspace: Workspace = None):
     while (name_after_team := input("Datei soll wie Mannschaft heißen? (default=Y): ")) not in ["", "Y", "n"]:
         logging.warning("Ungültige Eingabe. Bitte y(es) oder n(o) eingeben.")
-    name_after_team = name_after_team[0].lower()
+    name_after_team = name_after_team[:1].lower()
     name_after_team = name_after_team == "" or name_after_team == "y"
     path = input(r"""Path to folder with Mannschaften files:
             Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
             Path:""")
     path = path if path != "" else DEFAULT_DATA_PATH
-    mannschaften = read_folder_mannschaften(path, True)
+    snapshot_folders([path, "out"], "vor Korrektur aller Mannschaften")
+    if workspace is None:
+        mannschaften = track(iter_folder_mannschaften(path), "Korrektur", _count_ini_files(path))
+    else:
+        mannschaften = track(workspace.mannschaften(path), "Korrektur")
     for mannschaft in mannschaften:
+        print(mannschaft)
         if name_after_team:
             mannschaft.file_name = mannschaft.general_data.name
         write_mannschaft_file_from_mannschaft_data(mannschaft.file_name, mannschaft)
-    import_new_mannschaften(min_placeholder=3)
+    if workspace is None:
+        import_new_mannschaften(min_placeholder=3)
+    else:
+        import_new_mannschaften(min_placeholder=3, spieler_csv=workspace.spieler_csv,
+                                mannschaften_csv=workspace.mannschaften_csv)
 
 
-def import_mannschaft_from_csv():
+def import_mannschaft_from_csv(workspace: Workspace = None):
     while (placeholder := input("Minimale Anzahl Platzhalter (default=3): ")).isdigit() and int(placeholder) < 0:
         logging.warning("Ungültige Eingabe. Bitte Zahl eingeben.")
     sort = input("Sortieren? (default=Y): ") in ["", "Y", "y"]
     placeholder = int(placeholder) if placeholder != "" else 3
-    import_new_mannschaften(min_placeholder=placeholder, sort=sort)
+    while not (workers := input("Anzahl Prozesse (default=1): ")).isdigit() and workers != "":
+        logging.warning("Ungültige Eingabe. Bitte Zahl eingeben.")
+    workers = int(workers) if workers != "" else 1
+    fuzzy_threshold = 0.9 if input("Vereins- und Mannschaftsnamen unscharf abgleichen? (default=N): ") in \
+        ["Y", "y"] else None
+    while not (max_players := input("Maximale Anzahl Spieler pro Mannschaft (default=alle): ")).isdigit() and \
+            max_players != "":
+        logging.warning("Ungültige Eingabe. Bitte Zahl eingeben.")
+    max_players = int(max_players) if max_players != "" else None
+    priority = input_priority() if max_players is not None else PRIORITY_FILE_ORDER
+    snapshot_folders(["out"], "vor Import aus CSV")
+    if workspace is None:
+        import_new_mannschaften(min_placeholder=placeholder, sort=sort, workers=workers,
+                                fuzzy_threshold=fuzzy_threshold, max_players=max_players, priority=priority)
+    else:
+        import_new_mannschaften(min_placeholder=placeholder, sort=sort, workers=workers,
+                                spieler_csv=workspace.spieler_csv, mannschaften_csv=workspace.mannschaften_csv,
+                                fuzzy_threshold=fuzzy_threshold, max_players=max_players, priority=priority)
 
 
-def cli_handle():
+def import_delta_from_csv():
+    previous_spieler = input("Vorherige Spieler-CSV (default=Spieler_alt): ")
+    previous_mannschaften = input("Vorherige Mannschaften-CSV (default=Mannschaften_alt): ")
+    path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    path = path if path != "" else DEFAULT_DATA_PATH
+    while not (placeholder := input("Minimale Anzahl Platzhalter (default=3): ")).isdigit() and placeholder != "":
+        logging.warning("Ungültige Eingabe. Bitte Zahl eingeben.")
+    placeholder = int(placeholder) if placeholder != "" else 3
+    snapshot_folders([path, "out"], "vor Delta-Import")
+    delta_import(previous_spieler if previous_spieler != "" else "Spieler_alt",
+                 previous_mannschaften if previous_mannschaften != "" else "Mannschaften_alt", path,
+                 min_placeholder=placeholder)
+
+
+def start_new_season():
+    year = datetime.date.today().year
+    while True:
+        stichtag_str = input(f"Stichtag für die Altersklassen (default=31.12.{year}): ")
+        try:
+            stichtag = date_parsing_from_str(stichtag_str) if stichtag_str != "" else datetime.date(year, 12, 31)
+            break
+        except ValueError:
+            logging.warning("Ungültige Eingabe. Bitte Datum im Format TT.MM.JJJJ eingeben.")
+    clear_results = input("Letztes Spiel und Rangliste leeren? (default=Y): ") in ["", "Y", "y"]
+    path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    path = path if path != "" else DEFAULT_DATA_PATH
+    spieler = input("Spieler-CSV für das Geschlecht (default=Spieler, - == keine): ")
+    spieler = spieler if spieler != "" else "Spieler"
+    spieler_csv = read_csv(spieler) if spieler != "-" and Path(spieler).with_suffix(".csv").exists() else None
+    snapshot_folders([path, "out"], "vor neuer Saison")
+    changes = new_season(path, stichtag, load_altersklassen_regeln(), clear_results, spieler_csv=spieler_csv)
+    for change in changes.itertuples(index=False):
+        print(f"\t{change[0]}: {change[1]} {change[2]} {change[3]} -> {change[4]}")
+    print(f"{len(changes)} Altersklassen geändert.")
+
+
+def sync_spieler_csv_from_mannschaften():
+    base = input("Spieler-CSV des letzten Imports für Konflikterkennung (leer == keine): ")
+    path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    reverse_sync_folder(path if path != "" else DEFAULT_DATA_PATH, base=base if base != "" else None)
+
+
+ACTION_NAMES = {"1": "neue_mannschaft", "2": "korrektur", "3": "import", "4": "korrektur_alle",
+                "5": "export", "6": "export_alle", "7": "delta_import", "8": "neue_saison", "9": "rueckabgleich",
+                "10": "abfragedienst",
+                "11": "duplikate",
+                "12": "sicherungen",
+                "13": "pruefen",
+                "14": "kodierung",
+                "15": "vergleich"}
+
+
+def toggle_profiling(profile: bool) -> tuple[bool, bool]:
+    """
+    Switch the profiling of the following actions on or off. When switched on, ask for the memory tracing.
+    :param profile: current state
+    :type profile: bool
+    :return: new state and whether the memory allocations are traced
+    :rtype: tuple[bool, bool]
+    """
+    if profile:
+        print("Profiling aus.")
+        return False, False
+    memory = input("Speicherallokationen mit aufzeichnen (langsamer)? (default=n): ") in ["Y", "y"]
+    print("Profiling an. Profile werden in out/ geschrieben.")
+    return True, memory
+
+
+def start_query_service():
+    while not (port := input(f"Port (default={DEFAULT_PORT}): ")).isdigit() and port != "":
+        logging.warning("Ungültige Eingabe. Bitte Zahl eingeben.")
+    path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    serve_folder(path if path != "" else DEFAULT_DATA_PATH, port=int(port) if port != "" else DEFAULT_PORT)
+
+
+def find_duplicate_players(workspace: Workspace = None):
+    while (quelle := input("Quelle: (o)rdner oder (s)pieler.csv (default=o): ")) not in ["", "o", "s"]:
+        logging.warning("Ungültige Eingabe. Bitte o oder s eingeben.")
+    if quelle == "s":
+        spieler_csv = load_spieler_csv() if workspace is None else workspace.spieler_csv
+        players = players_from_spieler_csv(spieler_csv)
+    else:
+        path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+        path = path if path != "" else DEFAULT_DATA_PATH
+        mannschaften = iter_folder_mannschaften(path) if workspace is None else workspace.mannschaften(path)
+        players = players_from_mannschaften(mannschaften)
+    duplicates = find_duplicates(players)
+    for cluster, group in duplicates.groupby("Cluster"):
+        print(f"\t{cluster}: " + " | ".join(f"{row.Name} {row.Vorname} ({row.Quelle})"
+                                             for row in group.itertuples(index=False)))
+    if len(duplicates) > 0:
+        print(f"{duplicates['Cluster'].nunique()} mögliche Duplikate, siehe out/{write_duplicates(duplicates)}")
+    else:
+        print("Keine Duplikate gefunden.")
+
+
+def lint_mannschaften():
+    path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    issues = lint_folder(path if path != "" else DEFAULT_DATA_PATH)
+    for issue in issues[:50]:
+        print(f"\t{issue}")
+    if len(issues) > 50:
+        print(f"\t... und {len(issues) - 50} weitere")
+    if len(issues) > 0:
+        print(f"{len(issues)} Probleme, siehe out/{write_lint_report(issues)}")
+    else:
+        print("Keine Probleme gefunden.")
+
+
+def transcode_mannschaften():
+    path = input(r"""Path to folder with Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    path = path if path != "" else DEFAULT_DATA_PATH
+    dry_run = input("Nur prüfen, nichts schreiben? (default=N): ") in ["Y", "y"]
+    if not dry_run:
+        snapshot_folders([path], "vor Umkodierung")
+    results = transcode_folder(path, KCC_ENCODING, dry_run=dry_run)
+    for result in results:
+        if result.status != STATUS_UNCHANGED:
+            print(f"\t{result}")
+    transcoded = sum(result.status == STATUS_TRANSCODED for result in results)
+    failed = sum(result.status == STATUS_FAILED for result in results)
+    print(f"{len(results)} Dateien: {transcoded} {'umzukodieren' if dry_run else 'umkodiert'}, {failed} nicht "
+          f"umkodierbar, {len(results) - transcoded - failed} bereits {KCC_ENCODING}.")
+
+
+def compare_mannschaften_folders():
+    old_path = input(r"""Path to folder with the old Mannschaften files:
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    new_path = input(r"""Path to folder with the new Mannschaften files:
+            Default is out
+            Path:""")
+    diffs = diff_folders(old_path if old_path != "" else DEFAULT_DATA_PATH, new_path if new_path != "" else "out")
+    for diff in diffs[:50]:
+        print(diff)
+    if len(diffs) > 50:
+        print(f"... und {len(diffs) - 50} weitere")
+    if len(diffs) > 0:
+        print(f"{len(diffs)} Mannschaften unterschiedlich, siehe out/{write_folder_diff(diffs)}")
+    else:
+        print("Keine Unterschiede gefunden.")
+
+
+def manage_snapshots():
+    path = input(r"""Path to folder with Mannschaften files (or out):
+            Default is C:\Control Center Kegeln\Einstellungen\Mannschaften
+            Path:""")
+    path = path if path != "" else DEFAULT_DATA_PATH
+    while True:
+        for snapshot in list_snapshots(path):
+            print(f"\t{snapshot}")
+        wahl = input("(s)ichern, (v)ergleichen ID [ID], (w)iederherstellen ID, leer == zurück: ").split()
+        try:
+            match wahl:
+                case []:
+                    return
+                case ["s"]:
+                    print(f"Gesichert: {create_snapshot(path, 'manuell')}")
+                case ["v", old_id]:
+                    print(diff_snapshots(path, old_id))
+                case ["v", old_id, new_id]:
+                    print(diff_snapshots(path, old_id, new_id))
+                case ["w", snapshot_id]:
+                    if input(f"Ordner {path} auf {snapshot_id} zurücksetzen? (y/N): ") in ["Y", "y"]:
+                        print(restore_snapshot(path, snapshot_id))
+                case _:
+                    logging.warning("Ungültige Eingabe.")
+        except (ValueError, FileNotFoundError):
+            continue
+
+
+def cli_handle(profile: bool = False, profile_memory: bool = False, diagnose: bool = False):
+    """
+    Interactive menu. The messages of every action are collected and summarized at its end, see
+    diagnostics.collect_diagnostics.
+    :param profile: profile every action and write the profile to out/, see profiling.profiled. Default is False
+    :type profile: bool
+    :param profile_memory: also trace the memory allocations of the profiled actions. Default is False
+    :type profile_memory: bool
+    :param diagnose: write all messages of every action to out/Diagnose_[Aktion]_[Datum].jsonl. Default is False
+    :type diagnose: bool
+    """
     print(f"""Mannschaften-KorrekturSystem ({BLUE}MKS{ENDC})
 {GREEN}===================================={ENDC}""")
+    workspace = Workspace(DEFAULT_DATA_PATH)
     while True:
-        while (wahl := print_options(True)) not in ["1", "2", "3", "4", "5", "6", "end"]:
+        while (wahl := print_options(True)) not in ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11",
+                                                     "12", "13", "14", "15", "p", "end"]:
             logging.warning("Ungültige Eingabe. Bitte Zahl eingeben.")
-        match wahl:
-            case "1":
-                create_new_mannschaft()
-            case "2":
-                rewrite_mannschaft()
-            case "3":
-                import_mannschaft_from_csv()
-            case "4":
-                correct_all_mannschaften_in_dir()
-            case "5":
-                export_single_mannschaft()
-            case "6":
-                export_all_mannschaften()
-            case "end":
-                print(f"""Beende Programm. 
+        if wahl == "p":
+            profile, profile_memory = toggle_profiling(profile)
+            continue
+        detail_path = _diagnose_path(ACTION_NAMES[wahl]) if diagnose and wahl != "end" else None
+        with profiled(ACTION_NAMES[wahl], profile_memory) if profile and wahl != "end" else nullcontext(), \
+                collect_diagnostics(detail_path):
+            _run_action(wahl, workspace)
+
+
+def _diagnose_path(action: str) -> Path:
+    today = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    return Path("out").joinpath(f"Diagnose_{action}_{today}.jsonl")
+
+
+def _run_action(wahl: str, workspace: Workspace):
+    match wahl:
+        case "1":
+            create_new_mannschaft()
+        case "2":
+            rewrite_mannschaft()
+        case "3":
+            import_mannschaft_from_csv(workspace)
+        case "4":
+            correct_all_mannschaften_in_dir(workspace)
+        case "5":
+            export_single_mannschaft(workspace=workspace)
+        case "6":
+            export_all_mannschaften(workspace)
+        case "7":
+            import_delta_from_csv()
+        case "8":
+            start_new_season()
+        case "9":
+            sync_spieler_csv_from_mannschaften()
+        case "10":
+            start_query_service()
+        case "11":
+            find_duplicate_players(workspace)
+        case "12":
+            manage_snapshots()
+        case "13":
+            lint_mannschaften()
+        case "14":
+            transcode_mannschaften()
+        case "15":
+            compare_mannschaften_folders()
+        case "end":
+            print(f"""Beende Programm. 
     {GREEN}Gut Holz!{ENDC}""")
-                exit(0)
+            exit(0)
 
 
 if __name__ == '__main__':
-    cli_handle()
+    parser = argparse.ArgumentParser(description="Mannschaften-KorrekturSystem")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile every action with cProfile and write the profile to out/")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="also trace the memory allocations with tracemalloc (implies --profile)")
+    parser.add_argument("--diagnose", action="store_true",
+                        help="write all warnings of every action to out/Diagnose_[Aktion]_[Datum].jsonl")
+    args = parser.parse_args()
+    cli_handle(args.profile or args.profile_memory, args.profile_memory, args.diagnose)
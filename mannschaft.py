@@ -1,3 +1,4 @@
+import copy
 import re
 from datetime import date
 
@@ -6,6 +7,94 @@ import pandas as pd
 from date_parsing import date_parsing_from_word_str
 
 VEREIN_ANGEH = "Verein_angehörig"
+GEBURTSDATUM_PARSED = "Geburtsdatum_geparst"
+MANNSCHAFT_SEPARATOR = ","
+
+
+def _normalize_key_part(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip().lower() if isinstance(value, str) else ""
+
+
+def player_name_key(name: str, vorname: str, geburtsjahr: date) -> str:
+    """
+    Key of a player built from the normalized name, first name and birth month.
+    Only year and month of the birthdate are used, because the .ini files store the date as mm/yy.
+    :return: key in the form "N:name|vorname|yyyy-mm"
+    :rtype: str
+    """
+    geburtsjahr_str = geburtsjahr.strftime("%Y-%m") if isinstance(geburtsjahr, date) else ""
+    return f"N:{_normalize_key_part(name)}|{_normalize_key_part(vorname)}|{geburtsjahr_str}"
+
+
+def player_key(name: str, vorname: str, geburtsjahr: date, passnummer: str) -> str:
+    """
+    Key of a player. The Passnummer is used if present, otherwise the key falls back to player_name_key.
+    :return: key in the form "P:passnummer" or "N:name|vorname|yyyy-mm"
+    :rtype: str
+    """
+    if isinstance(passnummer, str) and passnummer.strip() != "":
+        return f"P:{passnummer.strip()}"
+    return player_name_key(name, vorname, geburtsjahr)
+
+
+def parse_geburtsdatum_column(spieler_csv: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse the column "Geburtsdatum" of a Spieler.csv once and store the dates in the column GEBURTSDATUM_PARSED.
+    Every distinct date string is parsed only once. Dates that can not be parsed stay NaN and are parsed (and reported)
+    again in PlayerData.create_player_from_csv.
+    :param spieler_csv: content of Spieler.csv
+    :type spieler_csv: pd.DataFrame
+    :return: the same DataFrame with the additional column
+    :rtype: pd.DataFrame
+    """
+    parsed = dict()
+    for date_str in spieler_csv["Geburtsdatum"].dropna().unique():
+        try:
+            parsed[date_str] = date_parsing_from_word_str(date_str)
+        except (ValueError, IndexError):
+            continue
+    spieler_csv[GEBURTSDATUM_PARSED] = spieler_csv["Geburtsdatum"].map(parsed)
+    return spieler_csv
+
+
+def split_mannschaft_cell(mannschaft: str) -> list[str]:
+    """
+    Mannschaften of a Mannschaft cell of Spieler.csv. A player can play in several Mannschaften of the Verein, they are
+    separated by MANNSCHAFT_SEPARATOR, e.g. "U18, 1". Empty entries and repetitions are dropped.
+    """
+    parts = [part.strip() for part in mannschaft.split(MANNSCHAFT_SEPARATOR)] if isinstance(mannschaft, str) else [""]
+    return list(dict.fromkeys(part for part in parts if part != "")) or [""]
+
+
+def explode_mannschaften(spieler_csv: pd.DataFrame) -> pd.DataFrame:
+    """
+    Split the Mannschaft cells with several Mannschaften (see split_mannschaft_cell) into one row per Mannschaft.
+    The new rows keep the index of their line in Spieler.csv, so the order and the line numbers of the messages do not
+    change. The split is vectorized and a frame without such cells is returned unchanged.
+    :param spieler_csv: content of Spieler.csv
+    :type spieler_csv: pd.DataFrame
+    :return: one row per player and Mannschaft
+    :rtype: pd.DataFrame
+    """
+    mannschaft = spieler_csv["Mannschaft"]
+    multiple = mannschaft.str.contains(MANNSCHAFT_SEPARATOR, regex=False, na=False)
+    if not multiple.any():
+        return spieler_csv
+    exploded = spieler_csv.assign(Mannschaft=mannschaft.where(~multiple, mannschaft.str.split(MANNSCHAFT_SEPARATOR))) \
+        .explode("Mannschaft")
+    # single Mannschaft cells stay as they are, "U18," and "U18, U18" are one Mannschaft
+    exploded_multiple = multiple.reindex(exploded.index)
+    exploded["Mannschaft"] = exploded["Mannschaft"].where(~exploded_multiple, exploded["Mannschaft"].str.strip())
+    repeated = pd.DataFrame({"row": exploded.index, "mannschaft": exploded["Mannschaft"].values}).duplicated().values
+    keep = ~(exploded_multiple & ((exploded["Mannschaft"] == "") | repeated))
+    return exploded[keep]
+
+
+def get_final_name_for_mannschaften_file(vereins_name: str, mannschaft_name: str) -> str:
+    if mannschaft_name.startswith("U18") or mannschaft_name.startswith("U14"):
+        return f"{mannschaft_name} {vereins_name}"
+    else:
+        return f"{vereins_name} {mannschaft_name}"
 
 
 class PlayerData:
@@ -46,7 +135,9 @@ class PlayerData:
     def create_player_from_csv(row: pd.Series) -> 'PlayerData':
         try:
             date_str = row["Geburtsdatum"]
-            geburtsjahr = date_parsing_from_word_str(date_str)
+            geburtsjahr = row.get(GEBURTSDATUM_PARSED)
+            if not isinstance(geburtsjahr, date):
+                geburtsjahr = date_parsing_from_word_str(date_str)
             verein_show = row[VEREIN_ANGEH]
             if not isinstance(verein_show, str) and pd.isna(verein_show):
                 verein_show = ""
@@ -75,6 +166,17 @@ class PlayerData:
                           player_dict["Altersklasse"], player_dict["Passnummer"], player_dict["Rangliste"],
                           player_dict["Verein"], player_dict["Verein_angehörig"])
 
+    def replace(self, **changes) -> 'PlayerData':
+        """
+        Return a copy of the player with the given attributes changed, e.g. player.replace(altersklasse="U18")
+        """
+        values = dict(name=self.name, vorname=self.vorname, letztes_spiel=self.letztes_spiel,
+                      platz_ziffer=self.platz_ziffer, spielernr=self.spielernr, geburtsjahr=self.geburtsjahr,
+                      altersklasse=self.altersklasse, passnummer=self.passnummer, rangliste=self.rangliste,
+                      verein=self.verein, verein_show=self.verein_show)
+        values.update(changes)
+        return PlayerData(**values)
+
     @staticmethod
     def create_platzhalter(number: int = 0):
         return PlayerData(f"Name {number}", f"Vorname {number}", "", "", "", None, "", "", "", "")
@@ -123,6 +225,14 @@ class PlayerData:
     def verein_show(self) -> str:
         return self.__verein_show
 
+    @property
+    def key(self) -> str:
+        return player_key(self.name, self.vorname, self.geburtsjahr, self.passnummer)
+
+    @property
+    def name_key(self) -> str:
+        return player_name_key(self.name, self.vorname, self.geburtsjahr)
+
     def is_platzhalter(self):
         return re.match(r"Vorname \d+", self.vorname) and re.match(r"Name \d+", self.name)
 
@@ -176,6 +286,18 @@ class GeneralData:
         self.verein_kurz = verein_kurz.strip()
         self.mannschaft = mannschaft if mannschaft is not None else self.name
 
+    @staticmethod
+    def create_from_csv(row: pd.Series, anzahl_spieler: int = -1) -> 'GeneralData':
+        """
+        Create the GeneralData from a row of Mannschaften.csv. Missing values are replaced with empty strings.
+        """
+        def value(column: str) -> str:
+            return "" if pd.isna(row[column]) else row[column]
+
+        return GeneralData(value("Mannschaft"), value("Spielklasse"), value("Liga"), value("Bezirk"),
+                           value("Spielführer"), value("Betreuer"), value("Vereinsnummer"), value("LV-Nummer"),
+                           anzahl_spieler, value("Verein"), value("Verein Kurz"))
+
     def __str__(self):
         return f"""Name={self.name} 
 Spielklasse={self.spielklasse}
@@ -206,6 +328,13 @@ class MannschaftData:
     def set_players(self, players: list[PlayerData]):
         self._players = players
 
+    def copy(self) -> 'MannschaftData':
+        """
+        Copy with its own GeneralData and player list. The PlayerData objects are shared.
+        """
+        return MannschaftData(self._file_name, copy.copy(self._general_data),
+                              None if self._players is None else list(self._players))
+
     def sort(self, function: callable = None):
         if function is None:
             self._players = sorted(self._players, key=lambda x: x.name)
@@ -0,0 +1,207 @@
+import logging
+import re
+from collections import Counter
+from collections.abc import Iterable
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from csv_files import cell_str, write_csv
+from diagnostics import report
+
+MATCH_EXACT = "exakt"
+MATCH_NORMALIZED = "normalisiert"
+MATCH_AUTO = "automatisch"
+MATCH_AMBIGUOUS = "mehrdeutig"
+MATCH_NONE = "keine"
+MATCH_COLUMNS = ["Art", "Verein", "Wert", "Zuordnung", "Score", "Status", "Kandidaten"]
+
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss", "é": "e", "è": "e"})
+_LEGAL_FORM = re.compile(r"\b(e\s*\.?\s*v|ev)\b\.?")
+_NOT_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBERS = re.compile(r"\d+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a Verein or Mannschaft name for the comparison: lower case, umlauts transliterated (ü -> ue),
+    "e.V." removed and all other characters except letters and digits replaced by a single space.
+    "KV Müller-Holz e. V. " and "kv mueller holz" are equal after the normalization.
+    """
+    normalized = cell_str(name).casefold().translate(_UMLAUTE)
+    normalized = _LEGAL_FORM.sub(" ", normalized)
+    return _NOT_ALNUM.sub(" ", normalized).strip()
+
+
+def _ngrams(normalized: str, n: int) -> set[str]:
+    padded = f" {normalized} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class NameMatch:
+    """
+    Result of matching a name against the known names. candidate is the accepted name or None. For ambiguous matches
+    alternatives contains the best candidates with their score.
+    """
+
+    def __init__(self, name: str, candidate: str | None, score: float, status: str,
+                 alternatives: list[tuple[str, float]] = None):
+        self.name = name
+        self.candidate = candidate
+        self.score = score
+        self.status = status
+        self.alternatives = alternatives if alternatives is not None else []
+
+    @property
+    def accepted(self) -> bool:
+        return self.candidate is not None
+
+    def __str__(self):
+        return f"{self.name} -> {self.candidate} ({self.status}, {self.score:.2f})"
+
+
+class NameMatcher:
+    """
+    Fuzzy matching of names against a fixed list of known names. To avoid comparing every pair, the known names are
+    put into blocks by their character n-grams and by the prefix of the normalized name. Only names that share
+    blocks with the searched name are scored. Blocks with more than max_block_size names (e.g. " sv") carry no
+    information and are skipped.
+    Names that contain numbers only match names with the same numbers, so "Herren 1" never becomes "Herren 2".
+    """
+
+    def __init__(self, names: Iterable[str], n: int = 3, prefix_length: int = 4, max_block_size: int = 100,
+                 max_candidates: int = 20):
+        self.names = list(dict.fromkeys(cell_str(name) for name in names))
+        self._known = set(self.names)
+        self._n = n
+        self._prefix_length = prefix_length
+        self._max_block_size = max_block_size
+        self._max_candidates = max_candidates
+        self._normalized = [normalize_name(name) for name in self.names]
+        self._by_normalized: dict[str, list[int]] = dict()
+        self._blocks: dict[str, list[int]] = dict()
+        for position, normalized in enumerate(self._normalized):
+            self._by_normalized.setdefault(normalized, []).append(position)
+            for block in self._block_keys(normalized):
+                self._blocks.setdefault(block, []).append(position)
+
+    def _block_keys(self, normalized: str) -> set[str]:
+        return _ngrams(normalized, self._n) | {f"^{normalized[:self._prefix_length]}"}
+
+    def _candidates(self, normalized: str) -> list[int]:
+        shared = Counter()
+        for block in self._block_keys(normalized):
+            positions = self._blocks.get(block, ())
+            if len(positions) <= self._max_block_size or block.startswith("^"):
+                shared.update(positions)
+        return [position for position, _ in shared.most_common(self._max_candidates)]
+
+    @staticmethod
+    def score(normalized: str, other: str) -> float:
+        """
+        Similarity of two normalized names between 0 and 1. Names with different numbers have a score of 0.
+        """
+        if _NUMBERS.findall(normalized) != _NUMBERS.findall(other):
+            return 0.0
+        return SequenceMatcher(None, normalized, other, autojunk=False).ratio()
+
+    def match(self, name: str, threshold: float = 0.9, margin: float = 0.05, min_score: float = 0.6) -> NameMatch:
+        """
+        Find the known name for the given name.
+        Exact and normalized matches are always accepted. A fuzzy match is accepted if its score is at least threshold
+        and the second best candidate is more than margin worse. Otherwise, candidates with at least min_score are
+        returned as ambiguous.
+        :param name: searched name
+        :type name: str
+        :param threshold: minimal score to accept a match automatically. Default is 0.9
+        :type threshold: float
+        :param margin: minimal distance to the second best candidate. Default is 0.05
+        :type margin: float
+        :param min_score: minimal score of a candidate for the review list. Default is 0.6
+        :type min_score: float
+        :return: the match
+        :rtype: NameMatch
+        """
+        name = cell_str(name)
+        if name in self._known:
+            return NameMatch(name, name, 1.0, MATCH_EXACT)
+        normalized = normalize_name(name)
+        same = self._by_normalized.get(normalized, [])
+        if len(same) == 1:
+            return NameMatch(name, self.names[same[0]], 1.0, MATCH_NORMALIZED)
+        if len(same) > 1:
+            return NameMatch(name, None, 1.0, MATCH_AMBIGUOUS, [(self.names[position], 1.0) for position in same])
+        scored = sorted(((self.score(normalized, self._normalized[position]), self.names[position])
+                         for position in self._candidates(normalized)), reverse=True)
+        scored = [(candidate, score) for score, candidate in scored if score >= min_score]
+        if not scored:
+            return NameMatch(name, None, 0.0, MATCH_NONE)
+        best, best_score = scored[0]
+        if best_score >= threshold and (len(scored) == 1 or scored[1][1] < best_score - margin):
+            return NameMatch(name, best, best_score, MATCH_AUTO)
+        return NameMatch(name, None, best_score, MATCH_AMBIGUOUS, scored[:5])
+
+
+def match_vereine_mannschaften(spieler_csv: pd.DataFrame, mannschaften_csv: pd.DataFrame, threshold: float = 0.9) \
+        -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Map the Verein and Mannschaft names of Spieler.csv to the names of Mannschaften.csv, so that players with slightly
+    different spellings (spaces, "e.V.", umlauts, typos) are not dropped by the exact join of the import.
+    First the Vereine are matched, then the Mannschaften within the matched Verein. Accepted matches replace the names
+    in the returned Spieler.csv, ambiguous matches are kept unchanged and listed for a review.
+    :param spieler_csv: content of Spieler.csv
+    :type spieler_csv: pd.DataFrame
+    :param mannschaften_csv: content of Mannschaften.csv
+    :type mannschaften_csv: pd.DataFrame
+    :param threshold: minimal score to accept a fuzzy match, see NameMatcher.match. Default is 0.9
+    :type threshold: float
+    :return: Spieler.csv with the mapped names and all matches that are not exact (columns MATCH_COLUMNS)
+    :rtype: tuple[pd.DataFrame, pd.DataFrame]
+    """
+    rows = []
+    vereine_matcher = NameMatcher(mannschaften_csv["Verein"].dropna())
+    vereine = {verein: vereine_matcher.match(verein, threshold) for verein in spieler_csv["Verein"].dropna().unique()}
+    for match in vereine.values():
+        if match.status != MATCH_EXACT:
+            rows.append(_match_row("Verein", "", match))
+    verein_map = {verein: match.candidate for verein, match in vereine.items() if match.accepted}
+    spieler_csv = spieler_csv.assign(Verein=spieler_csv["Verein"].map(verein_map).fillna(spieler_csv["Verein"]))
+
+    mannschaften_by_verein = {verein: NameMatcher(group["Mannschaft"].fillna(""))
+                              for verein, group in mannschaften_csv.groupby("Verein")}
+    mannschaft_map = dict()
+    pairs = spieler_csv[["Verein", "Mannschaft"]].dropna(subset=["Verein"]).fillna("").drop_duplicates()
+    for verein, mannschaft in pairs.itertuples(index=False):
+        matcher = mannschaften_by_verein.get(verein)
+        if matcher is None:
+            continue
+        match = matcher.match(mannschaft, threshold)
+        if match.status != MATCH_EXACT:
+            rows.append(_match_row("Mannschaft", verein, match))
+        if match.accepted:
+            mannschaft_map[(verein, mannschaft)] = match.candidate
+    if mannschaft_map:
+        keys = pd.Series(list(zip(spieler_csv["Verein"], spieler_csv["Mannschaft"].fillna(""))),
+                         index=spieler_csv.index)
+        spieler_csv = spieler_csv.assign(Mannschaft=keys.map(mannschaft_map).fillna(spieler_csv["Mannschaft"]))
+    return spieler_csv, pd.DataFrame(rows, columns=MATCH_COLUMNS)
+
+
+def _match_row(art: str, verein: str, match: NameMatch) -> list:
+    kandidaten = ", ".join(f"{candidate} ({score:.2f})" for candidate, score in match.alternatives)
+    return [art, verein, match.name, match.candidate or "", round(match.score, 3), match.status, kandidaten]
+
+
+def report_matches(matches: pd.DataFrame) -> None:
+    """
+    Log a summary of the matches and write them to out/Zuordnung_[Datum].csv for the review.
+    """
+    if len(matches) == 0:
+        return
+    counts = matches["Status"].value_counts()
+    logging.warning(f"Namensabgleich: {counts.get(MATCH_NORMALIZED, 0) + counts.get(MATCH_AUTO, 0)} zugeordnet, "
+                    f"{counts.get(MATCH_AMBIGUOUS, 0)} mehrdeutig, {counts.get(MATCH_NONE, 0)} ohne Treffer.")
+    for row in matches[matches["Status"] == MATCH_AMBIGUOUS].itertuples(index=False):
+        report(f"Mehrdeutige Zuordnung ({row.Art})", f"{row.Wert} -> {row.Kandidaten}", row.Verein)
+    today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
+    write_csv(matches.to_dict("records"), f"Zuordnung_{today}")
@@ -0,0 +1,83 @@
+import cProfile
+import datetime
+import io
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def profiled(action: str, memory: bool = False, top: int = 25, out_dir: Path = Path("out")):
+    """
+    Profile the code in the with block with cProfile and optionally tracemalloc. Afterwards the raw statistics are
+    written to out/profile_[action]_[Datum].pstats (readable with pstats or snakeviz) and a short summary of the top
+    functions and allocations to out/profile_[action]_[Datum].txt. The files are also written if the block raises.
+    :param action: name of the profiled action, used in the file names
+    :type action: str
+    :param memory: trace the memory allocations with tracemalloc. Slows the action down noticeably. Default is False
+    :type memory: bool
+    :param top: number of functions and allocations in the summary. Default is 25
+    :type top: int
+    :param out_dir: folder for the files. Default is out
+    :type out_dir: Path
+    """
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    start = datetime.datetime.now()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        snapshot, peak = None, None
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        write_profile(profiler, action, start, snapshot, peak, top, Path(out_dir))
+
+
+def write_profile(profiler: cProfile.Profile, action: str, start: datetime.datetime,
+                  snapshot: tracemalloc.Snapshot = None, peak: int = None, top: int = 25,
+                  out_dir: Path = Path("out")) -> tuple[Path, Path]:
+    """
+    Write the statistics of a profiler and the summary, see profiled.
+    :return: path of the .pstats file and of the summary
+    :rtype: tuple[Path, Path]
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base = out_dir.joinpath(f"profile_{action}_{start.strftime('%Y-%m-%d-%H-%M-%S')}")
+    stats_path = base.with_suffix(".pstats")
+    summary_path = base.with_suffix(".txt")
+    profiler.dump_stats(stats_path)
+    summary_path.write_text(profile_summary(profiler, action, start, snapshot, peak, top), encoding="utf-8")
+    print(f"Profil geschrieben: {stats_path}, {summary_path}")
+    return stats_path, summary_path
+
+
+def profile_summary(profiler: cProfile.Profile, action: str, start: datetime.datetime,
+                    snapshot: tracemalloc.Snapshot = None, peak: int = None, top: int = 25) -> str:
+    """
+    Human readable summary of a profile: top functions by cumulative and by own time and, with a tracemalloc
+    snapshot, the lines with the largest allocations.
+    """
+    out = io.StringIO()
+    out.write(f"Aktion: {action}\nStart: {start:%Y-%m-%d %H:%M:%S}\n")
+    stats = pstats.Stats(profiler, stream=out)
+    out.write(f"Dauer: {stats.total_tt:.3f}s\n\n")
+    stats.strip_dirs()
+    for sort in (pstats.SortKey.CUMULATIVE, pstats.SortKey.TIME):
+        out.write(f"=== Top {top} nach {sort.value} ===\n")
+        stats.sort_stats(sort).print_stats(top)
+    if snapshot is not None:
+        out.write(f"=== Top {top} Speicherallokationen (Peak {peak / 1024 / 1024:.1f} MiB) ===\n")
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                           tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                                           tracemalloc.Filter(False, "<unknown>")))
+        for statistic in snapshot.statistics("lineno")[:top]:
+            out.write(f"{statistic}\n")
+    return out.getvalue()
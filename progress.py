@@ -0,0 +1,116 @@
+import sys
+import time
+from collections.abc import Iterable, Iterator
+
+
+class ProgressState:
+    """
+    Snapshot of a running stage that is passed to the progress callbacks.
+    """
+
+    def __init__(self, stage: str, done: int, total: int | None, elapsed: float):
+        self.stage = stage
+        self.done = done
+        self.total = total
+        self.elapsed = elapsed
+
+    @property
+    def rate(self) -> float:
+        """
+        :return: processed items per second
+        :rtype: float
+        """
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """
+        :return: estimated remaining seconds or None if the total or the rate is unknown
+        :rtype: float | None
+        """
+        if self.total is None or self.rate == 0:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def __str__(self):
+        total = f"/{self.total}" if self.total is not None else ""
+        percent = f" ({self.done / self.total:.0%})" if self.total else ""
+        eta = f", ETA {self.eta:.0f}s" if self.eta is not None else ""
+        return f"{self.stage}: {self.done}{total}{percent}, {self.rate:.1f}/s{eta}"
+
+
+class Progress:
+    """
+    Progress of a stage (e.g. files written or rows imported). It is rendered in one line on the terminal and/or
+    reported to a callback. Without terminal and callback update only counts, so it costs almost nothing in batch runs.
+    Terminal output and callback are throttled to one call per interval, the last state is always reported on close.
+    """
+
+    def __init__(self, stage: str, total: int = None, callback: callable = None, stream=None,
+                 interval: float = 0.2, render: bool = True):
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self._callback = callback
+        self._stream = sys.stderr if stream is None else stream
+        self._render = render and hasattr(self._stream, "isatty") and self._stream.isatty()
+        self._active = self._render or callback is not None
+        self._interval = interval
+        self._start = time.monotonic()
+        self._last = 0.0
+
+    def update(self, n: int = 1) -> None:
+        self.done += n
+        if not self._active:
+            return
+        now = time.monotonic()
+        if now - self._last >= self._interval:
+            self._last = now
+            self._report(now)
+
+    def _report(self, now: float) -> None:
+        state = ProgressState(self.stage, self.done, self.total, now - self._start)
+        if self._render:
+            self._stream.write(f"\r{state}\033[K")
+            self._stream.flush()
+        if self._callback is not None:
+            self._callback(state)
+
+    def close(self) -> None:
+        if not self._active:
+            return
+        self._report(time.monotonic())
+        if self._render:
+            self._stream.write("\n")
+            self._stream.flush()
+
+    def __enter__(self) -> 'Progress':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def track(iterable: Iterable, stage: str, total: int = None, callback: callable = None,
+          render: bool = True) -> Iterator:
+    """
+    Iterate over iterable and report the progress, see Progress.
+    :param iterable: items to iterate over
+    :type iterable: Iterable
+    :param stage: name of the stage, e.g. "Export"
+    :type stage: str
+    :param total: number of items. Default is len(iterable) if available
+    :type total: int
+    :param callback: function that is called with a ProgressState
+    :type callback: callable
+    :param render: render the progress on the terminal. Default is True
+    :type render: bool
+    :return: the items of iterable
+    :rtype: Iterator
+    """
+    if total is None and hasattr(iterable, "__len__"):
+        total = len(iterable)
+    with Progress(stage, total, callback, render=render) as progress:
+        for item in iterable:
+            yield item
+            progress.update()
@@ -0,0 +1,232 @@
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import pandas as pd
+
+from mannschaft import MannschaftData, PlayerData
+from workspace import Workspace
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def player_to_dict(player: PlayerData) -> dict:
+    return {"name": player.name, "vorname": player.vorname,
+            "geburtsjahr": player.geburtsjahr.isoformat() if player.geburtsjahr is not None else None,
+            "altersklasse": player.altersklasse, "passnummer": player.passnummer, "verein": player.verein,
+            "letztes_spiel": player.letztes_spiel, "platz_ziffer": player.platz_ziffer,
+            "spielernr": player.spielernr, "rangliste": player.rangliste, "platzhalter": player.is_platzhalter()}
+
+
+def mannschaft_to_dict(mannschaft: MannschaftData, with_players: bool = True) -> dict:
+    general_data = mannschaft.general_data
+    result = {"datei": mannschaft.file_name, "name": general_data.name, "spielklasse": general_data.spielklasse,
+              "liga": general_data.liga, "bezirk": general_data.bezirk, "spielfuehrer": general_data.spielfuehrer,
+              "betreuer": general_data.betreuer, "vereins_nummer": general_data.vereins_nummer,
+              "lv_nummer": general_data.lv_nummer, "anzahl_spieler": general_data.anzahl_spieler}
+    if with_players:
+        result["spieler"] = [player_to_dict(player) for player in mannschaft.players]
+    return result
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+class TeamIndex:
+    """
+    In-memory indexes of the .ini files of a folder by file name, Verein and Passnummer. The folder is loaded once
+    through a Workspace. Afterwards only changed files are read again and only their index entries are replaced.
+    The folder is checked at most every refresh_interval seconds, so queries do not stat the whole folder.
+    All methods are thread safe.
+    """
+
+    def __init__(self, folder_name: str, refresh_interval: float = 1.0):
+        self.folder_name = folder_name
+        self.refresh_interval = refresh_interval
+        self._workspace = Workspace(folder_name)
+        self._lock = threading.RLock()
+        self._last_refresh = None
+        self.by_team: dict[str, MannschaftData] = dict()
+        self.by_verein: dict[str, set[str]] = dict()
+        self.by_passnummer: dict[str, set[str]] = dict()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Take over the changed files of the folder into the indexes.
+        :param force: refresh even if the last refresh is younger than refresh_interval. Default is False
+        :type force: bool
+        :return: number of changed files
+        :rtype: int
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+                return 0
+            self._last_refresh = now
+            changed = self._workspace.changed_mannschaften()
+            for file_name, mannschaft in changed.items():
+                self._remove(file_name)
+                if mannschaft is not None:
+                    self._add(mannschaft)
+            if changed:
+                logging.info(f"Index aktualisiert: {len(changed)} Dateien geändert, {len(self.by_team)} Mannschaften.")
+            return len(changed)
+
+    @staticmethod
+    def _vereine(mannschaft: MannschaftData) -> set[str]:
+        return {_normalize(player.verein) for player in mannschaft.players if player.verein != ""}
+
+    @staticmethod
+    def _passnummern(mannschaft: MannschaftData) -> set[str]:
+        return {player.passnummer for player in mannschaft.players if player.passnummer != ""}
+
+    def _add(self, mannschaft: MannschaftData) -> None:
+        self.by_team[mannschaft.file_name] = mannschaft
+        for verein in self._vereine(mannschaft):
+            self.by_verein.setdefault(verein, set()).add(mannschaft.file_name)
+        for passnummer in self._passnummern(mannschaft):
+            self.by_passnummer.setdefault(passnummer, set()).add(mannschaft.file_name)
+
+    def _remove(self, file_name: str) -> None:
+        mannschaft = self.by_team.pop(file_name, None)
+        if mannschaft is None:
+            return
+        for index, keys in ((self.by_verein, self._vereine(mannschaft)),
+                            (self.by_passnummer, self._passnummern(mannschaft))):
+            for key in keys:
+                index[key].discard(file_name)
+                if not index[key]:
+                    del index[key]
+
+    def teams(self) -> list[MannschaftData]:
+        self.refresh()
+        with self._lock:
+            return [self.by_team[file_name] for file_name in sorted(self.by_team)]
+
+    def team(self, file_name: str) -> MannschaftData | None:
+        self.refresh()
+        if file_name.endswith(".ini"):
+            file_name = file_name[:-4]
+        with self._lock:
+            return self.by_team.get(file_name)
+
+    def verein(self, name: str) -> list[MannschaftData]:
+        self.refresh()
+        with self._lock:
+            return [self.by_team[file_name] for file_name in sorted(self.by_verein.get(_normalize(name), ()))]
+
+    def spieler(self, passnummer: str) -> list[tuple[MannschaftData, PlayerData]]:
+        """
+        :return: all Mannschaften with a player with the Passnummer and the player
+        :rtype: list[tuple[MannschaftData, PlayerData]]
+        """
+        self.refresh()
+        passnummer = passnummer.strip()
+        with self._lock:
+            mannschaften = [self.by_team[file_name] for file_name in sorted(self.by_passnummer.get(passnummer, ()))]
+        return [(mannschaft, player) for mannschaft in mannschaften for player in mannschaft.players
+                if player.passnummer == passnummer]
+
+
+def _players_csv(mannschaften: list[MannschaftData]) -> str:
+    frames = [mannschaft.players_as_dataframe() for mannschaft in mannschaften if mannschaft.players]
+    if not frames:
+        return ""
+    return pd.concat(frames, ignore_index=True).to_csv(sep=";", index=False)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Read-only JSON API over a TeamIndex (server.index):
+    GET /health, /teams, /teams/<Datei>, /teams/<Datei>.csv, /vereine/<Verein>, /spieler/<Passnummer>, /export.csv
+    """
+    server: 'QueryServer'
+
+    def do_GET(self):
+        parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/", 1)]
+        index = self.server.index
+        match parts:
+            case ["health"]:
+                self._send_json({"status": "ok", "mannschaften": len(index.by_team)})
+            case ["teams"]:
+                self._send_json([mannschaft_to_dict(mannschaft, False) for mannschaft in index.teams()])
+            case ["teams", name] if name.endswith(".csv"):
+                mannschaft = index.team(name[:-4])
+                if mannschaft is None:
+                    self._send_error(f"Mannschaft {name[:-4]} nicht gefunden")
+                else:
+                    self._send_csv(_players_csv([mannschaft]))
+            case ["teams", name]:
+                mannschaft = index.team(name)
+                if mannschaft is None:
+                    self._send_error(f"Mannschaft {name} nicht gefunden")
+                else:
+                    self._send_json(mannschaft_to_dict(mannschaft))
+            case ["vereine", name]:
+                self._send_json([mannschaft_to_dict(mannschaft) for mannschaft in index.verein(name)])
+            case ["spieler", passnummer]:
+                self._send_json([dict(player_to_dict(player), mannschaft=mannschaft.file_name)
+                                 for mannschaft, player in index.spieler(passnummer)])
+            case ["export.csv"]:
+                self._send_csv(_players_csv(index.teams()))
+            case _:
+                self._send_error(f"Unbekannter Pfad {self.path}")
+
+    def _send(self, body: str, content_type: str, status: HTTPStatus = HTTPStatus.OK) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, value, status: HTTPStatus = HTTPStatus.OK) -> None:
+        self._send(json.dumps(value, ensure_ascii=False), "application/json", status)
+
+    def _send_csv(self, text: str) -> None:
+        self._send(text, "text/csv")
+
+    def _send_error(self, message: str) -> None:
+        self._send_json({"error": message}, HTTPStatus.NOT_FOUND)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, index: TeamIndex, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.index = index
+        super().__init__((host, port), QueryHandler)
+
+
+def serve_folder(folder_name: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 refresh_interval: float = 1.0) -> None:
+    """
+    Load the folder into a TeamIndex and answer HTTP/JSON queries until Ctrl+C is pressed. The service only listens
+    on localhost by default.
+    :param folder_name: folder with the .ini files
+    :type folder_name: str
+    :param host: address to listen on. Default is 127.0.0.1
+    :type host: str
+    :param port: port to listen on. Default is 8765
+    :type port: int
+    :param refresh_interval: minimal seconds between two checks of the folder. Default is 1
+    :type refresh_interval: float
+    """
+    index = TeamIndex(folder_name, refresh_interval)
+    with QueryServer(index, host, port) as server:
+        print(f"Abfragedienst läuft auf http://{host}:{server.server_address[1]}/ "
+              f"({len(index.by_team)} Mannschaften). Beenden mit Strg+C.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Abfragedienst beendet.")
@@ -0,0 +1,173 @@
+from collections.abc import Iterable
+
+import pandas as pd
+
+from csv_files import cell_str, read_csv, write_csv
+from date_parsing import date_to_word_str
+from diagnostics import report
+from ini_files import get_mannschaft_file_name, iter_folder_mannschaften
+from mannschaft import GEBURTSDATUM_PARSED, MannschaftData, PlayerData, get_final_name_for_mannschaften_file, \
+    parse_geburtsdatum_column, player_key, player_name_key, split_mannschaft_cell
+
+SYNC_FIELDS = ["Name", "Vorname", "Geburtsdatum", "Altersklasse", "Passnummer", "Mannschaft"]
+CONFLICT_COLUMNS = ["Datei", "Name", "Vorname", "Feld", "Basis", "Spieler.csv", "Mannschaft (.ini)"]
+
+
+class _SpielerIndex:
+    """
+    Hash indexes of a Spieler.csv by Passnummer key and by name key (see player_key and player_name_key).
+    """
+
+    def __init__(self, spieler_csv: pd.DataFrame):
+        self.by_key: dict[str, int] = dict()
+        self.by_name_key: dict[str, int] = dict()
+        for index, name, vorname, geburtsjahr, passnummer in zip(
+                spieler_csv.index, spieler_csv["Name"], spieler_csv["Vorname"], spieler_csv[GEBURTSDATUM_PARSED],
+                spieler_csv["Passnummer"]):
+            geburtsjahr = geburtsjahr if not pd.isna(geburtsjahr) else None
+            self.by_key.setdefault(player_key(name, vorname, geburtsjahr, cell_str(passnummer)), index)
+            self.by_name_key.setdefault(player_name_key(name, vorname, geburtsjahr), index)
+
+    def find(self, key: str, name_key: str) -> int | None:
+        index = self.by_key.get(key)
+        return index if index is not None else self.by_name_key.get(name_key)
+
+
+def _csv_value(spieler_csv: pd.DataFrame, index, field: str) -> str:
+    """
+    Comparable value of a Spieler.csv cell. Dates are compared by month, because the .ini files store mm/yy.
+    """
+    if field == "Geburtsdatum":
+        geburtsjahr = spieler_csv.at[index, GEBURTSDATUM_PARSED]
+        return "" if pd.isna(geburtsjahr) else geburtsjahr.strftime("%Y-%m")
+    return cell_str(spieler_csv.at[index, field])
+
+
+def _ini_value(player: PlayerData, mannschaft: str, field: str) -> str:
+    match field:
+        case "Name":
+            return player.name
+        case "Vorname":
+            return player.vorname
+        case "Geburtsdatum":
+            return "" if player.geburtsjahr is None else player.geburtsjahr.strftime("%Y-%m")
+        case "Altersklasse":
+            return player.altersklasse
+        case "Passnummer":
+            return player.passnummer
+        case "Mannschaft":
+            return mannschaft
+    raise ValueError(f"Unknown field {field}")
+
+
+def _set_csv_value(spieler_csv: pd.DataFrame, index, field: str, player: PlayerData, value: str) -> None:
+    if field == "Geburtsdatum":
+        spieler_csv.at[index, "Geburtsdatum"] = date_to_word_str(player.geburtsjahr)
+        spieler_csv.at[index, GEBURTSDATUM_PARSED] = player.geburtsjahr
+    else:
+        spieler_csv.at[index, field] = value
+
+
+def reverse_sync(mannschaften: Iterable[MannschaftData], spieler_csv: pd.DataFrame, mannschaften_csv: pd.DataFrame,
+                 base_csv: pd.DataFrame = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Take over the changes of the .ini files into Spieler.csv. Every player of the Mannschaften is looked up in
+    Spieler.csv by Passnummer and, if it is missing, by name and birth month. Players that are not in Spieler.csv are
+    added. Empty values of the .ini files never overwrite Spieler.csv.
+    If base_csv (the Spieler.csv of the last import) is given, a field that changed in the .ini file and in Spieler.csv
+    is a conflict and keeps the value of Spieler.csv. Without base_csv the .ini file always wins.
+    :param mannschaften: Mannschaften, e.g. from iter_folder_mannschaften
+    :type mannschaften: Iterable[MannschaftData]
+    :param spieler_csv: current Spieler.csv
+    :type spieler_csv: pd.DataFrame
+    :param mannschaften_csv: Mannschaften.csv to map the file names back to Verein and Mannschaft
+    :type mannschaften_csv: pd.DataFrame
+    :param base_csv: Spieler.csv of the last import. Default is None
+    :type base_csv: pd.DataFrame
+    :return: the updated Spieler.csv and the conflicts
+    :rtype: tuple[pd.DataFrame, pd.DataFrame]
+    """
+    spieler_csv = spieler_csv.reset_index(drop=True)
+    if GEBURTSDATUM_PARSED not in spieler_csv.columns:
+        spieler_csv = parse_geburtsdatum_column(spieler_csv)
+    if base_csv is not None:
+        base_csv = base_csv.reset_index(drop=True)
+        if GEBURTSDATUM_PARSED not in base_csv.columns:
+            base_csv = parse_geburtsdatum_column(base_csv)
+    teams = {get_mannschaft_file_name(get_final_name_for_mannschaften_file(verein, mannschaft)): (verein, mannschaft)
+             for verein, mannschaft in zip(mannschaften_csv["Verein"].map(cell_str),
+                                           mannschaften_csv["Mannschaft"].map(cell_str))}
+    index = _SpielerIndex(spieler_csv)
+    base_index = _SpielerIndex(base_csv) if base_csv is not None else None
+    new_rows = []
+    conflicts = []
+    seen = set()
+    for mannschaft in mannschaften:
+        verein, team = teams.get(mannschaft.file_name, ("", ""))
+        for player in mannschaft.players:
+            if player.is_platzhalter() or not player.valid:
+                continue
+            row = index.find(player.key, player.name_key)
+            if row is None:
+                new_rows.append({"Vorname": player.vorname, "Name": player.name,
+                                 "Geburtsdatum": date_to_word_str(player.geburtsjahr),
+                                 "Altersklasse": player.altersklasse, "Passnummer": player.passnummer,
+                                 "Verein": verein if verein != "" else player.verein, "Mannschaft": team,
+                                 GEBURTSDATUM_PARSED: player.geburtsjahr})
+                continue
+            if row in seen:
+                if team in split_mannschaft_cell(_csv_value(spieler_csv, row, "Mannschaft")):
+                    continue
+                report("Spieler in mehreren Mannschaften, weitere werden ignoriert", f"{player.name} {player.vorname}",
+                       mannschaft.file_name)
+                continue
+            seen.add(row)
+            base_row = None
+            if base_index is not None:
+                base_row = base_index.find(player.key, player.name_key)
+            for field in SYNC_FIELDS:
+                ini_value = _ini_value(player, team, field)
+                csv_value = _csv_value(spieler_csv, row, field)
+                if ini_value == "" or ini_value == csv_value:
+                    continue
+                if field == "Mannschaft" and ini_value in split_mannschaft_cell(csv_value):
+                    # player of several Mannschaften, the cell lists this one
+                    continue
+                if base_row is not None:
+                    base_value = _csv_value(base_csv, base_row, field)
+                    if ini_value == base_value:
+                        continue
+                    if csv_value != base_value:
+                        conflicts.append([mannschaft.file_name, player.name, player.vorname, field, base_value,
+                                          csv_value, ini_value])
+                        continue
+                _set_csv_value(spieler_csv, row, field, player, ini_value)
+    if new_rows:
+        spieler_csv = pd.concat([spieler_csv, pd.DataFrame(new_rows)], ignore_index=True)
+    return spieler_csv, pd.DataFrame(conflicts, columns=CONFLICT_COLUMNS)
+
+
+def reverse_sync_folder(folder_name: str, spieler: str = "Spieler", mannschaften: str = "Mannschaften",
+                        base: str = None) -> pd.DataFrame:
+    """
+    Read all .ini files of the folder, take over the changes into Spieler.csv (see reverse_sync) and write the result
+    to out/Spieler_sync_[Datum].csv and the conflicts to out/Konflikte_[Datum].csv.
+    :param folder_name: folder with the .ini files
+    :type folder_name: str
+    :param spieler: name of Spieler.csv. Default is "Spieler"
+    :type spieler: str
+    :param mannschaften: name of Mannschaften.csv. Default is "Mannschaften"
+    :type mannschaften: str
+    :param base: name of the Spieler.csv of the last import. Default is None (the .ini files always win)
+    :type base: str
+    :return: the conflicts
+    :rtype: pd.DataFrame
+    """
+    updated, conflicts = reverse_sync(iter_folder_mannschaften(folder_name), read_csv(spieler), read_csv(mannschaften),
+                                      read_csv(base) if base is not None else None)
+    today = pd.Timestamp.today().strftime("%Y-%m-%d-%H-%M")
+    write_csv(updated.drop(columns=GEBURTSDATUM_PARSED).to_dict("records"), f"Spieler_sync_{today}")
+    if len(conflicts) > 0:
+        write_csv(conflicts.to_dict("records"), f"Konflikte_{today}")
+    print(f"Spieler_sync_{today}.csv geschrieben. {len(conflicts)} Konflikte.")
+    return conflicts
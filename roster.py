@@ -0,0 +1,124 @@
+import heapq
+import math
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+
+from altersklasse import DEFAULT_ALTERSKLASSEN_REGELN
+from csv_files import cell_str
+from date_parsing import date_parsing_from_str
+
+PRIORITY_FILE_ORDER = "reihenfolge"
+PRIORITY_RANGLISTE = "rangliste"
+PRIORITY_LETZTES_SPIEL = "letztes_spiel"
+PRIORITY_ALTERSKLASSE = "altersklasse"
+PRIORITIES = [PRIORITY_FILE_ORDER, PRIORITY_RANGLISTE, PRIORITY_LETZTES_SPIEL, PRIORITY_ALTERSKLASSE]
+PRIORITY_COLUMNS = {PRIORITY_FILE_ORDER: None, PRIORITY_RANGLISTE: "Rangliste",
+                    PRIORITY_LETZTES_SPIEL: "Letztes Spiel", PRIORITY_ALTERSKLASSE: "Altersklasse"}
+DEFAULT_ALTERSKLASSEN_ORDER = list(dict.fromkeys(regel[0] for regel in DEFAULT_ALTERSKLASSEN_REGELN))
+
+
+def priority_key(priority: str, row: Mapping, position: int, altersklassen: Sequence[str] = None) \
+        -> tuple[float, ...]:
+    """
+    Sort key of a player for the selection, smaller is better. Players without a value come last, ties are decided by
+    the position in Spieler.csv, so the key is unique.
+    * reihenfolge: order of Spieler.csv
+    * rangliste: the lowest number in the column "Rangliste" first
+    * letztes_spiel: the most recent date in the column "Letztes Spiel" first
+    * altersklasse: in the order of altersklassen
+    :param priority: one of PRIORITIES
+    :type priority: str
+    :param row: row of Spieler.csv (only the column of the priority is used)
+    :type row: Mapping
+    :param position: position of the row in Spieler.csv
+    :type position: int
+    :param altersklassen: order of the Altersklassen. Default is None, the order of DEFAULT_ALTERSKLASSEN_REGELN
+    :type altersklassen: Sequence[str]
+    :return: the key
+    :rtype: tuple[float, ...]
+    :raises ValueError: if the priority is unknown
+    """
+    if priority == PRIORITY_FILE_ORDER:
+        return float(position),
+    value = cell_str(row.get(PRIORITY_COLUMNS.get(priority, ""), ""))
+    match priority:
+        case "rangliste":
+            try:
+                rank = float(value.replace(",", "."))
+            except ValueError:
+                rank = math.inf
+            return (rank if not math.isnan(rank) else math.inf), float(position)
+        case "letztes_spiel":
+            try:
+                played = date_parsing_from_str(value)
+            except (ValueError, IndexError):
+                played = None
+            return (-float(played.toordinal()) if played is not None else math.inf), float(position)
+        case "altersklasse":
+            order = altersklassen if altersklassen is not None else DEFAULT_ALTERSKLASSEN_ORDER
+            return float(order.index(value) if value in order else len(order)), float(position)
+    raise ValueError(f"Unknown priority {priority}, use one of {', '.join(PRIORITIES)}")
+
+
+class TopN:
+    """
+    Streaming selection of the n items with the smallest keys. The selected items are kept in a heap of size n, which
+    is ordered by the largest key, so every item costs O(log n) and the memory stays O(n). Keys must be tuples of
+    numbers (see priority_key).
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: list[tuple[tuple[float, ...], object]] = []
+        self.left_out: list = []
+
+    def push(self, key: tuple[float, ...], item) -> None:
+        # negated keys turn heapq's min heap into a max heap, the root is the worst selected item
+        entry = (tuple(-part for part in key), item)
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, entry)
+        elif self.n > 0 and entry > self._heap[0]:
+            self.left_out.append(heapq.heapreplace(self._heap, entry)[1])
+        else:
+            self.left_out.append(item)
+
+    def selected(self) -> list:
+        """
+        The selected items, the best first.
+        """
+        return [item for _, item in sorted(self._heap, reverse=True)]
+
+
+def select_top(items: Iterable[tuple[tuple[float, ...], object]], n: int) -> tuple[list, list]:
+    """
+    Select the n items with the smallest keys in one pass, see TopN.
+    :param items: (key, item) pairs
+    :type items: Iterable[tuple[tuple[float, ...], object]]
+    :param n: number of items to select
+    :type n: int
+    :return: the selected items (the best first) and the items that were left out
+    :rtype: tuple[list, list]
+    """
+    top = TopN(n)
+    for key, item in items:
+        top.push(key, item)
+    return top.selected(), top.left_out
+
+
+def select_top_per_team(items: Iterable[tuple[Hashable, tuple[float, ...], object]], n: int) \
+        -> dict[Hashable, TopN]:
+    """
+    Select the n best items of every team in one pass over all items.
+    :param items: (team, key, item) triples
+    :type items: Iterable[tuple[Hashable, tuple[float, ...], object]]
+    :param n: number of items per team
+    :type n: int
+    :return: team -> selection
+    :rtype: dict[Hashable, TopN]
+    """
+    teams: dict[Hashable, TopN] = dict()
+    for team, key, item in items:
+        top = teams.get(team)
+        if top is None:
+            top = teams[team] = TopN(n)
+        top.push(key, item)
+    return teams
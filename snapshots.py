@@ -0,0 +1,224 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Iterable
+from pathlib import Path
+
+from file_lock import atomic_write
+
+HISTORY_DIR = Path(".mks_history")
+
+
+class Snapshot:
+    """
+    State of a folder at a point in time. files maps every file name to the sha256 of its content and the size and
+    modification time it had when it was hashed. The contents are stored once per hash in the objects of the store.
+    """
+
+    def __init__(self, snapshot_id: str, folder: str, created: str, label: str,
+                 files: dict[str, tuple[str, int, int]]):
+        self.snapshot_id = snapshot_id
+        self.folder = folder
+        self.created = created
+        self.label = label
+        self.files = files
+
+    @property
+    def hashes(self) -> dict[str, str]:
+        return {name: entry[0] for name, entry in self.files.items()}
+
+    def as_dict(self) -> dict:
+        return {"id": self.snapshot_id, "folder": self.folder, "created": self.created, "label": self.label,
+                "files": {name: list(entry) for name, entry in self.files.items()}}
+
+    @staticmethod
+    def from_dict(data: dict) -> 'Snapshot':
+        return Snapshot(data["id"], data["folder"], data["created"], data["label"],
+                        {name: tuple(entry) for name, entry in data["files"].items()})
+
+    def __str__(self):
+        label = f"  {self.label}" if self.label else ""
+        return f"{self.snapshot_id}  {self.created}  {len(self.files)} Dateien{label}"
+
+
+class SnapshotDiff:
+    """
+    Difference between two states of a folder by file name.
+    """
+
+    def __init__(self, old: dict[str, str], new: dict[str, str]):
+        self.added = sorted(new.keys() - old.keys())
+        self.removed = sorted(old.keys() - new.keys())
+        self.modified = sorted(name for name in old.keys() & new.keys() if old[name] != new[name])
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+    def __str__(self):
+        lines = [f"+ {name}" for name in self.added] + [f"- {name}" for name in self.removed] + \
+                [f"~ {name}" for name in self.modified]
+        return "\n".join(lines) if lines else "Keine Unterschiede"
+
+
+def _folder_key(folder: Path) -> str:
+    return hashlib.sha256(str(folder.resolve()).encode("utf-8")).hexdigest()[:16]
+
+
+def _manifest_dir(folder: Path, store: Path) -> Path:
+    return Path(store).joinpath("snapshots", _folder_key(folder))
+
+
+def _object_path(digest: str, store: Path) -> Path:
+    return Path(store).joinpath("objects", digest[:2], digest[2:])
+
+
+def _is_snapshot_file(file: Path) -> bool:
+    # temporary files of atomic_write are no content of the folder
+    return file.is_file() and not (file.name.startswith(".") and file.suffix == ".tmp")
+
+
+def _scan_folder(folder: Path, reference: Snapshot = None, store: Path = None) -> dict[str, tuple[str, int, int]]:
+    """
+    Hash all files of the folder. Files with the same size and modification time as in the reference snapshot are
+    not read again. If store is given, the contents of new hashes are added to the store.
+    """
+    reference_files = reference.files if reference is not None else dict()
+    files = dict()
+    for file in folder.iterdir():
+        if not _is_snapshot_file(file):
+            continue
+        stat = file.stat()
+        entry = reference_files.get(file.name)
+        if entry is not None and entry[1] == stat.st_size and entry[2] == stat.st_mtime_ns:
+            files[file.name] = entry
+            continue
+        data = file.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if store is not None and not _object_path(digest, store).exists():
+            with atomic_write(_object_path(digest, store), binary=True) as object_file:
+                object_file.write(data)
+        files[file.name] = (digest, stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def list_snapshots(folder_name: str, store: Path = HISTORY_DIR) -> list[Snapshot]:
+    """
+    All snapshots of the folder, the oldest first.
+    :param folder_name: folder of the snapshots
+    :type folder_name: str
+    :param store: directory of the snapshot store. Default is .mks_history
+    :type store: Path
+    :return: the snapshots
+    :rtype: list[Snapshot]
+    """
+    manifest_dir = _manifest_dir(Path(folder_name), store)
+    if not manifest_dir.exists():
+        return []
+    return [Snapshot.from_dict(json.loads(manifest.read_text(encoding="utf-8")))
+            for manifest in sorted(manifest_dir.glob("*.json"))]
+
+
+def load_snapshot(folder_name: str, snapshot_id: str, store: Path = HISTORY_DIR) -> Snapshot:
+    """
+    Load a snapshot of the folder by its id or an unambiguous prefix of the id.
+    :raises ValueError: if no or more than one snapshot matches
+    """
+    matches = [manifest for manifest in sorted(_manifest_dir(Path(folder_name), store).glob(f"{snapshot_id}*.json"))]
+    if len(matches) != 1:
+        logging.error(f"Snapshot {snapshot_id} not found or not unique ({len(matches)} matches)")
+        raise ValueError(f"Snapshot {snapshot_id} not found or not unique")
+    return Snapshot.from_dict(json.loads(matches[0].read_text(encoding="utf-8")))
+
+
+def create_snapshot(folder_name: str, label: str = "", store: Path = HISTORY_DIR) -> Snapshot:
+    """
+    Save the current state of the folder in the store. Every file content is stored only once, a snapshot is a
+    manifest of the hashes. Only files that changed since the last snapshot (size or modification time) are read, so
+    the cost grows with the number of changed files. If nothing changed, the last snapshot is returned and no new one
+    is created.
+    :param folder_name: folder to save
+    :type folder_name: str
+    :param label: description of the snapshot, e.g. the action that follows. Default is ""
+    :type label: str
+    :param store: directory of the snapshot store. Default is .mks_history
+    :type store: Path
+    :return: the new or the unchanged last snapshot
+    :rtype: Snapshot
+    :raises FileNotFoundError: if the folder does not exist
+    """
+    folder = Path(folder_name)
+    if not folder.exists():
+        logging.error(f"Folder {folder} does not exist")
+        raise FileNotFoundError(f"Folder {folder} does not exist")
+    snapshots = list_snapshots(folder_name, store)
+    previous = snapshots[-1] if snapshots else None
+    files = _scan_folder(folder, previous, store)
+    if previous is not None and {name: entry[0] for name, entry in files.items()} == previous.hashes:
+        return previous
+    now = datetime.datetime.now()
+    snapshot = Snapshot(now.strftime("%Y%m%d-%H%M%S-%f"), str(folder.resolve()), now.strftime("%Y-%m-%d %H:%M:%S"),
+                        label, files)
+    with atomic_write(_manifest_dir(folder, store).joinpath(f"{snapshot.snapshot_id}.json"), fsync=True) as manifest:
+        json.dump(snapshot.as_dict(), manifest, ensure_ascii=False, indent=1)
+    logging.info(f"Snapshot {snapshot.snapshot_id} von {folder}: {len(files)} Dateien")
+    return snapshot
+
+
+def snapshot_folders(folder_names: Iterable[str], label: str, store: Path = HISTORY_DIR) -> None:
+    """
+    Snapshot every existing folder before a write batch. Folders that do not exist (yet) are skipped.
+    """
+    for folder_name in folder_names:
+        if Path(folder_name).exists():
+            create_snapshot(folder_name, label, store)
+
+
+def diff_snapshots(folder_name: str, old_id: str, new_id: str = None, store: Path = HISTORY_DIR) -> SnapshotDiff:
+    """
+    Compare two snapshots of the folder or a snapshot with the current state of the folder.
+    :param folder_name: folder of the snapshots
+    :type folder_name: str
+    :param old_id: id of the older snapshot
+    :type old_id: str
+    :param new_id: id of the newer snapshot. Default is None, the current state of the folder
+    :type new_id: str
+    :param store: directory of the snapshot store. Default is .mks_history
+    :type store: Path
+    :return: added, removed and modified files
+    :rtype: SnapshotDiff
+    """
+    old = load_snapshot(folder_name, old_id, store)
+    if new_id is not None:
+        return SnapshotDiff(old.hashes, load_snapshot(folder_name, new_id, store).hashes)
+    current = _scan_folder(Path(folder_name), old)
+    return SnapshotDiff(old.hashes, {name: entry[0] for name, entry in current.items()})
+
+
+def restore_snapshot(folder_name: str, snapshot_id: str, store: Path = HISTORY_DIR) -> SnapshotDiff:
+    """
+    Restore the folder to the state of the snapshot. Before the restore the current state is saved as a snapshot, so
+    a restore can be undone. Only files that differ are written, files that are not in the snapshot are removed.
+    :param folder_name: folder to restore
+    :type folder_name: str
+    :param snapshot_id: id of the snapshot
+    :type snapshot_id: str
+    :param store: directory of the snapshot store. Default is .mks_history
+    :type store: Path
+    :return: the changes of the restore (current state -> snapshot)
+    :rtype: SnapshotDiff
+    """
+    snapshot = load_snapshot(folder_name, snapshot_id, store)
+    current = create_snapshot(folder_name, f"vor Wiederherstellung von {snapshot.snapshot_id}", store)
+    diff = SnapshotDiff(current.hashes, snapshot.hashes)
+    folder = Path(folder_name)
+    for name in diff.added + diff.modified:
+        with atomic_write(folder.joinpath(name), binary=True) as file:
+            file.write(_object_path(snapshot.files[name][0], store).read_bytes())
+    for name in diff.removed:
+        os.remove(folder.joinpath(name))
+    logging.info(f"Snapshot {snapshot.snapshot_id} wiederhergestellt: {len(diff.added) + len(diff.modified)} "
+                 f"Dateien geschrieben, {len(diff.removed)} entfernt")
+    return diff
@@ -0,0 +1,37 @@
+"""
+Builder for the content of Mannschaften .ini files in tests, in the format written by the Kegel-Control-Center.
+"""
+from ini_lint import GENERAL_KEYS, PLAYER_KEYS
+
+
+def spieler(name: str, vorname: str, geb_jahr: str = "", altersklasse: str = "Herren", pass_nr: str = "",
+            verein: str = "KV Holz", letztes_spiel: str = "", rangliste: str = "", platz_ziffer: str = "",
+            spielernr: str = "") -> dict[str, str]:
+    """
+    Values of a [Spieler n] section.
+    """
+    return {"Name": name, "Vorname": vorname, "Letztes Spiel": letztes_spiel, "Platz-Ziffer": platz_ziffer,
+            "Spielernr.": spielernr, "Geb.-Jahr": geb_jahr, "Altersklasse": altersklasse, "Pass-Nr.": pass_nr,
+            "Rangliste": rangliste, "Verein": verein}
+
+
+def platzhalter(number: int) -> dict[str, str]:
+    """
+    Values of a Platzhalter section like ini_files.platzhalter_player_str.
+    """
+    return spieler(f"Name {number}", f"Vorname {number}", altersklasse="", verein="")
+
+
+def mannschaft_ini(players: list[dict[str, str]], name: str = "KV Holz 1", spielfuehrer: str = "A",
+                   betreuer: str = "B", vereins_nr: str = "1", lv_nr: str = "2", anzahl: int | str = None,
+                   spielklasse: str = "Kreis", liga: str = "Kreisliga", bezirk: str = "Nord") -> str:
+    """
+    Text of a .ini file with [Allgemein] and one [Spieler n] section per player (see spieler and platzhalter).
+    :param anzahl: value of "Anzahl Spieler". Default is None, the number of players
+    """
+    general = [name, spielklasse, liga, bezirk, spielfuehrer, betreuer, vereins_nr, lv_nr,
+               len(players) if anzahl is None else anzahl]
+    text = "[Allgemein]\n" + "".join(f"{key}={value}\n" for key, value in zip(GENERAL_KEYS, general))
+    for number, player in enumerate(players):
+        text += f"[Spieler {number}]\n" + "".join(f"{key}={player.get(key, '')}\n" for key in PLAYER_KEYS)
+    return text
@@ -0,0 +1,82 @@
+import datetime
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import pandas as pd
+
+from altersklasse import apply_altersklassen_to_spieler, derive_altersklasse, geschlecht_from_altersklasse, \
+    new_season, DEFAULT_ALTERSKLASSEN_REGELN, REGEL_COLUMNS
+from diagnostics import collect_diagnostics
+from ini_files import read_finished_mannschaften
+from ini_fixtures import mannschaft_ini, spieler
+from mannschaft import GEBURTSDATUM_PARSED
+
+STICHTAG = datetime.date(2024, 12, 31)
+
+
+class TestDeriveAltersklasse(TestCase):
+
+    def test_classes_by_age_and_geschlecht(self):
+        geburtsdaten = pd.Series([datetime.date(2012, 5, 1), datetime.date(2007, 1, 1), datetime.date(1990, 3, 1),
+                                  datetime.date(1990, 3, 1), datetime.date(1960, 1, 1), None])
+        geschlecht = pd.Series(["m", "w", "m", "weiblich", "m", "m"])
+        result = derive_altersklasse(geburtsdaten, STICHTAG, geschlecht=geschlecht)
+        self.assertEqual(result[:5].tolist(), ["U14", "U18", "Herren", "Damen", "Senioren B"])
+        self.assertTrue(pd.isna(result[5]))
+
+    def test_birthday_after_stichtag(self):
+        result = derive_altersklasse(pd.Series([datetime.date(2006, 7, 2), datetime.date(2006, 6, 30)]),
+                                     datetime.date(2024, 7, 1))
+        self.assertEqual(result.tolist(), ["U18", "U23"])
+
+    def test_geschlecht_from_altersklasse(self):
+        regeln = pd.DataFrame(DEFAULT_ALTERSKLASSEN_REGELN, columns=REGEL_COLUMNS)
+        result = geschlecht_from_altersklasse(pd.Series(["Damen", "Senioren A", "U18", "Unbekannt"]), regeln)
+        self.assertEqual(result.tolist(), ["w", "m", "", ""])
+
+
+class TestApplyAltersklassen(TestCase):
+
+    def test_changes(self):
+        spieler = pd.DataFrame({"Name": ["Kugel", "Wurf"], "Vorname": ["Anna", "Paul"], "Verein": ["KV", "KV"],
+                                "Mannschaft": ["1", "1"], "Geschlecht": ["w", "m"], "Altersklasse": ["U23", "Herren"],
+                                "Geburtsdatum": ["", ""],
+                                GEBURTSDATUM_PARSED: [datetime.date(2001, 1, 1), None]})
+        spieler, changes = apply_altersklassen_to_spieler(spieler, STICHTAG)
+        self.assertEqual(spieler["Altersklasse"].tolist(), ["Damen", "Herren"])
+        self.assertEqual(changes["Altersklasse neu"].tolist(), ["Damen"])
+
+
+class TestNewSeason(TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = Path(tempfile.mkdtemp())
+        os.chdir(self.directory)
+        self.directory.joinpath("Mannschaften").mkdir()
+        players = [spieler("Kugel", "Anna", "01/00", "U23", "D1"), spieler("Wurf", "Paul", "03/00", "U23"),
+                   spieler("Holz", "Ida", "01/00", "U23"), spieler("Alt", "Otto", "05/66", "Herren"),
+                   spieler("Jung", "Tim", "05/08", "U18")]
+        self.directory.joinpath("Mannschaften", "KV 1.ini").write_text(mannschaft_ini(players),
+                                                                       encoding="windows-1252")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_geschlecht_from_spieler_csv(self):
+        spieler_csv = pd.DataFrame({"Name": ["Kugel", "Wurf"], "Vorname": ["Anna", "Paul"],
+                                    "Geburtsdatum": ["", "1. März 2000"], "Geschlecht": ["w", "m"],
+                                    "Passnummer": ["D1", ""]})
+        with collect_diagnostics(live_limit=0, log_summary=False) as diagnostics:
+            changes = new_season("Mannschaften", datetime.date(2026, 12, 31), spieler_csv=spieler_csv)
+        self.assertEqual([("Kugel", "U23", "Damen"), ("Wurf", "U23", "Herren"), ("Alt", "Herren", "Senioren B"),
+                          ("Jung", "U18", "U23")],
+                         list(zip(changes["Name"], changes["Altersklasse alt"], changes["Altersklasse neu"])))
+        self.assertEqual(1, diagnostics.counts["Altersklasse nicht bestimmbar, Geschlecht unbekannt"])
+        written = read_finished_mannschaften(Path("out", "KV 1.ini"))
+        self.assertEqual({"Kugel": "Damen", "Wurf": "Herren", "Holz": "U23", "Alt": "Senioren B", "Jung": "U23"},
+                         {player.name: player.altersklasse for player in written.players})
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import csv_cache
+from csv_cache import read_csv_cached
+
+
+class TestReadCsvCached(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = patch.object(csv_cache, "CACHE_DIR", Path(self.directory.name).joinpath("cache"))
+        self.cache_dir.start()
+        self.csv = Path(self.directory.name).joinpath("Spieler.csv")
+        self.csv.write_text("Name;Vorname\nKugel;Anna\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.cache_dir.stop()
+        self.directory.cleanup()
+
+    def test_second_read_uses_cache(self):
+        first = read_csv_cached(str(self.csv))
+        with patch.object(csv_cache, "read_csv") as read_csv:
+            second = read_csv_cached(str(self.csv))
+            read_csv.assert_not_called()
+        self.assertTrue(first.equals(second))
+
+    def test_changed_file_is_read_again(self):
+        read_csv_cached(str(self.csv))
+        self.csv.write_text("Name;Vorname\nKugel;Anna\nWurf;Paul\n", encoding="utf-8")
+        self.assertEqual(len(read_csv_cached(str(self.csv))), 2)
+
+    def test_touched_file_uses_content_hash(self):
+        read_csv_cached(str(self.csv))
+        os.utime(self.csv, ns=(0, 0))
+        with patch.object(csv_cache, "read_csv") as read_csv:
+            read_csv_cached(str(self.csv))
+            read_csv.assert_not_called()
+
+    def test_prepare_is_cached(self):
+        calls = []
+
+        def prepare(frame):
+            calls.append(1)
+            frame["Voller Name"] = frame["Vorname"] + " " + frame["Name"]
+            return frame
+
+        read_csv_cached(str(self.csv), prepare=prepare)
+        frame = read_csv_cached(str(self.csv), prepare=prepare)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(frame["Voller Name"][0], "Anna Kugel")
@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from csv_files import read_csv, write_csv_with_all_mannschaften
+from ini_files import read_finished_mannschaften
+from ini_fixtures import mannschaft_ini, platzhalter, spieler
+from mannschaft import MannschaftData
+
+
+class TestWriteCsvWithAllMannschaften(TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = Path(tempfile.mkdtemp())
+        os.chdir(self.directory)
+        teams = {"KV Holz 1": [spieler("Kugel", "Anna", "03/95", "Damen", "D1"), platzhalter(1)],
+                 "KV Holz 3": [spieler("Wurf", "Paul", "05/80", pass_nr="D2")]}
+        for name, players in teams.items():
+            self.directory.joinpath(f"{name}.ini").write_text(mannschaft_ini(players, name=name))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_header_once_from_generator(self):
+        read = []
+
+        def mannschaften():
+            for file in sorted(self.directory.glob("*.ini")):
+                read.append(file.stem)
+                mannschaft = read_finished_mannschaften(file)
+                yield mannschaft
+                if file.stem == "KV Holz 1":
+                    read.append("KV Holz 2")
+                    yield MannschaftData("KV Holz 2", mannschaft.general_data, [])
+
+        write_csv_with_all_mannschaften(mannschaften())
+        self.assertEqual(["KV Holz 1", "KV Holz 2", "KV Holz 3"], read)
+        spieler_file, = self.directory.joinpath("out").glob("Spieler_*.csv")
+        mannschaften_file, = self.directory.joinpath("out").glob("Mannschaften_*.csv")
+        spieler_csv = read_csv(str(spieler_file))
+        self.assertEqual(["Kugel", "Name 1", "Wurf"], spieler_csv["Name"].tolist())
+        lines = spieler_file.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(1, lines.count(lines[0]))
+        mannschaften_csv = read_csv(str(mannschaften_file))
+        self.assertEqual(3, len(mannschaften_csv))
+        lines = mannschaften_file.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(1, lines.count(lines[0]))
@@ -0,0 +1,43 @@
+import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from dedupe import PLAYER_COLUMNS, find_duplicates, koelner_phonetik
+
+
+class TestKoelnerPhonetik(TestCase):
+
+    def test_codes(self):
+        self.assertEqual("657", koelner_phonetik("Müller"))
+        self.assertEqual("657", koelner_phonetik("Mueller"))
+        self.assertEqual("862", koelner_phonetik("Schmidt"))
+        self.assertEqual(koelner_phonetik("Schmitt"), koelner_phonetik("Schmidt"))
+        self.assertEqual("3412", koelner_phonetik("Wikipedia"))
+
+
+class TestFindDuplicates(TestCase):
+
+    def test_clusters(self):
+        players = pd.DataFrame([
+            ("Müller", "Hans", datetime.date(1970, 5, 17), "P1", "A 1"),
+            ("Mueller", "Hans", datetime.date(1970, 5, 1), "", "B 1"),
+            ("Hans", "Müller", datetime.date(1970, 5, 17), "", "C 1"),
+            ("Müller", "Anna", datetime.date(1970, 5, 17), "P2", "A 1"),
+            ("Schmidt", "Peter", datetime.date(1985, 1, 3), "P3", "A 1"),
+            ("Schmitt", "Peter", datetime.date(1985, 1, 1), "", "B 1"),
+            ("Schmidt", "Peter", datetime.date(1960, 1, 3), "P4", "A 2"),
+        ], columns=PLAYER_COLUMNS)
+        duplicates = find_duplicates(players)
+        clusters = duplicates.groupby("Cluster")["Quelle"].apply(sorted).tolist()
+        self.assertEqual([["A 1", "B 1", "C 1"], ["A 1", "B 1"]], clusters)
+        self.assertNotIn("Anna", list(duplicates["Vorname"]))
+
+    def test_same_passnummer_is_no_duplicate(self):
+        players = pd.DataFrame([
+            ("Kugel", "Tim", datetime.date(2008, 3, 1), "P7", "KV U18"),
+            ("Kugel", "Tim", datetime.date(2008, 3, 1), "P7", "KV 1"),
+            ("Kugel", "Tim", datetime.date(2008, 3, 1), "P8", "SV 1"),
+        ], columns=PLAYER_COLUMNS)
+        self.assertEqual([], find_duplicates(players.iloc[:2])["Quelle"].tolist())
+        self.assertEqual(["KV 1", "KV U18", "SV 1"], sorted(find_duplicates(players)["Quelle"]))
@@ -0,0 +1,121 @@
+import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from delta_import import _apply_team_delta, compute_mannschaften_delta, compute_spieler_delta
+from mannschaft import GeneralData, MannschaftData, PlayerData
+
+SPIELER_COLUMNS = ["Vorname", "Name", "Geburtsdatum", "Geschlecht", "Altersklasse", "Passnummer", "Verein",
+                   "Mannschaft", "Verein_angehörig"]
+
+
+def spieler_frame(rows: list[list]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=SPIELER_COLUMNS)
+
+
+class TestComputeSpielerDelta(TestCase):
+
+    def setUp(self):
+        self.previous = spieler_frame([
+            ["Jens", "Spielmacher", "20. Januar 1990", "m", "Herren", "D1", "KV Holz", "1", ""],
+            ["Anna", "Kugel", "3. März 1995", "w", "Damen", "", "KV Holz", "1", ""],
+            ["Paul", "Wurf", "1. Mai 1980", "m", "Senioren A", "D3", "KV Holz", "1", ""],
+        ])
+
+    def test_unchanged(self):
+        deltas = compute_spieler_delta(self.previous, self.previous.copy())
+        self.assertTrue(all(delta.empty for delta in deltas.values()))
+
+    def test_added_removed_changed(self):
+        current = spieler_frame([
+            ["Jens", "Spielmacher", "20. Januar 1990", "m", "Senioren A", "D1", "KV Holz", "1", ""],
+            ["Anna", "Kugel", "3. März 1995", "w", "Damen", "", "KV Holz", "1", ""],
+            ["Lena", "Neu", "1. Juni 2001", "w", "U23", "D4", "KV Holz", "1", ""],
+        ])
+        delta = compute_spieler_delta(self.previous, current)[("KV Holz", "1")]
+        self.assertEqual([row["Passnummer"] for row in delta.added], ["D4"])
+        self.assertEqual([row["Passnummer"] for row in delta.removed], ["D3"])
+        self.assertEqual([new["Altersklasse"] for _, new in delta.changed], ["Senioren A"])
+
+    def test_name_key_ignores_case_and_spaces(self):
+        current = self.previous.copy()
+        current.loc[1, "Name"] = " kugel "
+        deltas = compute_spieler_delta(self.previous, current)
+        self.assertEqual(deltas[("KV Holz", "1")].added, [])
+        self.assertEqual(deltas[("KV Holz", "1")].removed, [])
+
+    def test_team_change(self):
+        current = self.previous.copy()
+        current.loc[0, "Mannschaft"] = "2"
+        deltas = compute_spieler_delta(self.previous, current)
+        self.assertEqual(len(deltas[("KV Holz", "1")].removed), 1)
+        self.assertEqual(len(deltas[("KV Holz", "2")].added), 1)
+
+    def test_several_mannschaften(self):
+        previous = self.previous.copy()
+        previous.loc[0, "Mannschaft"] = "U18, 1"
+        current = previous.copy()
+        current.loc[0, "Mannschaft"] = "1, U18"
+        self.assertTrue(all(delta.empty for delta in compute_spieler_delta(previous, current).values()))
+        current.loc[0, "Mannschaft"] = "1, 2"
+        current.loc[0, "Altersklasse"] = "Senioren A"
+        deltas = compute_spieler_delta(previous, current)
+        self.assertEqual([("KV Holz", "1"), ("KV Holz", "2"), ("KV Holz", "U18")],
+                         sorted(team for team, delta in deltas.items() if not delta.empty))
+        self.assertEqual(["U18"], [row["Mannschaft"] for row in deltas[("KV Holz", "U18")].removed])
+        self.assertEqual(["2"], [row["Mannschaft"] for row in deltas[("KV Holz", "2")].added])
+        self.assertEqual([("1", "Senioren A")],
+                         [(new["Mannschaft"], new["Altersklasse"]) for _, new in deltas[("KV Holz", "1")].changed])
+
+
+class TestApplyTeamDelta(TestCase):
+
+    def test_changed_player_keeps_ini_fields(self):
+        previous = spieler_frame([["Anna", "Kugel", "3. März 1995", "w", "Damen", "", "KV Holz", "1", ""],
+                                  ["Paul", "Wurf", "3. März 1980", "m", "Herren", "D3", "KV Holz", "1", ""]])
+        current = previous.copy()
+        current.loc[0, "Altersklasse"] = "Senioren A"
+        current.loc[1, "Vorname"] = "Paul-Otto"
+        delta = compute_spieler_delta(previous, current)[("KV Holz", "1")]
+        players = [PlayerData("Kugel", "Anna", "01.09.2024", "3", "12", datetime.date(1995, 3, 1), "Damen", "", "2",
+                              "KV Holz"),
+                   PlayerData("Wurf", "Paul", "08.09.2024", "1", "7", datetime.date(1980, 3, 1), "Herren", "D3", "1",
+                              "KV Holz")]
+        mannschaft = MannschaftData("KV Holz 1", GeneralData("KV Holz 1", "Kreis", "Kreisliga", "Nord", "", "", "1",
+                                                             "2", 2, "", ""), players)
+        _apply_team_delta(delta, mannschaft, 2)
+        self.assertEqual([("Anna", "Senioren A", "01.09.2024", "3", "12", "2"),
+                          ("Paul-Otto", "Herren", "08.09.2024", "1", "7", "1")],
+                         [(player.vorname, player.altersklasse, player.letztes_spiel,
+                           player.platz_ziffer, player.spielernr, player.rangliste) for player in mannschaft.players])
+
+    def test_platzhalter_like_full_import(self):
+        rows = [[f"Vorname{i}", f"Name{i}", "1. März 1990", "m", "Herren", f"D{i}", "KV Holz", "1", ""]
+                for i in range(9)]
+        delta = compute_spieler_delta(spieler_frame(rows[:7]), spieler_frame(rows))[("KV Holz", "1")]
+        players = [PlayerData(f"Name{i}", f"Vorname{i}", "", "", "", datetime.date(1990, 3, 1), "Herren", f"D{i}", "",
+                              "KV Holz") for i in range(7)]
+        platzhalter = [PlayerData.create_platzhalter(i) for i in range(1, 4)]
+        for min_placeholder, expected in [(0, 1), (3, 3)]:
+            mannschaft = MannschaftData("KV Holz 1", GeneralData("KV Holz 1", "Kreis", "Kreisliga", "Nord", "", "",
+                                                                 "1", "2", 10, "", ""), players + platzhalter)
+            _apply_team_delta(delta, mannschaft, 10, min_placeholder)
+            self.assertEqual(9 + expected, len(mannschaft.players))
+            self.assertEqual([f"Name {i}" for i in range(1, expected + 1)],
+                             [player.name for player in mannschaft.players if player.is_platzhalter()])
+            self.assertEqual(10, mannschaft.general_data.anzahl_spieler)
+
+
+class TestComputeMannschaftenDelta(TestCase):
+
+    def test_general_data_changed(self):
+        columns = ["Verein", "Mannschaft", "Spielklasse", "Liga", "Bezirk", "Spielführer", "Betreuer",
+                   "Vereinsnummer", "LV-Nummer", "Verein Kurz"]
+        previous = pd.DataFrame([["KV Holz", "1", "Kreis", "Kreisliga", "Nord", "", "", "1", "2", "KVH"]],
+                                columns=columns)
+        current = previous.copy()
+        current.loc[0, "Liga"] = "Kreisoberliga"
+        deltas = {}
+        compute_mannschaften_delta(previous, current, deltas)
+        self.assertTrue(deltas[("KV Holz", "1")].general_data_changed)
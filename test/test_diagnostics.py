@@ -0,0 +1,85 @@
+import json
+import logging
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from diagnostics import Diagnostics, collect_diagnostics, details_wanted, diagnostics_scope, merge_diagnostics, \
+    report
+
+
+class TestDiagnostics(TestCase):
+
+    def test_counts_and_bounded_samples(self):
+        with self.assertLogs(level=logging.WARNING) as logs:
+            with collect_diagnostics(max_samples=3) as diagnostics:
+                for row in range(1000):
+                    report("Spieler nicht verarbeitbar", f"Zeile {row}", f"Team {row % 4}")
+                report("Datei überschrieben", "a.ini", level=logging.INFO)
+        self.assertEqual(1001, diagnostics.total)
+        self.assertEqual(1000, diagnostics.counts["Spieler nicht verarbeitbar"])
+        self.assertEqual(["Team 0: Zeile 0", "Team 1: Zeile 1", "Team 2: Zeile 2"],
+                         diagnostics.samples["Spieler nicht verarbeitbar"])
+        self.assertEqual(250, diagnostics.team_counts["Spieler nicht verarbeitbar"]["Team 3"])
+        # one live message for the first case and one summary
+        self.assertEqual(2, len(logs.records))
+        self.assertIn("Diagnose: 1001 Meldungen in 2 Kategorien", logs.records[-1].getMessage())
+
+    def test_fallback_without_collector(self):
+        with self.assertLogs(level=logging.WARNING) as logs:
+            report("Spieler mehrfach vorhanden", "Meier Max", "Team")
+        self.assertEqual(["WARNING:root:Spieler mehrfach vorhanden: Meier Max (Team)"], logs.output)
+
+    def test_scope_reuses_active_collector(self):
+        with collect_diagnostics(log_summary=False) as outer:
+            with diagnostics_scope() as inner:
+                report("Kategorie", "x")
+        self.assertIs(outer, inner)
+        self.assertEqual(1, outer.total)
+
+    def test_merge_worker_diagnostics(self):
+        with collect_diagnostics(live_limit=0, log_summary=False, keep_details=True) as worker:
+            for row in range(10):
+                report("Spieler nicht verarbeitbar", f"Zeile {row}", "Team")
+        worker = pickle.loads(pickle.dumps(worker))
+        with collect_diagnostics(max_samples=2, log_summary=False, keep_details=True) as diagnostics:
+            report("Spieler nicht verarbeitbar", "Zeile 99", "Team")
+            merge_diagnostics(worker)
+        self.assertEqual(11, diagnostics.counts["Spieler nicht verarbeitbar"])
+        self.assertEqual(11, diagnostics.team_counts["Spieler nicht verarbeitbar"]["Team"])
+        self.assertEqual(["Team: Zeile 99", "Team: Zeile 0"], diagnostics.samples["Spieler nicht verarbeitbar"])
+        self.assertEqual(11, len(diagnostics.details))
+
+    def test_details_only_wanted_with_detail_file(self):
+        self.assertFalse(details_wanted())
+        with collect_diagnostics(log_summary=False):
+            self.assertFalse(details_wanted())
+        directory = tempfile.mkdtemp()
+        try:
+            with collect_diagnostics(Path(directory).joinpath("Diagnose.jsonl"), log_summary=False):
+                self.assertTrue(details_wanted())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_detail_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            detail_path = Path(directory).joinpath("out", "Diagnose.jsonl")
+            with collect_diagnostics(detail_path, live_limit=0, log_summary=False):
+                report("Geburtsdatum nicht lesbar, wird geleert", "Meier Max", "Team")
+                report("Datei überschrieben", "a.ini", level=logging.INFO)
+            records = [json.loads(line) for line in detail_path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([{"level": "WARNING", "category": "Geburtsdatum nicht lesbar, wird geleert",
+                               "team": "Team", "detail": "Meier Max"},
+                              {"level": "INFO", "category": "Datei überschrieben", "team": None,
+                               "detail": "a.ini"}], records)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_summary_limits_teams(self):
+        diagnostics = Diagnostics(live_limit=0)
+        for team in range(8):
+            diagnostics.report("Kategorie", "x", f"T{team}")
+        self.assertIn("+3 weitere", diagnostics.summary(max_teams=5))
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import file_encoding
+from csv_files import read_csv
+from file_encoding import ASCII, KCC_ENCODING, LATIN1, STATUS_FAILED, STATUS_TRANSCODED, STATUS_UNCHANGED, UTF8, \
+    UTF8_BOM, detect_encoding, detect_encoding_bytes, read_text, transcode_folder
+from ini_files import read_finished_mannschaften
+from ini_fixtures import mannschaft_ini, spieler
+
+INI = mannschaft_ini([spieler("Weiß", "Jürgen", "05/80", pass_nr="D1", verein="KV Höhe")], name="KV Höhe 1",
+                     spielfuehrer="Müller")
+
+
+class TestFileEncoding(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_detect_encoding_bytes(self):
+        self.assertEqual(ASCII, detect_encoding_bytes(b"Name=Kugel\n"))
+        self.assertEqual(UTF8, detect_encoding_bytes("Name=Müller\n".encode("utf-8")))
+        self.assertEqual(UTF8_BOM, detect_encoding_bytes("Name=Müller\n".encode("utf-8-sig")))
+        self.assertEqual(KCC_ENCODING, detect_encoding_bytes("Name=Müller – Weiß\n".encode("windows-1252")))
+        self.assertEqual(LATIN1, detect_encoding_bytes(b"Name=M\x81ller\n"))
+
+    def test_read_ini_and_csv_in_any_encoding(self):
+        for encoding in [KCC_ENCODING, "utf-8", "utf-8-sig"]:
+            file = self.directory.joinpath(f"team {encoding}.ini")
+            file.write_text(INI, encoding=encoding)
+            mannschaft = read_finished_mannschaften(file)
+            self.assertEqual("KV Höhe 1", mannschaft.general_data.name)
+            self.assertEqual("Jürgen", mannschaft.players[0].vorname)
+            csv = self.directory.joinpath(f"Spieler {encoding}.csv")
+            csv.write_text("Name;Vorname\nWeiß;Jürgen\n", encoding=encoding)
+            self.assertEqual(["Name", "Vorname"], list(read_csv(str(csv)).columns))
+            self.assertEqual("Weiß", read_csv(str(csv)).at[0, "Name"])
+
+    def test_verdict_is_cached_until_the_file_changes(self):
+        file = self.directory.joinpath("team.ini")
+        file.write_text(INI, encoding="utf-8")
+        with patch.object(file_encoding, "detect_encoding_bytes", wraps=detect_encoding_bytes) as detect:
+            self.assertEqual(UTF8, detect_encoding(file))
+            self.assertEqual(UTF8, detect_encoding(file))
+            self.assertEqual(INI, read_text(file))
+            self.assertEqual(1, detect.call_count)
+            file.write_text(INI, encoding=KCC_ENCODING)
+            os.utime(file, ns=(0, 1))
+            self.assertEqual(KCC_ENCODING, detect_encoding(file))
+            self.assertEqual(2, detect.call_count)
+
+    def test_transcode_folder_rewrites_only_what_is_needed(self):
+        self.directory.joinpath("a.ini").write_text(INI, encoding="utf-8")
+        self.directory.joinpath("b.ini").write_text(INI, encoding=KCC_ENCODING)
+        self.directory.joinpath("c.ini").write_text("[Allgemein]\n", encoding="ascii")
+        self.directory.joinpath("d.ini").write_text("Name=Łukasz\n", encoding="utf-8")
+        self.directory.joinpath("e.txt").write_text(INI, encoding="utf-8")
+        mtimes = {name: self.directory.joinpath(name).stat().st_mtime_ns for name in ["b.ini", "c.ini", "d.ini"]}
+
+        self.assertEqual([STATUS_TRANSCODED, STATUS_UNCHANGED, STATUS_UNCHANGED, STATUS_FAILED],
+                         [result.status for result in transcode_folder(str(self.directory), dry_run=True)])
+        self.assertEqual(INI.encode("utf-8"), self.directory.joinpath("a.ini").read_bytes())
+
+        results = transcode_folder(str(self.directory), workers=2)
+        self.assertEqual([("a.ini", UTF8, STATUS_TRANSCODED), ("b.ini", KCC_ENCODING, STATUS_UNCHANGED),
+                          ("c.ini", ASCII, STATUS_UNCHANGED), ("d.ini", UTF8, STATUS_FAILED)],
+                         [(result.file_name, result.encoding, result.status) for result in results])
+        self.assertEqual(INI.encode(KCC_ENCODING), self.directory.joinpath("a.ini").read_bytes())
+        self.assertEqual(mtimes, {name: self.directory.joinpath(name).stat().st_mtime_ns for name in mtimes})
+        self.assertEqual(INI.encode("utf-8"), self.directory.joinpath("e.txt").read_bytes())
+        self.assertEqual([STATUS_UNCHANGED] * 3 + [STATUS_FAILED],
+                         [result.status for result in transcode_folder(str(self.directory), workers=1)])
@@ -0,0 +1,85 @@
+import os
+import stat
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import TestCase
+
+from file_lock import LOCK_DIR, atomic_write, file_lock
+
+
+def _write_many(path: str, text: str) -> None:
+    for _ in range(20):
+        with atomic_write(Path(path)) as file:
+            for _ in range(200):
+                file.write(text)
+
+
+def _increment_many(path: str) -> None:
+    for _ in range(20):
+        with file_lock(Path(path)):
+            count = int(Path(path).read_text())
+            with atomic_write(Path(path)) as file:
+                file.write(str(count + 1))
+
+
+class TestAtomicWrite(TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.folder = Path(self.directory.name).joinpath("Mannschaften")
+        self.path = self.folder.joinpath("Mannschaft.ini")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_write(self):
+        with atomic_write(self.path, encoding="windows-1252") as file:
+            file.write("Spielführer=Jens\n")
+        self.assertEqual(self.path.read_text(encoding="windows-1252"), "Spielführer=Jens\n")
+        # the lock files are not in the written folder
+        self.assertEqual(["Mannschaft.ini"], [file.name for file in self.folder.iterdir()])
+        self.assertTrue(Path(self.directory.name).joinpath(LOCK_DIR).is_dir())
+
+    def test_error_keeps_old_file(self):
+        self.folder.mkdir()
+        self.path.write_text("alt")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path) as file:
+                file.write("neu")
+                raise RuntimeError("abort")
+        self.assertEqual(self.path.read_text(), "alt")
+        self.assertEqual([file.name for file in self.folder.glob("*.tmp")], [])
+
+    def test_mode(self):
+        umask = os.umask(0o022)
+        try:
+            with atomic_write(self.path, fsync=True) as file:
+                file.write("neu")
+            self.assertEqual(0o644, stat.S_IMODE(self.path.stat().st_mode))
+            os.chmod(self.path, 0o600)
+            with atomic_write(self.path) as file:
+                file.write("neuer")
+            self.assertEqual(0o600, stat.S_IMODE(self.path.stat().st_mode))
+        finally:
+            os.umask(umask)
+
+    def test_concurrent_writers_do_not_interleave(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(_write_many, str(self.path), text) for text in ["a\n", "b\n"]]
+            for future in futures:
+                future.result()
+        content = self.path.read_text()
+        self.assertIn(content, ["a\n" * 200, "b\n" * 200])
+
+    def test_lock_around_check_and_write(self):
+        self.folder.mkdir()
+        self.path.write_text("0")
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(_increment_many, str(self.path)) for _ in range(2)]
+            for future in futures:
+                future.result()
+        self.assertEqual("40", self.path.read_text())
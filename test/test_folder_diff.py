@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from folder_diff import diff_folders, diff_mannschaft_texts
+from ini_fixtures import mannschaft_ini, spieler
+
+
+def ini(players: list[tuple[str, str, str, str]], spielfuehrer: str = "Müller") -> bytes:
+    return mannschaft_ini([spieler(name, vorname, geb_jahr, pass_nr=pass_nr)
+                           for name, vorname, geb_jahr, pass_nr in players],
+                          spielfuehrer=spielfuehrer).encode("windows-1252")
+
+
+WEISS = ("Weiß", "Jürgen", "05/80", "D1")
+KUGEL = ("Kugel", "Karl", "01/90", "")
+HOLZ = ("Holz", "Hanna", "12/01", "D3")
+
+
+class TestFolderDiff(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reordered_players_are_unchanged(self):
+        diff = diff_mannschaft_texts("a.ini", ini([WEISS, KUGEL]), ini([KUGEL, WEISS]))
+        self.assertTrue(diff.empty)
+
+    def test_added_removed_modified_and_general(self):
+        old = ini([WEISS, KUGEL, ("Name 2", "Vorname 2", "", "")])
+        new = ini([("Weiß", "Jürgen", "05/1980", "D1"), HOLZ], spielfuehrer="Kugel")
+        diff = diff_mannschaft_texts("a.ini", old, new)
+        self.assertEqual([("Spielführer", "Müller", "Kugel"), ("Anzahl Spieler", "3", "2")], diff.general)
+        self.assertEqual(["Holz Hanna (D3)"], diff.added)
+        self.assertEqual(["Kugel Karl"], diff.removed)
+        self.assertEqual(["Weiß Jürgen (D1): Geb.-Jahr '05/80' -> '05/1980'"],
+                         [str(change) for change in diff.modified])
+
+    def test_players_without_passnummer_match_by_name_and_birth_month(self):
+        moved = ("Kugel", "Karl", "01/1990", "")
+        diff = diff_mannschaft_texts("a.ini", ini([KUGEL]), ini([moved]))
+        self.assertEqual([], diff.added + diff.removed)
+        self.assertEqual(1, len(diff.modified))
+
+    def test_diff_folders(self):
+        old, new = self.directory.joinpath("old"), self.directory.joinpath("new")
+        old.mkdir()
+        new.mkdir()
+        old.joinpath("same.ini").write_bytes(ini([WEISS]))
+        new.joinpath("same.ini").write_text(ini([WEISS]).decode("windows-1252"), encoding="utf-8")
+        old.joinpath("changed.ini").write_bytes(ini([WEISS]))
+        new.joinpath("changed.ini").write_bytes(ini([WEISS, HOLZ]))
+        old.joinpath("gone.ini").write_bytes(ini([]))
+        new.joinpath("new.ini").write_bytes(ini([]))
+        new.joinpath("notes.txt").write_text("x")
+
+        diffs = diff_folders(str(old), str(new))
+        self.assertEqual(["changed.ini", "gone.ini", "new.ini"], [diff.file_name for diff in diffs])
+        self.assertEqual(["Holz Hanna (D3)"], diffs[0].added)
+        self.assertEqual([("changed.ini", "Allgemein"), ("changed.ini", "Spieler neu"),
+                          ("gone.ini", "Mannschaft entfernt"), ("new.ini", "Mannschaft neu")],
+                         [(row["Datei"], row["Art"]) for diff in diffs for row in diff.rows()])
+        with self.assertRaises(FileNotFoundError):
+            diff_folders(str(old), str(self.directory.joinpath("missing")))
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import pandas as pd
+
+from diagnostics import collect_diagnostics
+from main import import_new_mannschaften
+
+SPIELER_CSV = pd.DataFrame({
+    "Vorname": ["Paul", "", "Anna", "Tim", "", "Lena", "Ida"],
+    "Name": ["Wurf", "Ohne", "Kugel", "Jung", "Leer", "Neu", "Holz"],
+    "Geburtsdatum": ["1. März 1980", "1. März 1981", "3. März 1995", "2. März 2007", "1. März 1990",
+                     "1. März 2001", "5. März 1970"],
+    "Geschlecht": ["m", "m", "w", "m", "m", "w", "w"],
+    "Altersklasse": ["Herren", "Herren", "Damen", "U18", "Herren", "U23", "Damen"],
+    "Passnummer": ["D1", "", "D2", "D3", "", "D4", ""],
+    "Verein": ["SV Zentrum", "SV Zentrum", "KV Holz", "KV Holz", "KV Holz", "BC Anfang", "BC Anfang"],
+    "Mannschaft": ["1", "1", "1", "U18, 1", "2", "1", "1"],
+    "Verein_angehörig": [None] * 7})
+MANNSCHAFTEN_CSV = pd.DataFrame({
+    "Verein": ["SV Zentrum", "KV Holz", "KV Holz", "KV Holz", "BC Anfang"], "Mannschaft": ["1", "1", "2", "U18", "1"],
+    "Spielklasse": ["Kreis"] * 5, "Liga": ["Kreisliga"] * 5, "Bezirk": ["Nord"] * 5, "Spielführer": ["A"] * 5,
+    "Betreuer": ["B"] * 5, "Vereinsnummer": ["1", "2", "2", "2", "3"], "LV-Nummer": ["9"] * 5,
+    "Verein Kurz": ["SVZ", "KVH", "KVH", "KVH", "BCA"]})
+
+
+class TestImportNewMannschaften(TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def _import(self, workers: int) -> tuple[dict[str, bytes], list[dict]]:
+        run = self.directory.joinpath(f"workers {workers}")
+        run.mkdir()
+        os.chdir(run)
+        with collect_diagnostics(run.joinpath("Diagnose.jsonl"), live_limit=0, log_summary=False,
+                                 keep_details=True) as diagnostics:
+            import_new_mannschaften(num_min_players=3, workers=workers, spieler_csv=SPIELER_CSV.copy(),
+                                    mannschaften_csv=MANNSCHAFTEN_CSV.copy())
+        files = {file.name: file.read_bytes() for file in sorted(run.joinpath("out").glob("*.ini"))}
+        return files, diagnostics.details
+
+    def test_parallel_import_same_as_sequential(self):
+        sequential_files, sequential_details = self._import(1)
+        parallel_files, parallel_details = self._import(2)
+        self.assertEqual(["BC Anfang 1.ini", "KV Holz 1.ini", "SV Zentrum 1.ini", "U18 KV Holz.ini"],
+                         list(parallel_files.keys()))
+        self.assertEqual(sequential_files, parallel_files)
+        # merged in alphabetical order of the Vereine, not in the order of Spieler.csv or of the scheduling
+        self.assertEqual([("KV Holz 2", "Zeile 4"), ("SV Zentrum 1", "Zeile 1")],
+                         [(record["team"], record["detail"]) for record in parallel_details
+                          if record["category"] == "Spieler nicht verarbeitbar"])
+        self.assertEqual(sorted(map(str, sequential_details)), sorted(map(str, parallel_details)))
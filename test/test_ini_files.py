@@ -0,0 +1,33 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from diagnostics import collect_diagnostics
+from ini_files import iter_folder_mannschaften
+from ini_fixtures import mannschaft_ini, spieler
+
+
+class TestIterFolderMannschaften(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_broken_and_other_files_are_skipped(self):
+        self.directory.joinpath("KV Holz 1.ini").write_text(mannschaft_ini([spieler("Kugel", "Anna", "03/95")]))
+        self.directory.joinpath("kurz.ini").write_text("[Allgemein]\nName=kurz\n")
+        self.directory.joinpath("anzahl.ini").write_text(mannschaft_ini([spieler("Wurf", "Paul")], anzahl="x"))
+        self.directory.joinpath("notizen.txt").write_text(mannschaft_ini([]))
+        with collect_diagnostics(live_limit=0, log_summary=False) as diagnostics:
+            mannschaften = iter_folder_mannschaften(str(self.directory))
+            self.assertEqual(0, diagnostics.total)
+            self.assertEqual(["KV Holz 1"], [mannschaft.file_name for mannschaft in mannschaften])
+        category = "Datei nicht lesbar, übersprungen (Details mit 'Mannschaften prüfen')"
+        self.assertEqual({"anzahl": 1, "kurz": 1}, dict(diagnostics.team_counts[category]))
+
+    def test_missing_folder(self):
+        with self.assertRaises(FileNotFoundError):
+            iter_folder_mannschaften(str(self.directory.joinpath("fehlt")))
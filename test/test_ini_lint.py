@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from ini_lint import ERROR, WARNING, LintIssue, lint_folder, lint_ini_text
+from ini_fixtures import mannschaft_ini, platzhalter, spieler
+
+VALID = mannschaft_ini([spieler("Müller", "Paul", "05/80", pass_nr="D1"), platzhalter(1)])
+
+
+class TestIniLint(TestCase):
+
+    def _lint(self, text: str, encoding: str = "windows-1252") -> list[LintIssue]:
+        return lint_ini_text(text.encode(encoding), "a.ini")
+
+    def test_valid_file(self):
+        self.assertEqual([], self._lint(VALID))
+
+    def test_blank_line_and_key_order(self):
+        text = VALID.replace("Liga=Kreisliga\nBezirk=Nord\n", "Bezirk=Nord\n\nLiga=Kreisliga\n")
+        self.assertEqual([LintIssue("a.ini", 4, ERROR, "Reihenfolge",
+                                    "'Bezirk' an Position 3 in [Allgemein], erwartet 'Liga'"),
+                          LintIssue("a.ini", 5, ERROR, "Zeile", "Leerzeile verschiebt alle folgenden Zeilen"),
+                          LintIssue("a.ini", 6, ERROR, "Reihenfolge",
+                                    "'Liga' an Position 4 in [Allgemein], erwartet 'Bezirk'")], self._lint(text))
+
+    def test_missing_key_section_and_anzahl(self):
+        text = VALID.replace("Rangliste=\nVerein=KV Holz\n", "Verein=KV Holz\n").replace("[Spieler 1]", "[Spieler 2]")
+        text = text.replace("Anzahl Spieler=2", "Anzahl Spieler=3")
+        issues = self._lint(text)
+        self.assertEqual([(10, WARNING, "Anzahl Spieler"), (11, ERROR, "Schlüssel"), (20, ERROR, "Reihenfolge"),
+                          (21, ERROR, "Abschnitt")], [(issue.line, issue.severity, issue.check) for issue in issues])
+
+    def test_dates(self):
+        text = VALID.replace("Geb.-Jahr=05/80", "Geb.-Jahr=1980").replace("Geb.-Jahr=\n", "Geb.-Jahr=20.05.1980\n")
+        issues = self._lint(text)
+        self.assertEqual([(17, ERROR, "Datum"), (28, WARNING, "Datum")],
+                         [(issue.line, issue.severity, issue.check) for issue in issues])
+
+    def test_encoding(self):
+        self.assertEqual([LintIssue("a.ini", 6, WARNING, "Kodierung",
+                                    "2 Zeile(n) UTF-8 statt windows-1252 kodiert, Umlaute werden falsch angezeigt")],
+                         self._lint(VALID, "utf-8"))
+        issues = lint_ini_text(VALID.encode("windows-1252").replace(b"Paul", b"Pa\x81l"), "a.ini")
+        self.assertEqual([(13, ERROR, "Kodierung")], [(issue.line, issue.severity, issue.check) for issue in issues])
+
+    def test_lint_folder_in_parallel(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for number in range(40):
+                text = VALID if number % 10 else VALID.replace("Anzahl Spieler=2", "Anzahl Spieler=x")
+                Path(directory).joinpath(f"team {number:02}.ini").write_bytes(text.encode("windows-1252"))
+            Path(directory).joinpath("notes.txt").write_text("kein ini")
+            sequential = lint_folder(directory, workers=1)
+            self.assertEqual(sequential, lint_folder(directory, workers=3))
+            self.assertEqual(["team 00.ini", "team 10.ini", "team 20.ini", "team 30.ini"],
+                             [issue.file_name for issue in sequential])
+        finally:
+            shutil.rmtree(directory)
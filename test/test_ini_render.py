@@ -0,0 +1,64 @@
+import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from ini_files import get_general_info_str_from_mannschaft_data, get_player_str
+from ini_render import join_spieler_mannschaften, render_mannschaften
+from mannschaft import GEBURTSDATUM_PARSED, GeneralData, MannschaftData, PlayerData
+
+SPIELER_CSV = pd.DataFrame({
+    "Vorname": ["Paul", "Anna", "Lena"], "Name": ["Wurf", "Kugel", "Neu"],
+    "Geburtsdatum": ["1. Mai 1980", "3. März 1995", "1. Juni 2001"],
+    "Altersklasse": ["Senioren A", "Damen", "U23"], "Passnummer": ["D3", None, "D4"],
+    "Verein": ["KV Holz", "KV Holz", "KV Holz"], "Mannschaft": ["1", "1", "U18"],
+    "Verein_angehörig": [None, "KV Holz Kamenz", None],
+    GEBURTSDATUM_PARSED: [datetime.date(1980, 5, 1), datetime.date(1995, 3, 3), datetime.date(2001, 6, 1)]})
+MANNSCHAFTEN_CSV = pd.DataFrame({
+    "Verein": ["KV Holz", "KV Holz"], "Mannschaft": ["1", "U18"], "Spielklasse": ["Kreis", "Kreis"],
+    "Liga": ["Kreisliga", None], "Bezirk": ["Nord", "Nord"], "Spielführer": ["A", ""], "Betreuer": ["B", ""],
+    "Vereinsnummer": ["1", "1"], "LV-Nummer": ["2", "2"], "Verein Kurz": ["KVH", "KVH"]})
+
+
+class TestRenderMannschaften(TestCase):
+
+    def test_same_as_player_objects(self):
+        texts = render_mannschaften(join_spieler_mannschaften(SPIELER_CSV, MANNSCHAFTEN_CSV), num_min_players=3,
+                                    min_placeholder=0)
+        self.assertEqual(list(texts.keys()), ["KV Holz 1", "U18 KV Holz"])
+        players = [PlayerData("Kugel", "Anna", "", "", "", datetime.date(1995, 3, 3), "Damen", "", "", "KV Holz",
+                              "KV Holz Kamenz"),
+                   PlayerData("Wurf", "Paul", "", "", "", datetime.date(1980, 5, 1), "Senioren A", "D3", "", "KV Holz"),
+                   PlayerData.create_platzhalter(1)]
+        general_data = GeneralData("KV Holz 1", "Kreis", "Kreisliga", "Nord", "A", "B", "1", "2", 3, "", "")
+        expected = get_general_info_str_from_mannschaft_data(MannschaftData("KV Holz 1", general_data, players))
+        expected += "".join(get_player_str(number, player, "%m/%y") for number, player in enumerate(players))
+        self.assertEqual(texts["KV Holz 1"], expected)
+
+    def test_date_after_2000_and_platzhalter_order(self):
+        texts = render_mannschaften(join_spieler_mannschaften(SPIELER_CSV, MANNSCHAFTEN_CSV), num_min_players=12)
+        self.assertIn("Geb.-Jahr=06/2001\n", texts["U18 KV Holz"])
+        self.assertIn("Anzahl Spieler=12\n", texts["U18 KV Holz"])
+        self.assertLess(texts["U18 KV Holz"].index("Name=Name 10\n"), texts["U18 KV Holz"].index("Name=Name 2\n"))
+
+    def test_player_in_several_mannschaften(self):
+        spieler_csv = pd.concat([SPIELER_CSV, pd.DataFrame({
+            "Vorname": ["Tim"], "Name": ["Jung"], "Geburtsdatum": ["2. Februar 2007"], "Altersklasse": ["U18"],
+            "Passnummer": ["D5"], "Verein": ["KV Holz"], "Mannschaft": ["U18, 1"], "Verein_angehörig": [None],
+            GEBURTSDATUM_PARSED: [datetime.date(2007, 2, 2)]})], ignore_index=True)
+        joined = join_spieler_mannschaften(spieler_csv, MANNSCHAFTEN_CSV)
+        self.assertEqual([3, 3], joined.loc[joined["Name"] == "Jung", "_row"].tolist())
+        texts = render_mannschaften(joined, num_min_players=3)
+        self.assertEqual(list(texts.keys()), ["KV Holz 1", "U18 KV Holz"])
+        for text in texts.values():
+            self.assertIn("Name=Jung\nVorname=Tim\n", text)
+        self.assertIn("Anzahl Spieler=3\n", texts["KV Holz 1"])
+        self.assertNotIn("Name=Name 1\n", texts["KV Holz 1"])
+
+    def test_invalid_player_reported_with_final_team_name(self):
+        spieler_csv = SPIELER_CSV.assign(Vorname=["Paul", "", "Lena"])
+        warnings = []
+        joined = join_spieler_mannschaften(spieler_csv, MANNSCHAFTEN_CSV,
+                                           warn=lambda *warning: warnings.append(warning))
+        self.assertEqual([("Spieler nicht verarbeitbar", "Zeile 1", "KV Holz 1")], warnings)
+        self.assertEqual(["Wurf", "Neu"], joined["Name"].tolist())
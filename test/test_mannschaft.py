@@ -1,7 +1,9 @@
 import datetime
 from unittest import TestCase
 
-from mannschaft import PlayerData
+import pandas as pd
+
+from mannschaft import PlayerData, explode_mannschaften, split_mannschaft_cell
 
 
 class TestPlayerData(TestCase):
@@ -46,3 +48,18 @@ class TestGeneralData(TestCase):
 
     def test_get_general_data(self):
         pass
+
+
+class TestExplodeMannschaften(TestCase):
+
+    def test_split_mannschaft_cell(self):
+        self.assertEqual(["U18", "1"], split_mannschaft_cell("U18, 1 ,U18,"))
+        self.assertEqual([""], split_mannschaft_cell(None))
+
+    def test_explode_keeps_line_index(self):
+        spieler_csv = pd.DataFrame({"Name": ["A", "B", "C"], "Mannschaft": ["U18, 1", " 2", None]}, dtype=str)
+        exploded = explode_mannschaften(spieler_csv)
+        self.assertEqual([0, 0, 1, 2], exploded.index.tolist())
+        self.assertEqual(["U18", "1", " 2"], exploded["Mannschaft"].tolist()[:3])
+        single = spieler_csv.iloc[1:]
+        self.assertIs(single, explode_mannschaften(single))
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+import pandas as pd
+
+from name_matching import MATCH_AMBIGUOUS, MATCH_AUTO, MATCH_EXACT, MATCH_NONE, MATCH_NORMALIZED, NameMatcher, \
+    match_vereine_mannschaften, normalize_name
+
+
+class TestNameMatcher(TestCase):
+
+    def setUp(self):
+        self.matcher = NameMatcher(["KV Müller-Holz e.V.", "SKC Gut Holz Bad Sulza", "SKC Gut Holz Bad Salza",
+                                    "KSV Eiche Lindenau"])
+
+    def test_normalize_name(self):
+        self.assertEqual("kv mueller holz", normalize_name(" KV  Müller-Holz e. V."))
+        self.assertEqual("sv evangelisch", normalize_name("SV Evangelisch"))
+
+    def test_exact_and_normalized(self):
+        self.assertEqual(MATCH_EXACT, self.matcher.match("KSV Eiche Lindenau").status)
+        match = self.matcher.match("kv mueller holz ")
+        self.assertEqual((MATCH_NORMALIZED, "KV Müller-Holz e.V."), (match.status, match.candidate))
+
+    def test_fuzzy(self):
+        match = self.matcher.match("KSV Eiche Lindnau")
+        self.assertEqual((MATCH_AUTO, "KSV Eiche Lindenau"), (match.status, match.candidate))
+        match = self.matcher.match("SKC Gut Holz Bad Sulza", threshold=0.9)
+        self.assertEqual(MATCH_EXACT, match.status)
+        match = self.matcher.match("SKC Gut Holz Bad Szla")
+        self.assertEqual(MATCH_AMBIGUOUS, match.status)
+        self.assertIsNone(match.candidate)
+        self.assertEqual(2, len(match.alternatives))
+        self.assertEqual(MATCH_NONE, self.matcher.match("Ganz anderer Verein").status)
+
+    def test_numbers_must_be_equal(self):
+        matcher = NameMatcher(["Herren 1", "Herren 2"])
+        self.assertEqual(MATCH_NONE, matcher.match("Heren 3").status)
+        self.assertEqual("Herren 2", matcher.match("Heren 2").candidate)
+
+
+class TestMatchVereineMannschaften(TestCase):
+
+    def test_mapping(self):
+        spieler = pd.DataFrame({"Name": ["A", "B", "C"], "Verein": ["KV Holz e.V.", "KV Holz", "Unbekannt"],
+                                "Mannschaft": ["Herren  1", "Herren 1", "1"]})
+        mannschaften = pd.DataFrame({"Verein": ["KV Holz"], "Mannschaft": ["Herren 1"]})
+        spieler, matches = match_vereine_mannschaften(spieler, mannschaften)
+        self.assertEqual(["KV Holz", "KV Holz", "Unbekannt"], list(spieler["Verein"]))
+        self.assertEqual(["Herren 1", "Herren 1", "1"], list(spieler["Mannschaft"]))
+        self.assertEqual([MATCH_NORMALIZED, MATCH_NONE, MATCH_NORMALIZED], list(matches["Status"]))
@@ -0,0 +1,35 @@
+import pstats
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from profiling import profiled
+
+
+def _busy_function() -> list[str]:
+    return [str(i) * 10 for i in range(20000)]
+
+
+class TestProfiled(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.out = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_writes_stats_and_summary(self):
+        with profiled("import", memory=True, top=5, out_dir=self.out):
+            _busy_function()
+        stats_file = next(self.out.glob("profile_import_*.pstats"))
+        summary = next(self.out.glob("profile_import_*.txt")).read_text(encoding="utf-8")
+        self.assertIn("_busy_function", summary)
+        self.assertIn("Speicherallokationen", summary)
+        self.assertTrue(any(function[2] == "_busy_function" for function in pstats.Stats(str(stats_file)).stats))
+
+    def test_writes_profile_on_error(self):
+        with self.assertRaises(ValueError):
+            with profiled("export", out_dir=self.out):
+                raise ValueError("Test")
+        self.assertEqual(1, len(list(self.out.glob("profile_export_*.pstats"))))
@@ -0,0 +1,26 @@
+import io
+from unittest import TestCase
+
+from progress import Progress, ProgressState, track
+
+
+class TestProgress(TestCase):
+    def test_track_reports_final_state(self):
+        states = []
+        items = list(track(range(5), "Test", callback=states.append))
+        self.assertEqual(list(range(5)), items)
+        self.assertEqual(5, states[-1].done)
+        self.assertEqual(5, states[-1].total)
+
+    def test_no_output_without_terminal(self):
+        stream = io.StringIO()
+        with Progress("Test", 3, stream=stream) as progress:
+            progress.update(3)
+        self.assertEqual("", stream.getvalue())
+
+    def test_state_str(self):
+        state = ProgressState("Export", 50, 100, 10.0)
+        self.assertEqual(5.0, state.rate)
+        self.assertEqual(10.0, state.eta)
+        self.assertEqual("Export: 50/100 (50%), 5.0/s, ETA 10s", str(state))
+        self.assertIsNone(ProgressState("Export", 0, None, 0.0).eta)
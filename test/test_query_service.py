@@ -0,0 +1,81 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import TestCase
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from ini_fixtures import mannschaft_ini, spieler
+from query_service import QueryServer, TeamIndex
+
+NUM_TEAMS = 200
+NUM_PLAYERS = 12
+
+
+def _mannschaft_ini(team: int) -> str:
+    players = [spieler(f"Name{team}_{number}", f"Vorname{number}", f"0{number % 9 + 1}/8{number % 10}",
+                       pass_nr=f"P{team}-{number}", verein=f"Verein {team // 3}") for number in range(NUM_PLAYERS)]
+    return mannschaft_ini(players, name=f"Verein {team // 3} {team % 3 + 1}", vereins_nr=f"V{team // 3}", lv_nr="L1")
+
+
+class TestQueryService(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for team in range(NUM_TEAMS):
+            Path(self.directory).joinpath(f"Verein {team // 3} {team % 3 + 1}.ini").write_text(_mannschaft_ini(team))
+        self.index = TeamIndex(self.directory)
+        self.server = QueryServer(self.index, port=0)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def _get(self, path: str):
+        with urlopen(self.url + quote(path)) as response:
+            body = response.read().decode("utf-8")
+            return json.loads(body) if response.headers.get_content_type() == "application/json" else body
+
+    def test_queries(self):
+        self.assertEqual(NUM_TEAMS, len(self._get("/teams")))
+        self.assertEqual(NUM_PLAYERS, len(self._get("/teams/Verein 5 2")["spieler"]))
+        self.assertEqual(["Verein 5 1", "Verein 5 2", "Verein 5 3"],
+                         [team["datei"] for team in self._get("/vereine/verein  5")])
+        spieler = self._get("/spieler/P16-3")
+        self.assertEqual([("Name16_3", "Verein 5 2")], [(player["name"], player["mannschaft"]) for player in spieler])
+        self.assertEqual(NUM_PLAYERS + 1, len(self._get("/teams/Verein 5 2.csv").splitlines()))
+        with self.assertRaises(HTTPError) as error:
+            self._get("/teams/unbekannt")
+        self.assertEqual(404, error.exception.code)
+
+    def test_incremental_refresh(self):
+        self.index.refresh_interval = 0
+        file = Path(self.directory).joinpath("Verein 5 2.ini")
+        file.write_text(_mannschaft_ini(16).replace("Pass-Nr.=P16-3", "Pass-Nr.=NEU"))
+        Path(self.directory).joinpath("Verein 0 1.ini").unlink()
+        self.assertEqual([], self._get("/spieler/P16-3"))
+        self.assertEqual(1, len(self._get("/spieler/NEU")))
+        self.assertEqual(NUM_TEAMS - 1, len(self._get("/teams")))
+        self.assertEqual(0, self.index.refresh(force=True))
+
+    def test_load(self):
+        paths = [f"/teams/Verein {team // 3} {team % 3 + 1}" for team in range(NUM_TEAMS)] + \
+                [f"/spieler/P{team}-{team % NUM_PLAYERS}" for team in range(NUM_TEAMS)]
+        paths = paths * 2
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self._get, paths))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(paths), len(results))
+        self.assertTrue(all(results))
+        # generous bound, the index answers from memory (a few thousand requests per second locally)
+        self.assertLess(elapsed, 10, f"{len(paths)} Anfragen in {elapsed:.2f}s")
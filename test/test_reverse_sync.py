@@ -0,0 +1,52 @@
+import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from mannschaft import GEBURTSDATUM_PARSED, GeneralData, MannschaftData, PlayerData
+from reverse_sync import reverse_sync
+
+MANNSCHAFTEN_CSV = pd.DataFrame({"Verein": ["KV Holz"], "Mannschaft": ["1"]})
+
+
+def spieler_csv(altersklasse: str = "Herren") -> pd.DataFrame:
+    return pd.DataFrame({"Vorname": ["Jens"], "Name": ["Spielmacher"], "Geburtsdatum": ["20. Januar 1990"],
+                         "Altersklasse": [altersklasse], "Passnummer": ["D1"], "Verein": ["KV Holz"],
+                         "Mannschaft": ["1"], GEBURTSDATUM_PARSED: [datetime.date(1990, 1, 20)]})
+
+
+def mannschaft(*players: PlayerData) -> list[MannschaftData]:
+    general_data = GeneralData("KV Holz 1", "", "", "", "", "", "", "", len(players), "", "")
+    return [MannschaftData("KV Holz 1", general_data, list(players))]
+
+
+def player(name: str, altersklasse: str, passnummer: str) -> PlayerData:
+    return PlayerData(name, "Jens", "", "", "", datetime.date(1990, 1, 1), altersklasse, passnummer, "", "KV Holz")
+
+
+class TestReverseSync(TestCase):
+
+    def test_ini_wins_and_new_players_are_added(self):
+        updated, conflicts = reverse_sync(mannschaft(player("Spielmacher", "Senioren A", "D1"),
+                                                     player("Neu", "Herren", "D2")),
+                                          spieler_csv(), MANNSCHAFTEN_CSV)
+        self.assertEqual(updated["Altersklasse"].tolist(), ["Senioren A", "Herren"])
+        self.assertEqual(updated["Mannschaft"].tolist(), ["1", "1"])
+        self.assertEqual(len(conflicts), 0)
+
+    def test_conflict_when_both_sides_changed(self):
+        updated, conflicts = reverse_sync(mannschaft(player("Spielmacher", "Senioren A", "D1")),
+                                          spieler_csv("Senioren B"), MANNSCHAFTEN_CSV, base_csv=spieler_csv())
+        self.assertEqual(updated["Altersklasse"].tolist(), ["Senioren B"])
+        self.assertEqual(conflicts["Feld"].tolist(), ["Altersklasse"])
+
+    def test_player_in_several_mannschaften_keeps_cell(self):
+        spieler = spieler_csv().assign(Mannschaft=["U18, 1"])
+        mannschaften_csv = pd.DataFrame({"Verein": ["KV Holz", "KV Holz"], "Mannschaft": ["1", "U18"]})
+        general_data = GeneralData("U18 KV Holz", "", "", "", "", "", "", "", 1, "", "")
+        u18 = MannschaftData("U18 KV Holz", general_data, [player("Spielmacher", "Herren", "D1")])
+        with self.assertNoLogs(level="WARNING"):
+            updated, conflicts = reverse_sync(mannschaft(player("Spielmacher", "Herren", "D1")) + [u18], spieler,
+                                              mannschaften_csv)
+        self.assertEqual(updated["Mannschaft"].tolist(), ["U18, 1"])
+        self.assertEqual(len(conflicts), 0)
@@ -0,0 +1,80 @@
+import io
+import random
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import pandas as pd
+
+from ini_render import join_spieler_mannschaften, limit_team_players
+from main import iter_csv_player
+from mannschaft import GEBURTSDATUM_PARSED
+from roster import PRIORITY_ALTERSKLASSE, PRIORITY_FILE_ORDER, PRIORITY_LETZTES_SPIEL, PRIORITY_RANGLISTE, TopN, \
+    priority_key, select_top
+
+
+class TestRoster(TestCase):
+
+    def test_select_top_same_as_sort(self):
+        randomizer = random.Random(7)
+        keys = [(float(randomizer.randint(0, 50)), float(position)) for position in range(1000)]
+        selected, left_out = select_top(((key, key) for key in keys), 10)
+        self.assertEqual(sorted(keys)[:10], selected)
+        self.assertEqual(sorted(keys)[10:], sorted(left_out))
+
+    def test_select_top_more_than_available(self):
+        top = TopN(5)
+        for position in range(3):
+            top.push((float(position),), position)
+        self.assertEqual([0, 1, 2], top.selected())
+        self.assertEqual([], top.left_out)
+
+    def test_priority_keys(self):
+        rows = [{"Rangliste": "3", "Letztes Spiel": "01.03.2024", "Altersklasse": "Herren"},
+                {"Rangliste": "", "Letztes Spiel": "", "Altersklasse": "U18"},
+                {"Rangliste": "1", "Letztes Spiel": "15.09.2024", "Altersklasse": "Unbekannt"}]
+
+        def order(priority: str) -> list[int]:
+            return sorted(range(len(rows)), key=lambda position: priority_key(priority, rows[position], position))
+
+        self.assertEqual([0, 1, 2], order(PRIORITY_FILE_ORDER))
+        self.assertEqual([2, 0, 1], order(PRIORITY_RANGLISTE))
+        self.assertEqual([2, 0, 1], order(PRIORITY_LETZTES_SPIEL))
+        self.assertEqual([1, 0, 2], order(PRIORITY_ALTERSKLASSE))
+        with self.assertRaises(ValueError):
+            priority_key("unbekannt", rows[0], 0)
+
+    def test_limit_team_players(self):
+        spieler_csv = pd.DataFrame({
+            "Vorname": ["A", "B", "C", "D"], "Name": ["Eins", "Zwei", "Drei", "Vier"],
+            "Geburtsdatum": [""] * 4, "Altersklasse": ["Herren"] * 4, "Passnummer": [""] * 4,
+            "Verein": ["KV Holz"] * 4, "Mannschaft": ["1, 2", "1", "1", "2"], "Verein_angehörig": [None] * 4,
+            "Rangliste": ["4", "1", "2", ""], GEBURTSDATUM_PARSED: [None] * 4})
+        mannschaften_csv = pd.DataFrame({"Verein": ["KV Holz", "KV Holz"], "Mannschaft": ["1", "2"]})
+        joined = join_spieler_mannschaften(spieler_csv, mannschaften_csv)
+        with self.assertLogs(level="WARNING") as logs:
+            limited = limit_team_players(joined, 2, PRIORITY_RANGLISTE)
+        self.assertEqual([("1", "Drei"), ("1", "Zwei"), ("2", "Eins"), ("2", "Vier")],
+                         sorted(zip(limited["Mannschaft"], limited["Name"])))
+        self.assertEqual(["WARNING:root:Spieler nicht aufgestellt, Mannschaft voll: Zeile 0: Eins A (KV Holz 1)"],
+                         logs.output)
+
+    def test_iter_csv_player_keeps_players_without_priority_value(self):
+        directory = tempfile.mkdtemp()
+        try:
+            csv = Path(directory).joinpath("Spieler.csv")
+            pd.DataFrame({"Vorname": ["A", "B", "C", "D"], "Name": ["Eins", "Zwei", "Drei", "Vier"],
+                          "Geburtsdatum": ["3. März 1990"] * 3 + [None], "Altersklasse": ["Herren"] * 4,
+                          "Passnummer": ["", "P2", "", ""], "Verein": ["KV Holz"] * 4,
+                          "Verein_angehörig": [""] * 4, "Rangliste": ["2", "", "1", "3"]}) \
+                .to_csv(csv, sep=";", index=False)
+            players = iter_csv_player(3, str(csv), "%m/%y", io.StringIO(), False, PRIORITY_RANGLISTE)
+            self.assertEqual(["Eins", "Zwei", "Drei"], [player.name for player in players])
+            with self.assertLogs(level="WARNING") as logs:
+                players = iter_csv_player(2, str(csv), "%m/%y", io.StringIO(), False, PRIORITY_RANGLISTE, "KV Holz 1")
+            self.assertEqual(["Eins", "Drei"], [player.name for player in players])
+            self.assertEqual(["WARNING:root:Spieler nicht aufgestellt, Mannschaft voll: Zeile 1: Zwei B (KV Holz 1)"],
+                             logs.output)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from snapshots import create_snapshot, diff_snapshots, list_snapshots, restore_snapshot
+
+
+class TestSnapshots(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.folder = self.directory.joinpath("Mannschaften")
+        self.store = self.directory.joinpath("history")
+        self.folder.mkdir()
+        for number in range(3):
+            self.folder.joinpath(f"KV Holz {number}.ini").write_text(f"Name=KV Holz {number}\n")
+        self.folder.joinpath("Kopie.ini").write_text("Name=KV Holz 0\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_contents_are_stored_once(self):
+        create_snapshot(str(self.folder), store=self.store)
+        objects = [file for file in self.store.joinpath("objects").rglob("*") if file.is_file()]
+        self.assertEqual(3, len(objects))
+
+    def test_unchanged_files_are_not_read(self):
+        first = create_snapshot(str(self.folder), store=self.store)
+        self.folder.joinpath("KV Holz 1.ini").write_text("Name=KV Holz Eins\n")
+        with patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as read_bytes:
+            second = create_snapshot(str(self.folder), store=self.store)
+        self.assertEqual(1, read_bytes.call_count)
+        self.assertNotEqual(first.snapshot_id, second.snapshot_id)
+        # nothing changed, no new snapshot
+        self.assertEqual(second.snapshot_id, create_snapshot(str(self.folder), store=self.store).snapshot_id)
+        self.assertEqual(2, len(list_snapshots(str(self.folder), self.store)))
+
+    def test_diff_and_restore(self):
+        first = create_snapshot(str(self.folder), store=self.store)
+        self.folder.joinpath("KV Holz 1.ini").write_text("Name=KV Holz Eins\n")
+        self.folder.joinpath("KV Holz 2.ini").unlink()
+        self.folder.joinpath("Neu.ini").write_text("Name=Neu\n")
+        diff = diff_snapshots(str(self.folder), first.snapshot_id, store=self.store)
+        self.assertEqual((["Neu.ini"], ["KV Holz 2.ini"], ["KV Holz 1.ini"]), (diff.added, diff.removed, diff.modified))
+        restore_snapshot(str(self.folder), first.snapshot_id[:15], store=self.store)
+        self.assertEqual("Name=KV Holz 1\n", self.folder.joinpath("KV Holz 1.ini").read_text())
+        self.assertTrue(self.folder.joinpath("KV Holz 2.ini").exists())
+        self.assertFalse(self.folder.joinpath("Neu.ini").exists())
+        self.assertTrue(diff_snapshots(str(self.folder), first.snapshot_id, store=self.store).empty)
+        # the state before the restore is kept
+        self.assertEqual(2, len(list_snapshots(str(self.folder), self.store)))
@@ -0,0 +1,43 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import workspace
+from ini_fixtures import mannschaft_ini, spieler
+from workspace import Workspace
+
+MANNSCHAFT_INI = mannschaft_ini([spieler("Spielmacher", "Jens", "01/90", pass_nr="D1")], vereins_nr="V1", lv_nr="L1")
+
+
+class TestWorkspace(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = Path(self.directory).joinpath("KV Holz 1.ini")
+        self.file.write_text(MANNSCHAFT_INI)
+        self.workspace = Workspace(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_unchanged_files_are_not_read_again(self):
+        self.assertEqual(len(self.workspace.mannschaften()), 1)
+        with patch.object(workspace, "read_finished_mannschaften") as read:
+            self.assertEqual(self.workspace.mannschaften()[0].general_data.name, "KV Holz 1")
+            read.assert_not_called()
+
+    def test_changed_and_removed_files(self):
+        self.workspace.mannschaften()
+        self.file.write_text(MANNSCHAFT_INI.replace("Name=KV Holz 1", "Name=KV Holz Eins"))
+        self.assertEqual(self.workspace.mannschaft("KV Holz 1").general_data.name, "KV Holz Eins")
+        self.file.unlink()
+        self.assertEqual(self.workspace.mannschaften(), [])
+
+    def test_returns_copies(self):
+        mannschaft = self.workspace.mannschaft("KV Holz 1.ini")
+        mannschaft.file_name = "anders"
+        mannschaft.players.clear()
+        self.assertEqual(self.workspace.mannschaft("KV Holz 1").file_name, "KV Holz 1")
+        self.assertEqual(len(self.workspace.mannschaft("KV Holz 1").players), 1)
@@ -0,0 +1,125 @@
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from csv_cache import read_csv_cached
+from exceptions import FileIncompleteError
+from ini_files import read_finished_mannschaften
+from mannschaft import MannschaftData, parse_geburtsdatum_column
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Workspace:
+    """
+    In-memory state of an interactive session. Spieler.csv, Mannschaften.csv and the .ini files of the folders are
+    loaded on first use and kept in memory. On every access only the file signatures (size and modification time) are
+    checked and changed files are loaded again.
+    The returned MannschaftData objects are copies, so actions can sort or rename them without changing the workspace.
+    """
+
+    def __init__(self, data_path: str, spieler: str = "Spieler", mannschaften: str = "Mannschaften", sep: str = ";"):
+        self.data_path = data_path
+        self._sep = sep
+        self._csv_names = {"Spieler": spieler, "Mannschaften": mannschaften}
+        self._csv: dict[str, tuple[tuple[int, int], pd.DataFrame]] = dict()
+        self._folders: dict[Path, dict[Path, tuple[tuple[int, int], MannschaftData | None]]] = dict()
+
+    def _load_csv(self, kind: str, prepare: callable = None) -> pd.DataFrame:
+        name = self._csv_names[kind]
+        path = Path(name if name.endswith(".csv") else f"{name}.csv")
+        signature = _file_signature(path)
+        if signature is None:
+            logging.error(f"File {path} does not exist")
+            raise FileNotFoundError(f"File {path} does not exist")
+        cached = self._csv.get(kind)
+        if cached is None or cached[0] != signature:
+            self._csv[kind] = (signature, read_csv_cached(name, sep=self._sep, prepare=prepare))
+        return self._csv[kind][1].copy()
+
+    @property
+    def spieler_csv(self) -> pd.DataFrame:
+        return self._load_csv("Spieler", prepare=parse_geburtsdatum_column)
+
+    @property
+    def mannschaften_csv(self) -> pd.DataFrame:
+        return self._load_csv("Mannschaften")
+
+    def _refresh_folder(self, folder_name: str, changed: set[Path] = None) \
+            -> dict[Path, tuple[tuple[int, int], MannschaftData | None]]:
+        folder = Path(folder_name)
+        if not folder.exists():
+            logging.error(f"Folder {folder} does not exist")
+            raise FileNotFoundError(f"Folder {folder} does not exist")
+        cached = self._folders.setdefault(folder.resolve(), dict())
+        files = {file: _file_signature(file) for file in folder.iterdir() if file.suffix == ".ini"}
+        for file in cached.keys() - files.keys():
+            del cached[file]
+            if changed is not None:
+                changed.add(file)
+        for file, signature in files.items():
+            if file in cached and cached[file][0] == signature:
+                continue
+            if changed is not None:
+                changed.add(file)
+            try:
+                mannschaft = read_finished_mannschaften(file)
+            except (FileIncompleteError, ValueError):
+                mannschaft = None
+            cached[file] = (signature, mannschaft)
+        return cached
+
+    def mannschaften(self, folder_name: str = None) -> list[MannschaftData]:
+        """
+        Return all readable Mannschaften of the folder, sorted by file name.
+        :param folder_name: folder with the .ini files. Default is the data path of the workspace
+        :type folder_name: str
+        :return: copies of the MannschaftData objects
+        :rtype: list[MannschaftData]
+        :raises FileNotFoundError: if the folder does not exist
+        """
+        cached = self._refresh_folder(self.data_path if folder_name is None else folder_name)
+        return [mannschaft.copy() for _, (_, mannschaft) in sorted(cached.items()) if mannschaft is not None]
+
+    def changed_mannschaften(self, folder_name: str = None) -> dict[str, MannschaftData | None]:
+        """
+        Refresh the folder and return the Mannschaften of the files that were added, changed or removed since the last
+        access. On the first access all files are returned.
+        :param folder_name: folder with the .ini files. Default is the data path of the workspace
+        :type folder_name: str
+        :return: file name (without .ini) -> copy of the MannschaftData object, None for removed or unreadable files
+        :rtype: dict[str, MannschaftData | None]
+        :raises FileNotFoundError: if the folder does not exist
+        """
+        changed: set[Path] = set()
+        cached = self._refresh_folder(self.data_path if folder_name is None else folder_name, changed)
+        result = dict()
+        for file in sorted(changed):
+            entry = cached.get(file)
+            result[file.stem] = None if entry is None or entry[1] is None else entry[1].copy()
+        return result
+
+    def mannschaft(self, file_name: str, folder_name: str = None) -> MannschaftData | None:
+        """
+        Return the Mannschaft of the given file in the folder or None if the file does not exist or is not readable.
+        :param file_name: name of the .ini file with or without the .ini ending
+        :type file_name: str
+        :param folder_name: folder with the .ini files. Default is the data path of the workspace
+        :type folder_name: str
+        :return: copy of the MannschaftData object
+        :rtype: MannschaftData | None
+        """
+        if not file_name.endswith(".ini"):
+            file_name = f"{file_name}.ini"
+        cached = self._refresh_folder(self.data_path if folder_name is None else folder_name)
+        entry = cached.get(Path(self.data_path if folder_name is None else folder_name).joinpath(file_name))
+        if entry is None or entry[1] is None:
+            return None
+        return entry[1].copy()